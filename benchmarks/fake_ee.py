@@ -0,0 +1,247 @@
+"""
+Recording stand-in for the `ee` module, for offline benchmarks and CI.
+
+Every call builds a graph node exactly like the real client does (no server is
+contacted); getInfo()/getMapId()/computePixels() go through `data` so they are
+counted as round trips, optionally delayed by a simulated latency, and answered
+by per-function responders (getRegion returns a synthetic pixel table).
+
+Usage:
+    import fake_ee
+    ee = fake_ee.install()          # registers itself as sys.modules['ee']
+    import emit_hyper               # now builds graphs against the fake
+    fake_ee.configure(latency=0.2)
+    ...
+    fake_ee.stats                   # round trips, nodes, reducers, payload bytes
+"""
+
+import collections
+import hashlib
+import json
+import sys
+import time
+import types
+
+stats = collections.Counter()
+settings = {'latency': 0.0, 'region_rows': 100, 'region_bands': 285}
+responders = {}
+
+# --------------------------------------------------------------------------------------------------
+# Graph nodes
+# --------------------------------------------------------------------------------------------------
+
+# Result type of methods whose output differs from their receiver.
+RESULT_KIND = {
+    'median': 'Image', 'mean': 'Image', 'mosaic': 'Image', 'first': 'Image', 'reduce': 'Image',
+    'reduceRegion': 'Dictionary', 'toDictionary': 'Dictionary',
+    'bandNames': 'List', 'getRegion': 'List', 'values': 'List', 'toList': 'List', 'flatten': 'List',
+    'geometry': 'Geometry', 'bounds': 'Geometry',
+    'projection': 'Projection', 'nominalScale': 'Number', 'length': 'Number', 'size': 'Number',
+    'date': 'Date', 'millis': 'Number', 'format': 'String', 'get': 'ComputedObject',
+    'eigen': 'Array', 'sampleRegions': 'FeatureCollection', 'sample': 'FeatureCollection',
+}
+
+class _Meta(type):
+    def __getattr__(cls, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return lambda *args, **kwargs: cls._invoke(f"{cls.__name__}.{attr}", None, args, kwargs)
+
+class ComputedObject(metaclass=_Meta):
+    """Graph node: function name plus arguments (nodes, functions or constants)."""
+
+    def __init__(self, *args, **kwargs):
+        if len(args) == 1 and isinstance(args[0], ComputedObject) and not kwargs:
+            # Casting (ee.Image(x), ee.Number(x), ...) re-types without a new node.
+            self._name, self._args = args[0]._name, args[0]._args
+        else:
+            self._name = f"{type(self).__name__}.new"
+            self._args = {f"arg{i}": a for i, a in enumerate(args)}
+            self._args.update(kwargs)
+            stats['nodes_built'] += 1
+        self._digest = None
+
+    @classmethod
+    def _invoke(cls, name, this, args, kwargs):
+        node = cls.__new__(cls)
+        node._args = {} if this is None else {'this': this}
+        node._args.update({f"arg{i}": _wrap(a) for i, a in enumerate(args)})
+        node._args.update({k: _wrap(v) for k, v in kwargs.items()})
+        node._name = name
+        node._digest = None
+        stats['nodes_built'] += 1
+        return node
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        kind = _KINDS.get(RESULT_KIND.get(attr), type(self))
+        return lambda *args, **kwargs: kind._invoke(f"{type(self).__name__}.{attr}", self, args, kwargs)
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha1(json.dumps(
+                [self._name, {k: _digest(v) for k, v in sorted(self._args.items())}]).encode()).hexdigest()
+        return self._digest
+
+    def serialize(self):
+        """Cloud API style graph with identical subgraphs shared by reference."""
+        ids, values = {}, {}
+
+        def enc(v):
+            if isinstance(v, _Argument):
+                return {'argumentReference': v._arg_name}
+            if isinstance(v, _Function):
+                return {'functionDefinitionValue': {'argumentNames': [v._arg._arg_name], 'body': ref(v._body)['valueReference']}}
+            if isinstance(v, ComputedObject):
+                return ref(v)
+            if isinstance(v, (list, tuple)):
+                return {'arrayValue': {'values': [enc(x) for x in v]}}
+            if isinstance(v, dict):
+                return {'dictionaryValue': {'values': {k: enc(x) for k, x in v.items()}}}
+            return {'constantValue': v}
+
+        def ref(node):
+            key = node.digest()
+            if key not in ids:
+                args = {k: enc(v) for k, v in node._args.items()}
+                ids[key] = str(len(ids))
+                values[ids[key]] = {'functionInvocationValue': {'functionName': node._name, 'arguments': args}}
+            return {'valueReference': ids[key]}
+
+        result = ref(self)['valueReference']
+        return json.dumps({'result': result, 'values': values})
+
+    def getInfo(self):
+        return data.computeValue(self)
+
+    def getMapId(self, vis_params=None):
+        return data.getMapId({'image': self, **(vis_params or {})})
+
+class _Argument(ComputedObject):
+    def __init__(self, name):
+        self._name, self._args, self._digest, self._arg_name = 'argument', {'name': name}, None, name
+
+class _Function(ComputedObject):
+    """A Python callable passed to map()/iterate(), traced once with a placeholder."""
+
+    def __init__(self, fn):
+        self._arg = _Argument('_MAPPING_VAR_0')
+        self._body = _wrap(fn(self._arg))
+        if not isinstance(self._body, ComputedObject):
+            self._body = ComputedObject._invoke('constant', None, (self._body,), {})
+        self._name, self._args, self._digest = 'function', {'body': self._body}, None
+
+def _wrap(value):
+    if callable(value) and not isinstance(value, (ComputedObject, type)):
+        return _Function(value)
+    if isinstance(value, (list, tuple)):
+        return [_wrap(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _wrap(v) for k, v in value.items()}
+    return value
+
+def _digest(value):
+    if isinstance(value, ComputedObject):
+        return value.digest()
+    if isinstance(value, (list, tuple)):
+        return [_digest(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _digest(v) for k, v in sorted(value.items())}
+    return repr(value)
+
+_KINDS = {}
+for _kind in ('Image', 'ImageCollection', 'List', 'Number', 'String', 'Date', 'Dictionary', 'Array',
+              'Geometry', 'Reducer', 'Filter', 'Feature', 'FeatureCollection', 'Projection',
+              'Algorithms', 'Kernel', 'Clusterer', 'Join', 'Terrain'):
+    _KINDS[_kind] = _Meta(_kind, (ComputedObject,), {})
+_KINDS['ComputedObject'] = ComputedObject
+
+class EEException(Exception):
+    pass
+
+# --------------------------------------------------------------------------------------------------
+# Round trips
+# --------------------------------------------------------------------------------------------------
+
+def _respond(node):
+    for suffix, responder in responders.items():
+        if node._name.endswith(suffix):
+            return responder(node)
+    return {}
+
+def _synthetic_region(node):
+    bands = [f"reflectance_{i}" for i in range(settings['region_bands'])]
+    spectrum = [0.01 * (b % 40) for b in range(2 * len(bands))]
+    rows = [['id', 'longitude', 'latitude', 'time'] + bands]
+    for i in range(settings['region_rows']):
+        offset = i % len(bands)
+        rows.append([str(i), -74.38 + i * 1e-4, 10.87, 1735689600000 + i]
+                    + spectrum[offset:offset + len(bands)])
+    return rows
+
+responders['getRegion'] = _synthetic_region
+
+def _round_trip(kind, node):
+    stats['round_trips'] += 1
+    stats[kind] += 1
+    graph = json.loads(node.serialize())
+    stats['graph_bytes'] += len(json.dumps(graph))
+    for value in graph['values'].values():
+        name = value['functionInvocationValue']['functionName']
+        stats['nodes_sent'] += 1
+        if name.endswith(('reduceRegion', 'reduceRegions')):
+            stats['reduce_region'] += 1
+        if name.endswith('median'):
+            stats['median'] += 1
+    if settings['latency']:
+        time.sleep(settings['latency'])
+
+def computeValue(obj):
+    _round_trip('computeValue', obj)
+    result = _respond(obj)
+    stats['payload_bytes'] += len(json.dumps(result))
+    return result
+
+def getMapId(params):
+    _round_trip('getMapId', params['image'])
+    mapid = hashlib.sha1(params['image'].serialize().encode()).hexdigest()[:16]
+    return {'mapid': mapid, 'token': '',
+            'tile_fetcher': types.SimpleNamespace(url_format=f"https://fake-ee/{mapid}/{{z}}/{{x}}/{{y}}")}
+
+def computePixels(params):
+    _round_trip('computePixels', params['expression'])
+    return _respond(params['expression'])
+
+data = types.SimpleNamespace(computeValue=computeValue, getMapId=getMapId, computePixels=computePixels)
+
+# --------------------------------------------------------------------------------------------------
+# Module setup
+# --------------------------------------------------------------------------------------------------
+
+def Initialize(*args, **kwargs):
+    pass
+
+def Authenticate(*args, **kwargs):
+    pass
+
+def configure(**kwargs):
+    """Set latency (seconds per round trip), region_rows, region_bands."""
+    unknown = set(kwargs) - set(settings)
+    if unknown:
+        raise KeyError(f"unknown settings: {sorted(unknown)}")
+    settings.update(kwargs)
+
+def reset():
+    stats.clear()
+
+def install():
+    """Register this module as `ee` (and its node classes as ee.Image, ...)."""
+    module = sys.modules[__name__]
+    for name, kind in _KINDS.items():
+        setattr(module, name, kind)
+    sys.modules['ee'] = module
+    return module
+
+for _name, _cls in _KINDS.items():
+    globals()[_name] = _cls
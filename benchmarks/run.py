@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for emit_hyper and the local EMIT stages.
+
+Runs against the recording fake `ee` (benchmarks/fake_ee.py) and synthetic
+cubes on the real wl_emit grid, so no Earth Engine account is needed. Each
+benchmark reports its best wall time over --repeat runs, throughput in
+pixels/sec and bytes/sec, and the EE counters (round trips, graph nodes,
+reduceRegion/median nodes) where relevant.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --only local_ --repeat 5
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --compare benchmarks/baseline.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import fake_ee  # noqa: E402
+
+ee = fake_ee.install()
+
+import numpy as np  # noqa: E402
+
+import emit_cluster  # noqa: E402
+import emit_change  # noqa: E402
+import emit_composite  # noqa: E402
+import emit_cube  # noqa: E402
+import emit_hyper  # noqa: E402
+import emit_norm  # noqa: E402
+import emit_smooth  # noqa: E402
+import synthetic  # noqa: E402
+
+BENCHMARKS: Dict[str, Callable[[], dict]] = {}
+
+
+def benchmark(name: str):
+    """Register a function returning {'pixels': ..., 'bytes': ...} (plus any extras)."""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+ROI = ee.Geometry.Rectangle(-74.6, 10.7, -74.2, 11.0)
+SIZE = {'rows': 256, 'cols': 256, 'times': 8}
+
+
+def _ee_counters() -> dict:
+    keys = ('round_trips', 'nodes_sent', 'reduce_region', 'median', 'graph_bytes', 'payload_bytes')
+    return {k: fake_ee.stats[k] for k in keys}
+
+
+# --------------------------------------------------------------------------------------------------
+# Query building (fake ee)
+# --------------------------------------------------------------------------------------------------
+
+def _query(build) -> dict:
+    fake_ee.reset()
+    build().getInfo()
+    counters = _ee_counters()
+    return {'pixels': 0, 'bytes': counters['graph_bytes'], **counters}
+
+
+@benchmark('query_emit_sr')
+def bench_query_emit_sr():
+    return _query(lambda: emit_hyper.emit_sr(ROI, '2025-01-05'))
+
+
+@benchmark('query_emit_sr2')
+def bench_query_emit_sr2():
+    return _query(lambda: emit_hyper.emit_sr2(ROI, '2025-01-01', '2025-12-31'))
+
+
+@benchmark('query_norm')
+def bench_query_norm():
+    return _query(lambda: emit_hyper.norm(emit_hyper.emit_sr2(ROI, '2025-01-01', '2025-12-31')))
+
+
+@benchmark('query_pca')
+def bench_query_pca():
+    return _query(lambda: emit_hyper.pca(emit_hyper.emit_sr2(ROI, '2025-01-01', '2025-12-31')))
+
+
+@benchmark('query_mnf')
+def bench_query_mnf():
+    return _query(lambda: emit_hyper.mnf(emit_hyper.emit_sr2(ROI, '2025-01-01', '2025-12-31')))
+
+
+@benchmark('query_cva')
+def bench_query_cva():
+    return _query(lambda: emit_hyper.cva(emit_hyper.emit_sr2(ROI, '2024-01-01', '2024-12-31'),
+                                         emit_hyper.emit_sr2(ROI, '2025-01-01', '2025-12-31')))
+
+
+@benchmark('query_imad')
+def bench_query_imad():
+    return _query(lambda: emit_hyper.imad(emit_hyper.emit_sr_full2(ROI, '2024-01-01', '2024-12-31'),
+                                          emit_hyper.emit_sr_full2(ROI, '2025-01-01', '2025-12-31'),
+                                          bands=emit_hyper.good_bands_emit))
+
+
+def _site_polygon(vertices=20000):
+    """A wiggly coastline-like polygon around Ciénaga Grande, as GeoJSON."""
+    ring = [[-74.4 + 0.3 * np.cos(t) * (1 + 0.02 * np.sin(40 * t)), 10.9 + 0.2 * np.sin(t)]
+            for t in np.linspace(0, 2 * np.pi, vertices, endpoint=False)]
+    return {'type': 'Polygon', 'coordinates': [ring + ring[:1]]}
+
+
+# Built and registered at import, so neither benchmark below times the setup.
+SITE = _site_polygon()
+emit_hyper.register_roi('bench_site', SITE)
+
+
+@benchmark('query_emit_sr2_polygon')
+def bench_query_emit_sr2_polygon():
+    roi = ee.Geometry(SITE, None, False)
+    return _query(lambda: emit_hyper.emit_sr2(roi, '2025-01-01', '2025-12-31'))
+
+
+@benchmark('query_emit_sr2_site')
+def bench_query_emit_sr2_site():
+    return _query(lambda: emit_hyper.emit_sr2('bench_site', '2025-01-01', '2025-12-31'))
+
+
+@benchmark('getregion_ingest')
+def bench_getregion_ingest():
+    fake_ee.reset()
+    fake_ee.configure(region_rows=5000, region_bands=len(emit_hyper.wl_emit))
+    table = emit_hyper.coll_emit.getRegion(ee.Geometry.Point([-74.3822, 10.8689]), 60).getInfo()
+    values = np.array([[np.nan if v is None else v for v in row[4:]] for row in table[1:]], dtype=np.float32)
+    counters = _ee_counters()
+    return {'pixels': values.shape[0], 'bytes': counters['payload_bytes'], **counters}
+
+
+# --------------------------------------------------------------------------------------------------
+# Local stages (synthetic cubes)
+# --------------------------------------------------------------------------------------------------
+
+_CACHE: dict = {}
+
+
+def _cube():
+    if 'cube' not in _CACHE:
+        _CACHE['cube'] = synthetic.make_cube(SIZE['rows'], SIZE['cols'], emit_hyper.wl_emit)
+    return _CACHE['cube']
+
+
+def _stack():
+    if 'stack' not in _CACHE:
+        _CACHE['stack'] = synthetic.make_stack(SIZE['times'], SIZE['rows'] // 2, SIZE['cols'] // 2,
+                                               emit_hyper.wl_emit)
+    return _CACHE['stack']
+
+
+def _later_cube():
+    """The synthetic cube a year on: new noise, a brighter scene and one replaced block."""
+    if 'later' not in _CACHE:
+        rows, cols = SIZE['rows'], SIZE['cols']
+        later = synthetic.make_cube(rows, cols, emit_hyper.wl_emit, seed=1)
+        later = np.clip(later.astype(np.int32) * 11 // 10, -32767, 32767).astype(np.int16)
+        later[rows // 4:rows // 2, cols // 4:cols // 2] = synthetic.make_cube(
+            rows // 4, cols // 4, emit_hyper.wl_emit, seed=2)[::-1, ::-1]
+        _CACHE['later'] = later
+    return _CACHE['later']
+
+
+def _components(n=10):
+    """Leading principal components (rows, cols, n) float32 of the synthetic cube."""
+    if 'components' not in _CACHE:
+        cube = _cube()
+        flat = cube.reshape(-1, cube.shape[-1]).astype(np.float32) / 10000
+        flat -= flat.mean(axis=0)
+        _, vectors = np.linalg.eigh(np.cov(flat, rowvar=False))
+        _CACHE['components'] = (flat @ vectors[:, ::-1][:, :n]).reshape(cube.shape[:2] + (n,))
+    return _CACHE['components']
+
+
+@benchmark('local_norm')
+def bench_local_norm():
+    cube = _cube()
+    emit_norm.norm(cube)
+    return {'pixels': cube.shape[0] * cube.shape[1], 'bytes': cube.nbytes}
+
+
+@benchmark('local_savgol')
+def bench_local_savgol():
+    cube = _cube()
+    emit_smooth.savgol(cube, emit_hyper.wl_emit, window=7, order=2, deriv=1)
+    return {'pixels': cube.shape[0] * cube.shape[1], 'bytes': cube.nbytes}
+
+
+@benchmark('local_composite_median')
+def bench_local_composite_median():
+    stack = _stack()
+    emit_composite.composite(stack, 'median')
+    return {'pixels': stack.shape[0] * stack.shape[1] * stack.shape[2], 'bytes': stack.nbytes}
+
+
+@benchmark('local_composite_medoid')
+def bench_local_composite_medoid():
+    stack = _stack()
+    emit_composite.composite(stack, 'medoid')
+    return {'pixels': stack.shape[0] * stack.shape[1] * stack.shape[2], 'bytes': stack.nbytes}
+
+
+@benchmark('local_kmeans')
+def bench_local_kmeans():
+    cube, pcs = _cube(), _components()
+    centroids = emit_cluster.fit(pcs, 12, seed=0)
+    labels = emit_cluster.predict(pcs, centroids)
+    emit_cluster.mean_spectra(cube, labels, 12)
+    return {'pixels': pcs.shape[0] * pcs.shape[1], 'bytes': pcs.nbytes + cube.nbytes}
+
+
+@benchmark('local_cva')
+def bench_local_cva():
+    cube = _cube()
+    emit_change.cva(cube, _later_cube(), bands=emit_hyper.good_bands_emit)
+    return {'pixels': cube.shape[0] * cube.shape[1], 'bytes': 2 * cube.nbytes}
+
+
+@benchmark('local_imad')
+def bench_local_imad():
+    cube = _cube()
+    result = emit_change.imad(cube, _later_cube(), bands=emit_hyper.good_bands_emit, iterations=5)
+    return {'pixels': cube.shape[0] * cube.shape[1], 'bytes': 2 * cube.nbytes, 'iterations': result['iterations']}
+
+
+@benchmark('local_cube_roundtrip')
+def bench_local_cube_roundtrip():
+    cube = _cube()
+    with tempfile.TemporaryDirectory() as tmp:
+        stored = emit_cube.write(os.path.join(tmp, 'cube.emc'), cube, wavelengths=emit_hyper.wl_emit)
+        for _ in stored.blocks():
+            pass
+        del stored
+    return {'pixels': cube.shape[0] * cube.shape[1], 'bytes': cube.nbytes}
+
+
+# --------------------------------------------------------------------------------------------------
+# Runner
+# --------------------------------------------------------------------------------------------------
+
+def run(names: List[str], repeat: int, latency: float) -> dict:
+    """Run the named benchmarks; best-of-`repeat` timings and derived throughput."""
+    results = {}
+    for name in names:
+        best, info = None, {}
+        for _ in range(repeat):
+            fake_ee.configure(latency=latency)
+            start = time.perf_counter()
+            info = BENCHMARKS[name]()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {
+            'seconds': best,
+            'pixels_per_sec': info['pixels'] / best if info['pixels'] else 0.0,
+            'bytes_per_sec': info['bytes'] / best if info['bytes'] else 0.0,
+            **{k: v for k, v in info.items() if k not in ('pixels', 'bytes')},
+        }
+        print(f"{name:<28} {best * 1e3:>10.2f} ms {results[name]['pixels_per_sec']:>14,.0f} px/s "
+              f"{results[name]['bytes_per_sec'] / 2 ** 20:>10.1f} MB/s"
+              + (f"  round trips {info['round_trips']}, nodes {info['nodes_sent']}" if 'round_trips' in info else ''))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Names of benchmarks slower than baseline by more than `tolerance`, or with more round trips."""
+    regressions = []
+    print()
+    print(f"{'benchmark':<28} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        ratio = current['seconds'] / baseline[name]['seconds']
+        more_trips = current.get('round_trips', 0) > baseline[name].get('round_trips', 0)
+        flag = ' REGRESSION' if ratio > 1 + tolerance or more_trips else ''
+        print(f"{name:<28} {baseline[name]['seconds'] * 1e3:>12.2f} {current['seconds'] * 1e3:>12.2f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for emit_hyper and local EMIT stages")
+    parser.add_argument('--only', help="Run benchmarks whose name starts with this prefix", default='')
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark (best is reported)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per EE round trip")
+    parser.add_argument('--rows', type=int, default=SIZE['rows'], help="Synthetic cube rows")
+    parser.add_argument('--cols', type=int, default=SIZE['cols'], help="Synthetic cube columns")
+    parser.add_argument('--save', help="Write results as a JSON baseline")
+    parser.add_argument('--compare', help="Compare against a JSON baseline; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    SIZE.update(rows=args.rows, cols=args.cols)
+    names = [n for n in BENCHMARKS if n.startswith(args.only)]
+    if not names:
+        print(f"No benchmarks match '{args.only}'")
+        sys.exit(1)
+    results = run(names, args.repeat, args.latency)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Synthetic EMIT-like cubes for benchmarks.
+
+Spectra are mixtures of vegetation, soil and water endmembers defined on the
+real wl_emit grid, with the 1400/1900 nm water vapour absorptions and noise, in
+the ×10000 int16 convention of emit_sr*.
+"""
+
+import numpy as np
+
+NODATA = -32768
+
+
+def _gauss(wl, centre, width):
+    return np.exp(-0.5 * ((wl - centre) / width) ** 2)
+
+
+def endmembers(wavelengths):
+    """(3, bands) reflectance of vegetation, soil and water on the given grid."""
+    wl = np.asarray(wavelengths, dtype=float)
+    red_edge = 1 / (1 + np.exp(-(wl - 715) / 12))
+    vegetation = 0.04 + 0.08 * _gauss(wl, 550, 30) + 0.40 * red_edge - 0.25 * red_edge * (wl > 1300) * (wl - 1300) / 1200
+    soil = 0.08 + 0.30 * (wl - wl.min()) / (wl.max() - wl.min())
+    water = 0.06 * np.exp(-(wl - 400) / 150)
+    spectra = np.stack([vegetation, soil, water])
+    # Atmospheric water absorption shared by all surfaces.
+    spectra *= 1 - 0.9 * _gauss(wl, 1400, 40) - 0.9 * _gauss(wl, 1900, 50)
+    return np.clip(spectra, 0, 1)
+
+
+def make_cube(rows, cols, wavelengths, noise=0.005, seed=0, dtype=np.int16):
+    """(rows, cols, bands) cube of smoothly varying endmember mixtures."""
+    rng = np.random.default_rng(seed)
+    ends = endmembers(wavelengths)
+    yy, xx = np.mgrid[0:rows, 0:cols] / max(rows, cols)
+    weights = np.stack([np.sin(3 * xx) ** 2, np.cos(2 * yy) ** 2, 0.3 + 0 * xx], axis=-1)
+    weights /= weights.sum(axis=-1, keepdims=True)
+    cube = weights @ ends + rng.normal(0, noise, (rows, cols, ends.shape[1]))
+    if dtype == np.int16:
+        return np.clip(np.rint(cube * 10000), -32767, 32767).astype(np.int16)
+    return cube.astype(dtype)
+
+
+def make_stack(times, rows, cols, wavelengths, nodata_fraction=0.2, seed=0):
+    """(time, rows, cols, bands) int16 stack with cloud-like nodata gaps per date."""
+    rng = np.random.default_rng(seed)
+    base = make_cube(rows, cols, wavelengths, seed=seed)
+    stack = np.empty((times,) + base.shape, dtype=np.int16)
+    for t in range(times):
+        scale = rng.uniform(0.9, 1.1)
+        stack[t] = np.clip(base * scale + rng.normal(0, 50, base.shape), -32767, 32767).astype(np.int16)
+        stack[t][rng.random((rows, cols)) < nodata_fraction] = NODATA
+    return stack
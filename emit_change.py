@@ -0,0 +1,191 @@
+import numpy as np
+from scipy import special
+
+import emit_cube
+
+# Local (NumPy) bi-temporal change detection: change vector analysis and IR-MAD.
+# Both dates are streamed together in row blocks. The weighted mean and joint covariance of
+# the stacked [x, y] spectra come out of one chunked pass (per IR-MAD iteration, with the
+# weights of the previous iteration computed in the same pass), and the transforms use the
+# same whitening/eigen steps as emit_hyper.pca/mnf:
+#
+#   before = emit_cube.open_cube('2024.emc')
+#   after = emit_cube.open_cube('2025.emc')
+#   result = emit_change.imad(before, after, bands=emit_hyper.good_bands_emit)
+#   result['p_change']          # (rows, cols) float32, NaN where either date is nodata
+#
+# emit_hyper.cva / emit_hyper.imad are the ee counterparts.
+
+CHUNK_BYTES = 64 * 2 ** 20
+
+# --------------------------------------------------------------------------------------------------
+# Streaming both dates
+# --------------------------------------------------------------------------------------------------
+
+def _read(src, start, stop, bands):
+    """float32 (rows, cols, bands) of a row range; integer nodata becomes NaN."""
+    if isinstance(src, emit_cube.Cube):
+        return src.read(start, stop, bands)
+    block = np.asarray(src[start:stop])
+    if bands is not None:
+        block = block[..., bands]
+    if np.issubdtype(block.dtype, np.integer):
+        values = block.astype(np.float32)
+        values[block == emit_cube.NODATA] = np.nan
+        return values
+    return block.astype(np.float32, copy=False)
+
+def _pairs(x, y, bands, chunk_bytes):
+    """Yield (row_start, row_stop, stacked (pixels, 2n) float64 of valid pixels, validity
+    mask) over both dates; a pixel is valid when no selected band is NaN on either date."""
+    if tuple(x.shape) != tuple(y.shape):
+        raise ValueError(f"dates differ in shape: {tuple(x.shape)} and {tuple(y.shape)}")
+    rows, cols, nbands = x.shape
+    if bands is not None:
+        nbands = len(np.arange(nbands)[bands])
+    step = max(1, chunk_bytes // max(cols * nbands * 16, 1))
+    for start in range(0, rows, step):
+        stop = min(start + step, rows)
+        stacked = np.concatenate([_read(x, start, stop, bands), _read(y, start, stop, bands)], axis=-1)
+        stacked = stacked.reshape(-1, 2 * nbands).astype(np.float64)
+        valid = ~np.isnan(stacked).any(axis=1)
+        yield start, stop, stacked[valid], valid
+
+def _as_source(src):
+    return src if isinstance(src, (emit_cube.Cube, np.memmap)) else np.asarray(src)
+
+# --------------------------------------------------------------------------------------------------
+# Joint statistics and transforms
+# --------------------------------------------------------------------------------------------------
+
+def _joint_moments(x, y, bands, weight_fn, chunk_bytes):
+    """Weighted mean (2n,) and covariance (2n, 2n) of the stacked dates in one pass.
+
+    weight_fn(z) gives the weights of a block of stacked pixels (None: all 1). Sums are
+    taken about the first block's mean, so large reflectance offsets do not cancel badly.
+    """
+    total, shift, sums, products = 0.0, None, None, None
+    for _, _, z, _ in _pairs(x, y, bands, chunk_bytes):
+        if not z.shape[0]:
+            continue
+        if shift is None:
+            shift = z.mean(axis=0)
+            sums = np.zeros(z.shape[1])
+            products = np.zeros((z.shape[1], z.shape[1]))
+        w = np.ones(z.shape[0]) if weight_fn is None else weight_fn(z)
+        z -= shift
+        total += w.sum()
+        sums += w @ z
+        products += z.T @ (z * w[:, None])
+    if shift is None or total <= 0:
+        raise ValueError("no pixels are valid on both dates")
+    offset = sums / total
+    return shift + offset, products / total - np.outer(offset, offset)
+
+def _whiten(cov):
+    """Whitening matrix W = Λ^-1/2 Eᵀ (W·cov·Wᵀ = I), eigenvalues clamped at 1e-12, as in
+    emit_hyper._whiten."""
+    values, vectors = np.linalg.eigh(cov)
+    return (np.maximum(values, 1e-12) ** -0.5)[:, None] * vectors.T
+
+def _canonical(cov):
+    """Canonical correlations ρ (decreasing) and the (n, 2n) MAD transform [Aᵀ, −Bᵀ] of a
+    joint covariance; see emit_hyper._canonical."""
+    n = cov.shape[0] // 2
+    w1, w2 = _whiten(cov[:n, :n]), _whiten(cov[n:, n:])
+    c = w1 @ cov[:n, n:] @ w2.T
+    values, vectors = np.linalg.eigh(c @ c.T)
+    order = np.argsort(values)[::-1]
+    rho = np.sqrt(np.clip(values[order], 0, 1))
+    u = vectors[:, order].T
+    a = u @ w1
+    b = (u @ c) / np.maximum(rho, 1e-12)[:, None] @ w2
+    return np.hstack([a, -b]), rho
+
+def _chi2_cdf(chi2, df):
+    return special.gammainc(df / 2, chi2 / 2)
+
+def _mad_stats(z, mean, transform, variances):
+    """(MAD variates, χ² of the standardized MADs) of a block of stacked pixels."""
+    mads = (z - mean) @ transform.T
+    return mads, (mads ** 2 / variances).sum(axis=1)
+
+# --------------------------------------------------------------------------------------------------
+# CVA and IR-MAD
+# --------------------------------------------------------------------------------------------------
+
+def _empty(shape, names):
+    return {name: np.full(shape, np.nan, dtype=np.float32) for name in names}
+
+def _put(out, name, start, stop, valid, values):
+    out[name][start:stop].reshape(-1, *out[name].shape[2:])[valid] = values
+
+def cva(x, y, bands=None, chunk_bytes=CHUNK_BYTES):
+    """Change vector analysis of two co-registered (rows, cols, bands) arrays or
+    emit_cube.Cube dates.
+
+    Returns {'magnitude', 'angle', 'chi2', 'p_change'} (rows, cols) float32 rasters, as
+    emit_hyper.cva: the change vector y − x, the spectral angle between the dates, its
+    Mahalanobis length² under the scene's change statistics, and that value's χ² CDF.
+    bands (e.g. emit_hyper.good_bands_emit) are selected as blocks are read. Two passes:
+    one for the joint covariance, one for the output.
+    """
+    x, y = _as_source(x), _as_source(y)
+    mean, cov = _joint_moments(x, y, bands, None, chunk_bytes)
+    n = mean.size // 2
+    diff_mean = mean[n:] - mean[:n]
+    diff_cov = cov[:n, :n] + cov[n:, n:] - cov[:n, n:] - cov[n:, :n]
+    whiten = _whiten(diff_cov)
+
+    out = _empty(x.shape[:2], ('magnitude', 'angle', 'chi2', 'p_change'))
+    for start, stop, z, valid in _pairs(x, y, bands, chunk_bytes):
+        before, after = z[:, :n], z[:, n:]
+        diff = after - before
+        chi2 = (((diff - diff_mean) @ whiten.T) ** 2).sum(axis=1)
+        norms = np.sqrt((before ** 2).sum(axis=1) * (after ** 2).sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cosine = np.clip((before * after).sum(axis=1) / norms, -1, 1)
+        _put(out, 'magnitude', start, stop, valid, np.sqrt((diff ** 2).sum(axis=1)))
+        _put(out, 'angle', start, stop, valid, np.arccos(cosine))
+        _put(out, 'chi2', start, stop, valid, chi2)
+        _put(out, 'p_change', start, stop, valid, _chi2_cdf(chi2, n))
+    return out
+
+def imad(x, y, bands=None, iterations=10, tol=1e-4, chunk_bytes=CHUNK_BYTES):
+    """Iteratively reweighted MAD (Nielsen 2007) of two co-registered (rows, cols, bands)
+    arrays or emit_cube.Cube dates.
+
+    Returns {'mad': (rows, cols, n), 'magnitude', 'chi2', 'p_change': (rows, cols)} float32
+    plus 'rho' (canonical correlations, decreasing) and 'iterations', as emit_hyper.imad.
+    Each iteration is one chunked pass that computes the no-change weights 1 − p_change of
+    the previous transform and accumulates the weighted joint covariance at the same time;
+    iteration stops when no canonical correlation moves by more than tol. bands are selected
+    as blocks are read.
+    """
+    x, y = _as_source(x), _as_source(y)
+    weight_fn, previous = None, None
+    for iteration in range(1, iterations + 1):
+        mean, cov = _joint_moments(x, y, bands, weight_fn, chunk_bytes)
+        transform, rho = _canonical(cov)
+        n = rho.size
+        # Var(aᵀx − bᵀy) = 2(1 − ρ) for unit-variance canonical variates.
+        variances = np.maximum(2 * (1 - rho), 1e-12)
+
+        def weight_fn(z, mean=mean, transform=transform, variances=variances):
+            return 1 - _chi2_cdf(_mad_stats(z, mean, transform, variances)[1], n)
+
+        if previous is not None and np.abs(rho - previous).max() < tol:
+            break
+        previous = rho
+
+    out = _empty(x.shape[:2], ('magnitude', 'chi2', 'p_change'))
+    out['mad'] = np.full(x.shape[:2] + (n,), np.nan, dtype=np.float32)
+    for start, stop, z, valid in _pairs(x, y, bands, chunk_bytes):
+        mads, chi2 = _mad_stats(z, mean, transform, variances)
+        _put(out, 'mad', start, stop, valid, mads)
+        _put(out, 'magnitude', start, stop, valid, np.sqrt(chi2))
+        _put(out, 'chi2', start, stop, valid, chi2)
+        _put(out, 'p_change', start, stop, valid, _chi2_cdf(chi2, n))
+    out['rho'] = rho
+    out['iterations'] = iteration
+    return out
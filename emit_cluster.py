@@ -0,0 +1,234 @@
+import numpy as np
+
+import emit_cube
+import emit_pool
+
+# Local (NumPy) unsupervised classification of PCA / MNF component cubes.
+# Full-batch k-means needs the whole scene in memory and ee.Clusterer runs into request
+# limits, so clustering streams the cube instead: k-means++ seeds are drawn from a
+# reservoir sample, mini-batch k-means updates float32 centroids chunk by chunk, and the
+# final label raster is assigned with one distance GEMM per chunk on an emit_pool process
+# pool:
+#
+#   centroids = emit_cluster.fit(pcs, k=12, n_components=10)    # pcs: (rows, cols, n) or Cube
+#   labels = emit_cluster.predict(pcs, centroids)               # int8 raster, -1 = nodata
+#   means, counts = emit_cluster.mean_spectra(cube, labels, 12) # (12, bands) on wl_emit
+#
+# pcs is typically emit_hyper.pca / emit_hyper.mnf output downloaded as an array or
+# written with emit_cube.write; cube is the reflectance the components were computed from.
+
+NODATA = -1
+CHUNK_BYTES = 64 * 2 ** 20
+ASSIGN_ROWS = 65536
+
+# --------------------------------------------------------------------------------------------------
+# Pixels, sampling and seeding
+# --------------------------------------------------------------------------------------------------
+
+def _blocks(src, chunk_bytes=CHUNK_BYTES):
+    """emit_cube.blocks over a Cube's own chunks, or row blocks of about chunk_bytes of an
+    array, so no more than one block is ever converted to float32 at a time."""
+    if isinstance(src, emit_cube.Cube):
+        return emit_cube.blocks(src)
+    return emit_cube.blocks(src, _row_step(src.shape, src.itemsize, chunk_bytes))
+
+def _row_step(shape, itemsize, chunk_bytes):
+    return max(1, chunk_bytes // max(int(np.prod(shape[1:])) * itemsize, 1))
+
+def _pixels(block, n_components=None):
+    """(valid float32 (pixels, n) array, validity mask) of a (..., n) block; pixels with
+    any NaN component are invalid."""
+    flat = block.reshape(-1, block.shape[-1])
+    if n_components is not None:
+        flat = flat[:, :n_components]
+    flat = flat.astype(np.float32, copy=False)
+    valid = ~np.isnan(flat).any(axis=1)
+    return flat[valid], valid
+
+def reservoir_sample(src, size=20000, n_components=None, seed=None):
+    """Uniform sample of up to `size` valid pixels from one streaming pass over an array or
+    emit_cube.Cube.
+
+    Every pixel gets a random key and the `size` smallest keys are kept, which is a
+    reservoir sample that can be updated a whole chunk at a time.
+    """
+    if not isinstance(src, emit_cube.Cube):
+        src = np.asarray(src)
+    rng = np.random.default_rng(seed)
+    sample, keys = None, np.empty(0)
+    for _, _, block in _blocks(src):
+        pixels, _ = _pixels(block, n_components)
+        if not pixels.size:
+            continue
+        new_keys = rng.random(pixels.shape[0])
+        if sample is None:
+            sample, keys = pixels[:0], new_keys[:0]
+        sample = np.concatenate([sample, pixels])
+        keys = np.concatenate([keys, new_keys])
+        if keys.size > size:
+            keep = np.argpartition(keys, size)[:size]
+            sample, keys = sample[keep], keys[keep]
+    if sample is None:
+        raise ValueError("no valid pixels to sample (every pixel has a NaN component)")
+    return sample
+
+def _sq_norms(centroids):
+    return np.einsum('ij,ij->i', centroids, centroids)
+
+def kmeans_pp(sample, k, seed=None):
+    """k-means++ seeds (k, n) float32: each next seed is drawn with probability proportional
+    to its squared distance from the nearest seed so far."""
+    if sample.shape[0] < k:
+        raise ValueError(f"need at least k={k} valid pixels to seed, got {sample.shape[0]}")
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(sample, dtype=np.float32)
+    seeds = np.empty((k, sample.shape[1]), dtype=np.float32)
+    seeds[0] = sample[rng.integers(sample.shape[0])]
+    closest = ((sample - seeds[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        idx = rng.integers(sample.shape[0]) if total <= 0 else rng.choice(sample.shape[0], p=closest / total)
+        seeds[i] = sample[idx]
+        np.minimum(closest, ((sample - seeds[i]) ** 2).sum(axis=1), out=closest)
+    return seeds
+
+# --------------------------------------------------------------------------------------------------
+# Assignment and mini-batch updates
+# --------------------------------------------------------------------------------------------------
+
+def assign(pixels, centroids, chunk_rows=ASSIGN_ROWS):
+    """Nearest-centroid index of each row of a (pixels, n) float32 array.
+
+    ||x - c||² = ||x||² - 2·x·c + ||c||², and ||x||² does not change the argmin, so each
+    chunk costs one (chunk × n) @ (n × k) GEMM plus a broadcast add.
+    """
+    centroids = np.asarray(centroids, dtype=np.float32)
+    weights = -2 * centroids.T
+    c_sq = _sq_norms(centroids)
+    labels = np.empty(pixels.shape[0], dtype=np.intp)
+    for start in range(0, pixels.shape[0], chunk_rows):
+        dist = pixels[start:start + chunk_rows] @ weights
+        dist += c_sq
+        labels[start:start + chunk_rows] = dist.argmin(axis=1)
+    return labels
+
+def _update(centroids, counts, batch):
+    """Mini-batch step: every centroid moves to the running mean of all pixels assigned to
+    it so far (per-centroid learning rate 1/count)."""
+    k = centroids.shape[0]
+    labels = assign(batch, centroids)
+    batch_counts = np.bincount(labels, minlength=k)
+    onehot = np.zeros((k, batch.shape[0]), dtype=np.float32)
+    onehot[labels, np.arange(batch.shape[0])] = 1
+    sums = onehot @ batch
+    hit = batch_counts > 0
+    counts[hit] += batch_counts[hit]
+    centroids[hit] += (sums[hit] - batch_counts[hit, None] * centroids[hit]) / counts[hit, None]
+
+def fit(src, k, n_components=None, batch_size=4096, passes=1, sample_size=20000, init=None, seed=None):
+    """Mini-batch k-means centroids (k, n) float32 of a (..., n) array or emit_cube.Cube.
+
+    Seeds come from k-means++ on a reservoir sample of `sample_size` pixels (one pass),
+    unless `init` centroids are given; then `passes` streaming passes of shuffled
+    mini-batches of `batch_size` pixels refine them. Only the first n_components bands
+    are used when given (e.g. the leading PCs). Pixels with a NaN component are skipped.
+    """
+    if not isinstance(src, emit_cube.Cube):
+        src = np.asarray(src)
+    rng = np.random.default_rng(seed)
+    if init is None:
+        sample = reservoir_sample(src, sample_size, n_components, rng)
+        centroids = kmeans_pp(sample, k, rng)
+    else:
+        centroids = np.array(init, dtype=np.float32)
+        if centroids.shape[0] != k:
+            raise ValueError(f"init has {centroids.shape[0]} centroids, expected k={k}")
+    counts = np.zeros(k, dtype=np.int64)
+    for _ in range(passes):
+        for _, _, block in _blocks(src):
+            pixels, _ = _pixels(block, n_components)
+            # Rows of a chunk are spatially ordered; shuffling keeps each mini-batch from
+            # being a single strip of the scene.
+            pixels = pixels[rng.permutation(pixels.shape[0])]
+            for start in range(0, pixels.shape[0], batch_size):
+                _update(centroids, counts, pixels[start:start + batch_size])
+    return centroids
+
+# --------------------------------------------------------------------------------------------------
+# Label rasters (process pool over row blocks)
+# --------------------------------------------------------------------------------------------------
+
+def label_dtype(k):
+    """Smallest signed integer type holding labels 0..k-1 and NODATA."""
+    return np.int8 if k <= np.iinfo(np.int8).max else np.int16
+
+def _label_block(block, centroids, n_components, dtype):
+    pixels, valid = _pixels(block, n_components)
+    labels = np.full(valid.shape, NODATA, dtype=dtype)
+    labels[valid] = assign(pixels, centroids)
+    return labels.reshape(block.shape[:-1])
+
+def predict(src, centroids, n_components=None, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Label raster (rows, cols) of a (rows, cols, n) array or emit_cube.Cube; int8 for up
+    to 127 clusters, else int16, with NODATA (-1) where a component is NaN.
+
+    Row blocks (a Cube's own chunks, or about chunk_bytes of an array) are labelled on
+    `workers` processes (default: all cores; 1 runs in this process). Cubes and np.memmap
+    arrays are re-opened by each worker; blocks of other arrays are streamed to the workers.
+    """
+    centroids = np.asarray(centroids, dtype=np.float32)
+    dtype = label_dtype(centroids.shape[0])
+    if not isinstance(src, (emit_cube.Cube, np.memmap)):
+        src = np.asarray(src)
+    shape = tuple(src.shape)
+    if len(shape) != 3:
+        raise ValueError(f"expected a (rows, cols, components) cube, got shape {shape}")
+    if isinstance(src, emit_cube.Cube):
+        blocks = [(start, stop) for start, stop, _ in src.chunks]
+    else:
+        step = _row_step(shape, src.itemsize, chunk_bytes)
+        blocks = [(start, min(start + step, shape[0])) for start in range(0, shape[0], step)]
+    out = np.empty(shape[:-1], dtype=dtype)
+    return emit_pool.map_blocks(_label_block, src, blocks, out, args=(centroids, n_components, dtype),
+                                workers=workers)
+
+# --------------------------------------------------------------------------------------------------
+# Cluster spectra
+# --------------------------------------------------------------------------------------------------
+
+def mean_spectra(cube, labels, k, chunk_rows=ASSIGN_ROWS):
+    """Per-cluster mean spectra (k, bands) float32 and pixel counts (k,) of a reflectance
+    cube, in one streaming pass.
+
+    cube is the (rows, cols, bands) array or emit_cube.Cube the components were computed
+    from, so the spectra are on its wavelength grid (wl_emit for full EMIT cubes; see
+    Cube.wavelengths). NaN bands are left out of that band's mean only; NODATA labels are
+    skipped. Sums are accumulated with a one-hot (k × pixels) @ (pixels × bands) GEMM.
+    """
+    if not isinstance(cube, emit_cube.Cube):
+        cube = np.asarray(cube)
+    labels = np.asarray(labels)
+    if labels.shape != tuple(cube.shape[:-1]):
+        raise ValueError(f"labels have shape {labels.shape}, cube has {tuple(cube.shape[:-1])} pixels")
+    nbands = cube.shape[-1]
+    sums = np.zeros((k, nbands), dtype=np.float64)
+    valid_counts = np.zeros((k, nbands), dtype=np.float64)
+    counts = np.zeros(k, dtype=np.int64)
+    for start, stop, block in _blocks(cube):
+        flat = block.reshape(-1, nbands)
+        lab = labels[start:stop].reshape(-1)
+        for i in range(0, flat.shape[0], chunk_rows):
+            sub_labels = lab[i:i + chunk_rows]
+            keep = sub_labels != NODATA
+            sub_labels = sub_labels[keep].astype(np.intp)
+            values = flat[i:i + chunk_rows][keep].astype(np.float32)
+            finite = ~np.isnan(values)
+            values[~finite] = 0
+            onehot = np.zeros((k, sub_labels.size), dtype=np.float32)
+            onehot[sub_labels, np.arange(sub_labels.size)] = 1
+            sums += onehot @ values
+            valid_counts += onehot @ finite.astype(np.float32)
+            counts += np.bincount(sub_labels, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums / valid_counts).astype(np.float32)
+    return means, counts
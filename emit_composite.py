@@ -0,0 +1,102 @@
+import numpy as np
+
+import emit_pool
+
+# Local (NumPy) temporal compositing of stacked EMIT granules.
+# Stacks are (time, rows, cols, bands) int16 in the ×10000 convention of emit_sr* with a
+# sentinel value for nodata. median/percentile/mean work on int16 row blocks directly (no
+# float promotion), using partition-based selection for median/percentile, and row blocks
+# are spread over an emit_pool process pool (memmap stacks are re-opened by each worker,
+# other arrays are streamed to it block by block):
+#
+#   comp = emit_composite.composite(stack, 'median')             # ≈ emit_sr_full2(...)
+#   p90 = emit_composite.composite(stack, 'percentile', q=90)
+
+NODATA = -32768
+REDUCERS = ('median', 'mean', 'percentile', 'medoid')
+CHUNK_BYTES = 64 * 2 ** 20
+
+# --------------------------------------------------------------------------------------------------
+# Block reducers (time, rows, cols, bands) -> (rows, cols, bands)
+# --------------------------------------------------------------------------------------------------
+
+def _select(block, valid, count, positions):
+    """Per-element order statistics at `positions` (one per pixel/band) along time."""
+    # Nodata is moved to the top of the range so the valid values of every pixel come
+    # first; one np.partition over the distinct ranks then serves all pixels at once.
+    filled = np.where(valid, block, np.iinfo(np.int16).max).astype(np.int16, copy=False)
+    kth = np.unique(np.concatenate([p[count > 0].ravel() for p in positions]))
+    if kth.size:
+        filled.partition(kth, axis=0)
+    return [np.take_along_axis(filled, np.maximum(p, 0)[None], axis=0)[0] for p in positions]
+
+def _median(block, valid, count, q):
+    lo, hi = _select(block, valid, count, [(count - 1) // 2, count // 2])
+    return ((lo.astype(np.int32) + hi) // 2).astype(np.int16)
+
+def _percentile(block, valid, count, q):
+    pos = np.rint(q / 100 * (count - 1)).astype(np.intp)
+    return _select(block, valid, count, [pos])[0]
+
+def _mean(block, valid, count, q):
+    total = np.where(valid, block, 0).sum(axis=0, dtype=np.int64)
+    return np.rint(total / np.maximum(count, 1)).astype(np.int16)
+
+def _medoid(block, valid, count, q):
+    # The medoid is a whole spectrum: the date with the smallest summed spectral distance
+    # to all other valid dates of that pixel. Dates with any nodata band are skipped.
+    dates = valid.all(axis=-1)
+    # float64: sums of squared ×10000 reflectances over ~285 bands (~1e10) lose whole units
+    # in float32, enough to pick the wrong date.
+    x = block.astype(np.float64)
+    x[~dates] = 0
+    sq = np.einsum('trcb,trcb->trc', x, x)
+    gram = np.einsum('irck,jrck->rcij', x, x)
+    dist = np.sqrt(np.maximum(sq.transpose(1, 2, 0)[..., :, None] + sq.transpose(1, 2, 0)[..., None, :] - 2 * gram, 0))
+    keep = dates.transpose(1, 2, 0)
+    cost = np.where(keep[..., None, :], dist, 0).sum(axis=-1)
+    cost[~keep] = np.inf
+    idx = cost.argmin(axis=-1)
+    return np.take_along_axis(block, idx[None, ..., None], axis=0)[0]
+
+_REDUCE = {'median': _median, 'mean': _mean, 'percentile': _percentile, 'medoid': _medoid}
+
+def reduce_block(block, reducer='median', q=50, nodata=NODATA):
+    """Composite one (time, rows, cols, bands) int16 block; all-nodata pixels stay nodata."""
+    valid = block != nodata
+    count = valid.sum(axis=0)
+    result = _REDUCE[reducer](block, valid, count, q)
+    if reducer == 'medoid':
+        result[~valid.all(axis=-1).any(axis=0)] = nodata
+    else:
+        result[count == 0] = nodata
+    return result
+
+# --------------------------------------------------------------------------------------------------
+# Process pool over row blocks
+# --------------------------------------------------------------------------------------------------
+
+def _rows_per_chunk(shape, chunk_bytes):
+    row_bytes = shape[0] * int(np.prod(shape[2:])) * 2
+    return max(1, chunk_bytes // max(row_bytes, 1))
+
+def composite(stack, reducer='median', q=50, nodata=NODATA, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Temporal composite of a (time, rows, cols, bands) int16 stack -> (rows, cols, bands).
+
+    reducer is one of 'median', 'mean', 'percentile' (with q in [0, 100]) or 'medoid'.
+    Row blocks of about chunk_bytes are reduced on `workers` processes (default: all
+    cores; 1 runs in this process). An np.memmap stack is re-opened by each worker, so
+    only block bounds are sent; blocks of any other array are sent to the workers as
+    they free up, at most two per worker in flight. Either way the extra memory is the
+    output plus a few blocks, never a second copy of the stack.
+    """
+    if reducer not in REDUCERS:
+        raise ValueError(f"reducer must be one of {REDUCERS}, got {reducer!r}")
+    if stack.dtype != np.int16 or stack.ndim != 4:
+        raise ValueError(f"expected a (time, rows, cols, bands) int16 stack, got {stack.dtype} {stack.shape}")
+    shape = stack.shape
+    step = _rows_per_chunk(shape, chunk_bytes)
+    blocks = [(start, min(start + step, shape[1])) for start in range(0, shape[1], step)]
+    out = np.empty(shape[1:], dtype=np.int16)
+    return emit_pool.map_blocks(reduce_block, stack, blocks, out, axis=1, args=(reducer, q, nodata),
+                                workers=workers)
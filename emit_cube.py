@@ -0,0 +1,196 @@
+import json
+import struct
+
+import numpy as np
+
+# Compact on-disk cube format for local EMIT work.
+# Keeps the ×10000 → int16 convention of emit_sr*/coll_emit_rescaled on disk instead of
+# float .npy dumps: a small JSON header (shape, scale/offset, nodata, wavelengths,
+# geotransform, chunk index) followed by a raw int16 payload that is memory-mapped on
+# open. Chunks are row blocks stored pixel-interleaved ('bip', rows × cols × bands) or
+# band-interleaved ('bsq', bands × rows × cols):
+#
+#   emit_cube.write('scene.emc', cube, wavelengths=emit_hyper.wl_emit, geotransform=gt)
+#   c = emit_cube.open_cube('scene.emc')
+#   c.raw                        # zero-copy int16 view (bip)
+#   for start, stop, block in c.blocks():
+#       ...                      # float32 reflectance, one chunk at a time
+#
+# emit_norm, emit_smooth and the other local stages accept a Cube wherever they take an
+# array and stream it block by block through blocks().
+
+MAGIC = b'EMITCUBE'
+VERSION = 1
+NODATA = -32768
+ALIGN = 4096
+CHUNK_BYTES = 4 * 2 ** 20
+INTERLEAVES = ('bip', 'bsq')
+
+# --------------------------------------------------------------------------------------------------
+# Writing
+# --------------------------------------------------------------------------------------------------
+
+def _to_int16(block, scale, offset, nodata):
+    if block.dtype == np.int16:
+        return block
+    if np.issubdtype(block.dtype, np.integer):
+        # Already quantized (uint16, int32, ...): saturate like float input, keep nodata as is.
+        info = np.iinfo(block.dtype)
+        raw = np.clip(block, max(info.min, -32767), min(info.max, 32767)).astype(np.int16)
+        raw[block == nodata] = nodata
+        return raw
+    # Saturate at ±32767 so out-of-range values never collide with NODATA (-32768).
+    raw = np.clip(np.rint((block - offset) / scale), -32767, 32767)
+    raw[np.isnan(raw)] = nodata
+    return raw.astype(np.int16)
+
+def write(path, cube, wavelengths=None, geotransform=None, crs=None, band_names=None,
+          scale=1e-4, offset=0.0, nodata=NODATA, interleave='bip', chunk_rows=None):
+    """Write a (rows, cols, bands) cube; float input is quantized as (value - offset) / scale.
+
+    Integer input is already quantized: int16 is stored as is, other integer types are
+    clipped to the int16 range (nodata kept). NaN becomes nodata.
+    """
+    if interleave not in INTERLEAVES:
+        raise ValueError(f"interleave must be one of {INTERLEAVES}, got {interleave!r}")
+    rows, cols, bands = cube.shape
+    if wavelengths is not None and len(wavelengths) != bands:
+        raise ValueError(f"cube has {bands} bands, wavelengths has {len(wavelengths)}")
+    chunk_rows = chunk_rows or max(1, CHUNK_BYTES // max(cols * bands * 2, 1))
+    chunks, pos = [], 0
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        chunks.append([start, stop, pos])
+        pos += (stop - start) * cols * bands * 2
+    header = {
+        'version': VERSION,
+        'shape': [rows, cols, bands],
+        'dtype': 'int16',
+        'interleave': interleave,
+        'scale': scale,
+        'offset': offset,
+        'nodata': nodata,
+        'wavelengths': None if wavelengths is None else [float(w) for w in wavelengths],
+        'band_names': None if band_names is None else list(band_names),
+        'geotransform': None if geotransform is None else [float(g) for g in geotransform],
+        'crs': crs,
+        'chunks': chunks,
+    }
+    text = json.dumps(header).encode('utf-8')
+    data_offset = -(-(len(MAGIC) + 4 + len(text)) // ALIGN) * ALIGN
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(text)) + text)
+        f.write(b'\0' * (data_offset - f.tell()))
+        for start, stop, _ in chunks:
+            block = _to_int16(np.asarray(cube[start:stop]), scale, offset, nodata)
+            if interleave == 'bsq':
+                block = block.transpose(2, 0, 1)
+            f.write(np.ascontiguousarray(block, dtype='<i2').tobytes())
+    return open_cube(path)
+
+# --------------------------------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------------------------------
+
+class Cube:
+    """Memory-mapped int16 cube; nothing is read until a chunk is touched."""
+
+    def __init__(self, path, header, data_offset):
+        self.path = path
+        self.header = header
+        self.shape = tuple(header['shape'])
+        self.interleave = header['interleave']
+        self.scale = header['scale']
+        self.offset = header['offset']
+        self.nodata = header['nodata']
+        self.wavelengths = header['wavelengths']
+        self.band_names = header['band_names']
+        self.geotransform = header['geotransform']
+        self.crs = header['crs']
+        self.chunks = [tuple(c) for c in header['chunks']]
+        self._payload = np.memmap(path, dtype='<i2', mode='r', offset=data_offset,
+                                  shape=(int(np.prod(self.shape)),))
+
+    def __repr__(self):
+        return f"Cube({self.path!r}, shape={self.shape}, interleave={self.interleave!r})"
+
+    @property
+    def nbands(self):
+        return self.shape[2]
+
+    @property
+    def raw(self):
+        """Zero-copy int16 (rows, cols, bands) view; bip only."""
+        if self.interleave != 'bip':
+            raise ValueError("raw views need a pixel-interleaved ('bip') cube; use chunk_raw()")
+        return self._payload.reshape(self.shape)
+
+    def chunk_raw(self, i):
+        """Zero-copy int16 view of chunk i as (rows, cols, bands), whatever the interleave."""
+        start, stop, pos = self.chunks[i]
+        rows, cols, bands = stop - start, self.shape[1], self.nbands
+        flat = self._payload[pos // 2:pos // 2 + rows * cols * bands]
+        if self.interleave == 'bsq':
+            return flat.reshape(bands, rows, cols).transpose(1, 2, 0)
+        return flat.reshape(rows, cols, bands)
+
+    def scaled(self, raw, bands=None):
+        """float32 reflectance (raw·scale + offset) of an int16 block, nodata as NaN."""
+        if bands is not None:
+            raw = raw[..., bands]
+        values = raw.astype(np.float32)
+        values[raw == self.nodata] = np.nan
+        values *= self.scale
+        values += self.offset
+        return values
+
+    def read(self, row_start=0, row_stop=None, bands=None):
+        """float32 (rows, cols, bands) for a row range, touching only the chunks it spans."""
+        row_stop = self.shape[0] if row_stop is None else row_stop
+        parts = []
+        for i, (start, stop, _) in enumerate(self.chunks):
+            if stop <= row_start or start >= row_stop:
+                continue
+            raw = self.chunk_raw(i)[max(row_start, start) - start:min(row_stop, stop) - start]
+            parts.append(self.scaled(raw, bands))
+        if not parts:
+            nb = self.nbands if bands is None else len(np.arange(self.nbands)[bands])
+            return np.empty((0, self.shape[1], nb), dtype=np.float32)
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def blocks(self, bands=None):
+        """Yield (row_start, row_stop, float32 block) chunk by chunk."""
+        for i, (start, stop, _) in enumerate(self.chunks):
+            yield start, stop, self.scaled(self.chunk_raw(i), bands)
+
+def open_cube(path):
+    """Open a cube written by write(); only the header is read."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an EMIT cube file")
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+    if header.get('version') != VERSION:
+        raise ValueError(f"{path}: unsupported cube version {header.get('version')}")
+    data_offset = -(-(len(MAGIC) + 4 + length) // ALIGN) * ALIGN
+    return Cube(path, header, data_offset)
+
+# --------------------------------------------------------------------------------------------------
+# Block iteration shared by the local stages
+# --------------------------------------------------------------------------------------------------
+
+def blocks(src, chunk_rows=None):
+    """Yield (row_start, row_stop, block) over the first axis of an array or a Cube.
+
+    Cubes yield their own chunks as float32 reflectance; arrays are sliced (views) in
+    chunk_rows steps, or yielded whole when chunk_rows is None.
+    """
+    if isinstance(src, Cube):
+        yield from src.blocks()
+        return
+    src = np.asarray(src)
+    step = chunk_rows or max(src.shape[0], 1)
+    for start in range(0, src.shape[0], step):
+        stop = min(start + step, src.shape[0])
+        yield start, stop, src[start:stop]
@@ -1,3 +1,7 @@
+import json
+import math
+import os
+
 import ee
 
 # Make sure EE is initialized before importing/using this module:
@@ -77,15 +81,12 @@ wl_emit = [
 # Full EMIT collection
 coll_emit = ee.ImageCollection('NASA/EMIT/L2A/RFL').select(ee.List.sequence(0, 284))
 
+# Good EMIT bands: indices 0–126, 143–186, 213–284 (the 243 bands kept by emit_sr/emit_sr2;
+# the water vapour bands around 1400 and 1900 nm are dropped)
+good_bands_emit = list(range(0, 127)) + list(range(143, 187)) + list(range(213, 285))
+
 # EMIT subset collection (exclude 128–143, 188–213)
-coll_emit_sub = (
-    ee.ImageCollection('NASA/EMIT/L2A/RFL')
-    .select(
-        ee.List.sequence(0, 126)
-        .cat(ee.List.sequence(143, 186))
-        .cat(ee.List.sequence(213, 284))
-    )
-)
+coll_emit_sub = ee.ImageCollection('NASA/EMIT/L2A/RFL').select(good_bands_emit)
 
 # Rescaled EMIT collection (×10000, int16)
 coll_emit_rescaled = (
@@ -95,16 +96,256 @@ coll_emit_rescaled = (
          .set('system:time_start', img.get('system:time_start')))
 )
 
+# --------------------------------------------------------------------------------------------------
+# ROI registry (named sites with precomputed geometries)
+# --------------------------------------------------------------------------------------------------
+
+# Sites are registered once, from GeoJSON, with a bounding box, outlines simplified at each of
+# ROI_TOLERANCES and a tile grid aligned to the 60 m EMIT pixels. Anything below that takes an
+# roi also takes a site name and gets the cheapest geometry accurate enough for the job: the
+# bounding box for filterBounds, an outline within half a pixel for clip and reduceRegion.
+#
+#   emit_hyper.load_rois('sites.geojson')           # FeatureCollection with a 'name' property
+#   img = emit_hyper.emit_sr2('cienaga_grande', '2024-01-01', '2024-12-31')
+#   region = emit_hyper.roi_geometry('belize', 'reduce', scale=60)
+
+EMIT_PIXEL_DEG = 60 / 111320                     # one 60 m EMIT pixel, in degrees of latitude
+                                                 # (longitude: divide by cos(latitude))
+ROI_TOLERANCES = (15, 30, 60, 120, 240, 480)     # simplification tolerances (m)
+ROI_TILE_PIXELS = 512                            # tile size, in EMIT pixels
+_M_PER_DEG = 111320
+
+def _rings(geometry):
+    """Coordinate lists (rings, lines, or a single point) of a GeoJSON geometry."""
+    kind, coords = geometry['type'], geometry['coordinates']
+    if kind == 'Point':
+        return [[coords]]
+    if kind in ('MultiPoint', 'LineString'):
+        return [coords]
+    if kind in ('MultiLineString', 'Polygon'):
+        return coords
+    if kind == 'MultiPolygon':
+        return [ring for polygon in coords for ring in polygon]
+    raise ValueError(f"unsupported geometry type {kind!r}")
+
+def _bbox(coords):
+    xs = [p[0] for p in coords]
+    ys = [p[1] for p in coords]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def _box_ring(coords):
+    west, south, east, north = _bbox(coords)
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+def _simplify_line(coords, tolerance, kx, ky):
+    """Douglas–Peucker (iterative), with distances in metres (kx/ky metres per degree)."""
+    points = [(p[0] * kx, p[1] * ky) for p in coords]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        best, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            # Closed rings start and end on the same point: use the distance to that point.
+            d = abs(dy * (px - x1) - dx * (py - y1)) / length if length else math.hypot(px - x1, py - y1)
+            if d > best:
+                best, index = d, i
+        if index is not None and best > tolerance:
+            keep[index] = True
+            stack += [(first, index), (index, last)]
+    return [p for p, k in zip(coords, keep) if k]
+
+def _simplify(geometry, tolerance):
+    """GeoJSON geometry simplified to within `tolerance` metres. A ring that collapses is
+    replaced by its bounding box (holes are dropped), so the result never loses area."""
+    kind, coords = geometry['type'], geometry['coordinates']
+    west, south, east, north = _bbox([p for ring in _rings(geometry) for p in ring])
+    ky = _M_PER_DEG
+    kx = _M_PER_DEG * math.cos(math.radians((south + north) / 2))
+
+    def line(c):
+        return _simplify_line(c, tolerance, kx, ky)
+
+    def polygon(rings):
+        outer = line(rings[0])
+        if len(outer) < 4:
+            outer = _box_ring(rings[0])
+        return [outer] + [hole for hole in map(line, rings[1:]) if len(hole) >= 4]
+
+    if kind in ('Point', 'MultiPoint'):
+        return geometry
+    if kind == 'LineString':
+        return {'type': kind, 'coordinates': line(coords)}
+    if kind == 'MultiLineString':
+        return {'type': kind, 'coordinates': [line(c) for c in coords]}
+    if kind == 'Polygon':
+        return {'type': kind, 'coordinates': polygon(coords)}
+    return {'type': kind, 'coordinates': [polygon(c) for c in coords]}
+
+def _segment_hits_box(a, b, box):
+    """Liang–Barsky: does segment a–b touch the (west, south, east, north) box?"""
+    (x1, y1), (x2, y2) = a[:2], b[:2]
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x1 - box[0]), (dx, box[2] - x1), (-dy, y1 - box[1]), (dy, box[3] - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+        if t0 > t1:
+            return False
+    return True
+
+def _in_polygon(x, y, rings):
+    """Even–odd point‑in‑polygon test over an exterior ring and its holes."""
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip((p[:2] for p in ring), (p[:2] for p in ring[1:])):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+def _intersects(geometry, box):
+    for ring in _rings(geometry):
+        west, south, east, north = _bbox(ring)
+        if west > box[2] or east < box[0] or south > box[3] or north < box[1]:
+            continue
+        if any(box[0] <= p[0] <= box[2] and box[1] <= p[1] <= box[3] for p in ring):
+            return True
+        if any(_segment_hits_box(a, b, box) for a, b in zip(ring, ring[1:])):
+            return True
+    # No vertex or edge inside the box: it intersects only if it lies inside a polygon.
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    if geometry['type'] == 'Polygon':
+        return _in_polygon(cx, cy, geometry['coordinates'])
+    if geometry['type'] == 'MultiPolygon':
+        return any(_in_polygon(cx, cy, polygon) for polygon in geometry['coordinates'])
+    return False
+
+def _tile_grid(geometry, bbox, tile_pixels):
+    """(west, south, east, north) tiles of tile_pixels EMIT pixels, on the pixel grid,
+    that intersect the geometry. Longitude steps are widened by 1/cos(latitude) at the
+    bbox centre, so tiles are roughly square on the ground."""
+    y_step = EMIT_PIXEL_DEG
+    x_step = EMIT_PIXEL_DEG / max(math.cos(math.radians((bbox[1] + bbox[3]) / 2)), 1e-6)
+    width, height = tile_pixels * x_step, tile_pixels * y_step
+    west = math.floor(bbox[0] / x_step) * x_step
+    south = math.floor(bbox[1] / y_step) * y_step
+    cols = max(1, math.ceil((bbox[2] - west) / width))
+    rows = max(1, math.ceil((bbox[3] - south) / height))
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            tile = (west + col * width, south + row * height, west + (col + 1) * width, south + (row + 1) * height)
+            if _intersects(geometry, tile):
+                tiles.append(tile)
+    return tiles
+
+class Roi:
+    """A registered site: its GeoJSON geometry, bounding box, outlines simplified at each of
+    ROI_TOLERANCES (metres) and tiles aligned to the EMIT pixel grid."""
+
+    def __init__(self, name, geometry, tile_pixels=ROI_TILE_PIXELS):
+        self.name = name
+        self.bbox = _bbox([p for ring in _rings(geometry) for p in ring])
+        self.simplified = {0: geometry}
+        for tolerance in ROI_TOLERANCES:
+            self.simplified[tolerance] = _simplify(geometry, tolerance)
+        self.vertices = {t: sum(len(r) for r in _rings(g)) for t, g in self.simplified.items()}
+        self.tiles = _tile_grid(geometry, self.bbox, tile_pixels)
+        self._ee = {}
+
+    def __repr__(self):
+        return f"Roi({self.name!r}, {self.vertices[0]} vertices, {len(self.tiles)} tiles)"
+
+    def geometry(self, use='clip', scale=60):
+        """Cheapest ee.Geometry for `use`: 'filter' (bounding box, for filterBounds), 'clip'
+        or 'reduce' (outline simplified by at most half a pixel of `scale` metres) or
+        'exact'. Geometries are built once, so repeated requests share graph nodes."""
+        if use == 'filter':
+            key = 'bbox' if self.bbox[0] < self.bbox[2] and self.bbox[1] < self.bbox[3] else 0
+        elif use in ('clip', 'reduce'):
+            key = max(t for t in self.simplified if t <= scale / 2)
+        elif use == 'exact':
+            key = 0
+        else:
+            raise ValueError(f"use must be 'filter', 'clip', 'reduce' or 'exact', got {use!r}")
+        if key not in self._ee:
+            if key == 'bbox':
+                self._ee[key] = ee.Geometry.Rectangle(list(self.bbox))
+            else:
+                # GeoJSON edges are straight in lon/lat, so the geometry is planar.
+                self._ee[key] = ee.Geometry(self.simplified[key], None, False)
+        return self._ee[key]
+
+    def tile_geometries(self):
+        """ee.Geometry.Rectangle per tile, e.g. for per‑tile exports or computePixels."""
+        return [ee.Geometry.Rectangle(list(tile)) for tile in self.tiles]
+
+rois = {}
+_loaded_files = {}
+
+def register_roi(name, geometry, tile_pixels=ROI_TILE_PIXELS):
+    """Register (or replace) a site from a GeoJSON geometry or Feature dict; returns its Roi."""
+    if geometry.get('type') == 'Feature':
+        geometry = geometry['geometry']
+    rois[name] = Roi(name, geometry, tile_pixels)
+    return rois[name]
+
+def load_rois(path, name_field='name', tile_pixels=ROI_TILE_PIXELS):
+    """Register every feature of a GeoJSON FeatureCollection, named by its `name_field`
+    property (or feature id). A file is only processed again after it changes; returns the
+    registered names."""
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(key)
+    if key in _loaded_files and _loaded_files[key][0] == mtime:
+        return _loaded_files[key][1]
+    with open(key, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    names = []
+    for i, feature in enumerate(features):
+        props = feature.get('properties') or {}
+        name = str(props.get(name_field, feature.get('id', i)))
+        register_roi(name, feature['geometry'], tile_pixels)
+        names.append(name)
+    _loaded_files[key] = (mtime, names)
+    return names
+
+def roi_geometry(roi, use='clip', scale=60):
+    """ee.Geometry for an roi argument: a registered site name gets its cheapest geometry for
+    `use` (see Roi.geometry); an ee.Geometry (or anything else) is returned as is."""
+    if isinstance(roi, str):
+        if roi not in rois:
+            raise KeyError(f"unknown ROI {roi!r}; registered: {', '.join(sorted(rois))}")
+        return rois[roi].geometry(use, scale)
+    return roi
+
+# Sites used in the notes and the JS version.
+register_roi('belize', {'type': 'Polygon', 'coordinates': [
+    [[-89.27, 15.85], [-87.28, 15.85], [-87.28, 18.54], [-89.27, 18.54], [-89.27, 15.85]]]})
+register_roi('cienaga_grande', {'type': 'Point', 'coordinates': [-74.3822, 10.8689]})
+register_roi('bogota_urban', {'type': 'Point', 'coordinates': [-74.08698, 4.64202]})
+register_roi('bogota_rural', {'type': 'Point', 'coordinates': [-74.215, 4.685]})
+
 # --------------------------------------------------------------------------------------------------
 # EMIT single‑date and multi‑date helpers
 # --------------------------------------------------------------------------------------------------
 
 def emit_sr(roi, date):
-    """Subset EMIT (243 bands, excluding bad bands) for a single date."""
+    """Subset EMIT (243 bands, excluding bad bands) for a single date; roi may be a site name."""
     src = ee.ImageCollection('NASA/EMIT/L2A/RFL')
+    bounds = roi_geometry(roi, 'filter')
     img1 = (
         src.filterDate(ee.Date(date), ee.Date(date).advance(1, 'day'))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(0, 126))
            .median()
            .multiply(10000)
@@ -112,7 +353,7 @@ def emit_sr(roi, date):
     )
     img2 = (
         src.filterDate(ee.Date(date), ee.Date(date).advance(1, 'day'))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(143, 186))
            .median()
            .multiply(10000)
@@ -120,7 +361,7 @@ def emit_sr(roi, date):
     )
     img3 = (
         src.filterDate(ee.Date(date), ee.Date(date).advance(1, 'day'))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(213, 284))
            .median()
            .multiply(10000)
@@ -131,43 +372,45 @@ def emit_sr(roi, date):
                 .set('system:time_start', img1.get('system:time_start')))
 
 def emit_sr2(roi, date1, date2):
-    """Subset EMIT (243 bands, excluding bad bands) for a date range."""
+    """Subset EMIT (243 bands, excluding bad bands) for a date range; roi may be a site name."""
     src = ee.ImageCollection('NASA/EMIT/L2A/RFL')
+    bounds = roi_geometry(roi, 'filter')
+    area = roi_geometry(roi, 'clip')
     img1 = (
         src.filterDate(ee.Date(date1), ee.Date(date2))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(0, 126))
            .median()
            .multiply(10000)
            .toInt16()
-           .clip(roi)
+           .clip(area)
     )
     img2 = (
         src.filterDate(ee.Date(date1), ee.Date(date2))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(143, 186))
            .median()
            .multiply(10000)
            .toInt16()
-           .clip(roi)
+           .clip(area)
     )
     img3 = (
         src.filterDate(ee.Date(date1), ee.Date(date2))
-           .filterBounds(roi)
+           .filterBounds(bounds)
            .select(ee.List.sequence(213, 284))
            .median()
            .multiply(10000)
            .toInt16()
-           .clip(roi)
+           .clip(area)
     )
     return img1.addBands(img2).addBands(img3)
 
 def emit_sr_full(roi, date):
-    """Full EMIT (0–284) for a single day."""
+    """Full EMIT (0–284) for a single day; roi may be a site name."""
     return (
         ee.ImageCollection('NASA/EMIT/L2A/RFL')
         .filterDate(ee.Date(date), ee.Date(date).advance(1, 'day'))
-        .filterBounds(roi)
+        .filterBounds(roi_geometry(roi, 'filter'))
         .select(ee.List.sequence(0, 284))
         .median()
         .multiply(10000)
@@ -175,25 +418,24 @@ def emit_sr_full(roi, date):
     )
 
 def emit_sr_bz(date):
-    """Full EMIT over a fixed Belize ROI (from JS) for a single day."""
-    roi = ee.Geometry.Rectangle(-87.28, 15.85, -89.27, 18.54)
+    """Full EMIT over the registered 'belize' ROI (the fixed rectangle from JS) for a single day."""
     return (
         ee.ImageCollection('NASA/EMIT/L2A/RFL')
         .filterDate(ee.Date(date), ee.Date(date).advance(1, 'day'))
-        .filterBounds(roi)
+        .filterBounds(roi_geometry('belize', 'filter'))
         .select(ee.List.sequence(0, 284))
         .median()
         .multiply(10000)
         .toInt16()
-        .clip(roi)
+        .clip(roi_geometry('belize', 'clip'))
     )
 
 def emit_sr_full2(roi, date1, date2):
-    """Full EMIT (0–284) for flexible date range."""
+    """Full EMIT (0–284) for flexible date range; roi may be a site name."""
     return (
         ee.ImageCollection('NASA/EMIT/L2A/RFL')
         .filterDate(ee.Date(date1), ee.Date(date2))
-        .filterBounds(roi)
+        .filterBounds(roi_geometry(roi, 'filter'))
         .select(ee.List.sequence(0, 284))
         .median()
         .multiply(10000)
@@ -212,11 +454,33 @@ def rescale(img):
 # Normalization
 # --------------------------------------------------------------------------------------------------
 
-def norm(img):
-    """Min‑max normalize each band to [0,1] over image bounds."""
+def norm(img, mode='minmax', percentiles=(2, 98)):
+    """Normalize each band to [0,1] over image bounds.
+
+    mode='minmax' scales by the exact band min/max; mode='percentile' clips each band to
+    its lower/upper percentiles (one Reducer.percentile round trip) before scaling, so
+    outliers do not compress the range. See emit_norm for the local (NumPy) counterpart.
+    """
     band_names = img.bandNames()
     region = img.geometry().bounds()
     scale = img.projection().nominalScale()
+    if mode == 'percentile':
+        lower, upper = percentiles
+        pct_dict = img.reduceRegion(
+            reducer=ee.Reducer.percentile([lower, upper], ['low', 'high']),
+            geometry=region,
+            scale=scale,
+            maxPixels=1e9,
+            bestEffort=True,
+            tileScale=16
+        )
+        lows = ee.Image.constant(pct_dict.values(
+            band_names.map(lambda b: ee.String(b).cat('_low'))))
+        highs = ee.Image.constant(pct_dict.values(
+            band_names.map(lambda b: ee.String(b).cat('_high'))))
+        return img.max(lows).min(highs).subtract(lows).divide(highs.subtract(lows))
+    if mode != 'minmax':
+        raise ValueError(f"mode must be 'minmax' or 'percentile', got {mode!r}")
     min_dict = img.reduceRegion(
         reducer=ee.Reducer.min(),
         geometry=region,
@@ -241,6 +505,39 @@ def norm(img):
 # PCA (Ujaval’s implementation, translated)
 # --------------------------------------------------------------------------------------------------
 
+def _new_band_names(prefix, n):
+    """['<prefix>1', '<prefix>2', ...] for n components (server-side list)."""
+    seq = ee.List.sequence(1, n)
+    return seq.map(lambda b: ee.String(prefix).cat(ee.Number(b).int()))
+
+def _variance_dict(eigen_values):
+    """{'01': '<percent>', ...} from an (n × 1) eigenvalue array."""
+    eigen_values_list = eigen_values.toList().flatten()
+    total = eigen_values_list.reduce(ee.Reducer.sum())
+
+    def _map_var(item):
+        component = eigen_values_list.indexOf(item).add(1).format('%02d')
+        variance = ee.Number(item).divide(total).multiply(100).format('%.2f')
+        return ee.List([component, variance])
+
+    percentage_variance = eigen_values_list.map(_map_var)
+    return ee.Dictionary(percentage_variance.flatten())
+
+def _whiten(cov):
+    """Whitening matrix W = Λ^-1/2 Eᵀ of a covariance ee.Array (W·cov·Wᵀ = I); eigenvalues
+    are clamped at 1e-12 so singular covariances stay finite."""
+    eigens = cov.eigen()
+    values = eigens.slice(1, 0, 1).max(1e-12)
+    return values.pow(-0.5).matrixToDiag().matrixMultiply(eigens.slice(1, 1))
+
+def _project(matrix, image, prefix, n):
+    """Apply an (n × n) ee.Array to every pixel of a band image; returns prefixed bands."""
+    return (
+        ee.Image(matrix).matrixMultiply(image.toArray().toArray(1))
+        .arrayProject([0])
+        .arrayFlatten([_new_band_names(prefix, n)])
+    )
+
 def pca(img):
     """PCA over image bounds; returns SD‑normalized PCs with variance props."""
     image = img.unmask()
@@ -258,10 +555,6 @@ def pca(img):
     means = ee.Image.constant(mean_dict.values(band_names))
     centered = image.subtract(means)
 
-    def get_new_band_names(prefix):
-        seq = ee.List.sequence(1, band_names.length())
-        return seq.map(lambda b: ee.String(prefix).cat(ee.Number(b).int()))
-
     def get_principal_components(centered_img, scale_val, region_val):
         arrays = centered_img.toArray()
         covar = arrays.reduceRegion(
@@ -274,32 +567,20 @@ def pca(img):
         covar_array = ee.Array(covar.get('array'))
         eigens = covar_array.eigen()
         eigen_values = eigens.slice(1, 0, 1)
-
-        eigen_values_list = eigen_values.toList().flatten()
-        total = eigen_values_list.reduce(ee.Reducer.sum())
-
-        def _map_var(item):
-            component = eigen_values_list.indexOf(item).add(1).format('%02d')
-            variance = ee.Number(item).divide(total).multiply(100).format('%.2f')
-            return ee.List([component, variance])
-
-        percentage_variance = eigen_values_list.map(_map_var)
-        variance_dict = ee.Dictionary(percentage_variance.flatten())
+        variance_dict = _variance_dict(eigen_values)
 
         eigen_vectors = eigens.slice(1, 1)
-        array_image = arrays.toArray(1)
-        principal_components = ee.Image(eigen_vectors).matrixMultiply(array_image)
+        n = band_names.length()
+        principal_components = _project(eigen_vectors, centered_img, 'pc', n)
 
         sd_image = (
             ee.Image(eigen_values.abs().sqrt())
             .arrayProject([0])
-            .arrayFlatten([get_new_band_names('sd')])
+            .arrayFlatten([_new_band_names('sd', n)])
         )
 
         return (
             principal_components
-            .arrayProject([0])
-            .arrayFlatten([get_new_band_names('pc')])
             .divide(sd_image)
             .set(variance_dict)
         )
@@ -311,6 +592,259 @@ def variance_pca(img):
     """Prints variance explained by PCs (server‑side; for debugging in Code Editor style)."""
     print('Variance of Principal Components', pca(img).toDictionary())
 
+# --------------------------------------------------------------------------------------------------
+# MNF (noise‑adjusted PCA)
+# --------------------------------------------------------------------------------------------------
+
+def mnf(img):
+    """Minimum Noise Fraction over image bounds; returns MNF components with variance props.
+
+    Noise is estimated from horizontal shift differences. Band means, the signal covariance
+    and the noise covariance come out of a single reduceRegion: the image and its shift
+    difference are stacked into one 2n array, so one centeredCovariance gives both diagonal
+    blocks. Components are in noise units (noise variance 1), ordered by decreasing SNR;
+    the variance props are the percentage of total SNR per component. The transform
+    needed by inverse_mnf is attached as properties.
+    """
+    image = img.unmask()
+    scale = img.projection().nominalScale()
+    region = img.geometry().bounds()
+    band_names = image.bandNames()
+    n = band_names.length()
+
+    noise = img.subtract(img.translate(1, 0, 'pixels'))
+    stacked = img.addBands(noise).toArray()
+    # toArray() masks a pixel if any band or shifted band is masked; the means are taken
+    # over that same pixel set so they match the covariance.
+    stats = img.updateMask(stacked.mask()).addBands(stacked.rename('array')).reduceRegion(
+        reducer=ee.Reducer.mean().repeat(n).combine(
+            ee.Reducer.centeredCovariance(), sharedInputs=False),
+        geometry=region,
+        scale=scale,
+        maxPixels=1e13,
+        tileScale=16
+    )
+    means = ee.List(stats.get('mean'))
+    # Outputs of a combined multi-input reducer are named after the reducers, not the bands.
+    covar = ee.Array(stats.get('covariance'))
+    signal_cov = covar.slice(0, 0, n).slice(1, 0, n)
+    # Var(x - x_shifted) = 2 Σ_noise for spatially uncorrelated noise.
+    noise_cov = covar.slice(0, n).slice(1, n).divide(2)
+
+    # Noise whitening, then PCA of the whitened signal covariance.
+    whiten = _whiten(noise_cov)
+    whitened_cov = whiten.matrixMultiply(signal_cov).matrixMultiply(whiten.matrixTranspose())
+    eigens = whitened_cov.eigen()
+    eigen_values = eigens.slice(1, 0, 1)
+    transform = eigens.slice(1, 1).matrixMultiply(whiten)
+
+    centered = image.subtract(ee.Image.constant(means))
+    components = (
+        _project(transform, centered, 'mnf', n)
+        .set(_variance_dict(eigen_values))
+        .set({
+            'mnf_inverse': transform.matrixInverse().toList(),
+            'mnf_mean': means,
+            'mnf_bands': band_names,
+        })
+    )
+    return components.mask(img.mask())
+
+def inverse_mnf(mnf_img, n_components=None):
+    """Back‑transform MNF components to the original bands (keeping the first n_components
+    to denoise; all of them for an exact inverse)."""
+    inverse = ee.Array(mnf_img.get('mnf_inverse'))
+    means = ee.List(mnf_img.get('mnf_mean'))
+    band_names = ee.List(mnf_img.get('mnf_bands'))
+    n = band_names.length()
+    components = mnf_img.unmask()
+    if n_components is not None:
+        keep = ee.Image.constant(
+            ee.List.repeat(1, n_components).cat(ee.List.repeat(0, n.subtract(n_components)))
+        )
+        components = components.multiply(keep)
+    restored = (
+        _project(inverse, components, 'b', n)
+        .add(ee.Image.constant(means))
+        .rename(band_names)
+    )
+    return restored.mask(mnf_img.mask())
+
+# --------------------------------------------------------------------------------------------------
+# Bi‑temporal change detection (CVA / IR‑MAD)
+# --------------------------------------------------------------------------------------------------
+
+def _change_inputs(img1, img2, bands):
+    """Select `bands` on both dates before anything else, so dropped bands cost nothing."""
+    if bands is not None:
+        img1, img2 = img1.select(bands), img2.select(bands)
+    return img1.float(), img2.float()
+
+def _prefixed(prefix, count):
+    return ee.List.sequence(0, ee.Number(count).subtract(1)).map(
+        lambda i: ee.String(prefix).cat(ee.Number(i).format('%d')))
+
+def _joint_moments(img1, img2, weights, region, scale):
+    """Weighted mean (2n × 1) and covariance (2n × 2n) of both dates stacked, from ONE
+    reduceRegion.
+
+    Only O(n) values are formed per pixel: w, w·z and √w·z for z = [x, y]. One unweighted
+    centeredCovariance of √w·z (accumulated per tile, never a per-pixel outer product),
+    the means of those bands and the pixel count N give
+    Σw·z·zᵀ = (N − 1)·Cov(√w·z) + N·mean(√w·z)·mean(√w·z)ᵀ and Σw·z = N·mean(w·z), as
+    emit_change._joint_moments accumulates them locally.
+    """
+    z = img1.addBands(img2).double()
+    m = z.bandNames().length()
+    w = (ee.Image.constant(1) if weights is None else weights).double().rename('w')
+    root = z.multiply(w.sqrt())
+    array = root.toArray()
+    # Every input is masked like the array, so all reducers see the same pixels.
+    inputs = (w.addBands(z.multiply(w).rename(_prefixed('wz_', m)))
+              .addBands(root.rename(_prefixed('rz_', m)))
+              .updateMask(array.mask())
+              .addBands(array.rename('array')))
+    reducer = (ee.Reducer.sum().combine(ee.Reducer.count(), sharedInputs=True)
+               .combine(ee.Reducer.mean().repeat(m.multiply(2)), sharedInputs=False)
+               .combine(ee.Reducer.centeredCovariance(), sharedInputs=False))
+    stats = inputs.reduceRegion(
+        reducer=reducer,
+        geometry=region,
+        scale=scale,
+        maxPixels=1e13,
+        tileScale=16
+    )
+    count = ee.Number(stats.get('count'))
+    total = ee.Number(stats.get('sum'))
+    means = ee.Array(stats.get('mean'))
+    mean = ee.Array.cat([means.slice(0, 0, m)], 1).multiply(count).divide(total)
+    root_mean = ee.Array.cat([means.slice(0, m)], 1)
+    products = (ee.Array(stats.get('covariance')).multiply(count.subtract(1))
+                .add(root_mean.matrixMultiply(root_mean.matrixTranspose()).multiply(count)))
+    cov = products.divide(total).subtract(mean.matrixMultiply(mean.matrixTranspose()))
+    return mean, cov
+
+def _chi2_cdf(chi2, df):
+    """P(χ²_df ≤ chi2) per pixel, as the regularized lower incomplete gamma γ(df/2, chi2/2)."""
+    return chi2.divide(2).gammainc(ee.Image.constant(ee.Number(df).divide(2)))
+
+def _canonical(cov, n):
+    """Canonical correlations ρ (decreasing) of the two n‑band blocks of a joint covariance,
+    and the (n × 2n) transform [Aᵀ, −Bᵀ] whose rows give the MAD variates aᵢᵀx − bᵢᵀy.
+
+    Both blocks are whitened (see _whiten); the eigenvectors uᵢ of C·Cᵀ, with
+    C = W₁·Σ₁₂·W₂ᵀ, give aᵢ = W₁ᵀuᵢ and bᵢ = W₂ᵀCᵀuᵢ/ρᵢ.
+    """
+    w1 = _whiten(cov.slice(0, 0, n).slice(1, 0, n))
+    w2 = _whiten(cov.slice(0, n).slice(1, n))
+    c = w1.matrixMultiply(cov.slice(0, 0, n).slice(1, n)).matrixMultiply(w2.matrixTranspose())
+    eigens = c.matrixMultiply(c.matrixTranspose()).eigen()
+    rho = eigens.slice(1, 0, 1).max(0).sqrt()
+    u = eigens.slice(1, 1)
+    a = u.matrixMultiply(w1)
+    b = rho.max(1e-12).pow(-1).matrixToDiag().matrixMultiply(u).matrixMultiply(c).matrixMultiply(w2)
+    return ee.Array.cat([a, b.multiply(-1)], 1), rho.project([0])
+
+def cva(img1, img2, bands=None, region=None, scale=60):
+    """Change vector analysis of two co‑registered images (e.g. emit_sr2 composites of two
+    date windows over the same ROI).
+
+    Returns 'magnitude' (length of img2 − img1), 'angle' (spectral angle between the dates,
+    radians), 'chi2' (Mahalanobis length² of the change vector) and 'p_change' (its χ² CDF
+    with one degree of freedom per band). The change vector's mean and covariance come from
+    the joint covariance of both dates, one reduceRegion over region (an ee.Geometry or site
+    name; default: img1 bounds).
+    bands (e.g. good_bands_emit for emit_sr_full* images) are selected first.
+    See emit_change.cva for the local counterpart.
+    """
+    img1, img2 = _change_inputs(img1, img2, bands)
+    region = img1.geometry().bounds() if region is None else roi_geometry(region, 'reduce', scale)
+    n = img1.bandNames().length()
+    mean, cov = _joint_moments(img1, img2, None, region, scale)
+    # D = Y − X has mean m_y − m_x and covariance Σxx + Σyy − Σxy − Σyx.
+    diff_mean = mean.slice(0, n).subtract(mean.slice(0, 0, n)).project([0]).toList()
+    cross = cov.slice(0, 0, n).slice(1, n)
+    diff_cov = (cov.slice(0, 0, n).slice(1, 0, n).add(cov.slice(0, n).slice(1, n))
+                .subtract(cross).subtract(cross.matrixTranspose()))
+
+    diff = img2.subtract(img1)
+    whitened = _project(_whiten(diff_cov), diff.subtract(ee.Image.constant(diff_mean)), 'z', n)
+    chi2 = whitened.pow(2).reduce(ee.Reducer.sum()).rename('chi2')
+    magnitude = diff.pow(2).reduce(ee.Reducer.sum()).sqrt().rename('magnitude')
+    dot = img1.multiply(img2).reduce(ee.Reducer.sum())
+    norms = img1.pow(2).reduce(ee.Reducer.sum()).multiply(img2.pow(2).reduce(ee.Reducer.sum())).sqrt()
+    angle = dot.divide(norms).clamp(-1, 1).acos().rename('angle')
+    return (magnitude.addBands(angle).addBands(chi2)
+            .addBands(_chi2_cdf(chi2, n).rename('p_change')))
+
+def imad(img1, img2, bands=None, region=None, scale=60, iterations=5):
+    """Iteratively reweighted MAD (Nielsen 2007) of two co‑registered images.
+
+    Returns 'mad1'..'madN' (ordered by decreasing canonical correlation), 'magnitude'
+    (length of the standardized MAD vector), 'chi2' (its square) and 'p_change' (χ² CDF
+    with N degrees of freedom), with the canonical correlations as the 'mad_rho' property.
+    Each iteration is one reduceRegion of the joint covariance, weighted by the no‑change
+    probability 1 − p_change of the previous iteration; iterations are chained server‑side
+    without getInfo. bands are selected first, as in cva. See emit_change.imad for the
+    local counterpart.
+    """
+    img1, img2 = _change_inputs(img1, img2, bands)
+    region = img1.geometry().bounds() if region is None else roi_geometry(region, 'reduce', scale)
+    n = img1.bandNames().length()
+    stacked = img1.addBands(img2)
+    weights = None
+    for _ in range(iterations):
+        mean, cov = _joint_moments(img1, img2, weights, region, scale)
+        transform, rho = _canonical(cov, n)
+        centered = stacked.subtract(ee.Image.constant(mean.project([0]).toList()))
+        mads = _project(transform, centered, 'mad', n)
+        # Var(aᵀx − bᵀy) = 2(1 − ρ) for unit‑variance canonical variates.
+        variances = rho.multiply(-1).add(1).multiply(2).max(1e-12)
+        chi2 = mads.pow(2).divide(ee.Image.constant(variances.toList())).reduce(ee.Reducer.sum()).rename('chi2')
+        p_change = _chi2_cdf(chi2, n).rename('p_change')
+        weights = ee.Image.constant(1).subtract(p_change)
+    return (mads.addBands(chi2.sqrt().rename('magnitude')).addBands(chi2).addBands(p_change)
+            .set('mad_rho', rho.toList()))
+
+# --------------------------------------------------------------------------------------------------
+# Harmonic time‑series fitting
+# --------------------------------------------------------------------------------------------------
+
+def harmonic_fit(coll, band, tau=365 * 24 * 3600 * 1000, n_harmonics=1):
+    """Per‑pixel lst0 + Σ A·sin(2πkt/τ + φ) fit over a collection (τ in ms, as in unit1).
+
+    Each image is augmented with constant/cos/sin bands and the whole collection is reduced
+    with one Reducer.linearRegression. Returns 'mean', 'amplitude1', 'phase1', ... bands
+    (delta = 2 * amplitude). See timeseries.fit_harmonics for the local counterpart.
+    """
+    names = ['constant']
+    for k in range(1, n_harmonics + 1):
+        names += ['cos%d' % k, 'sin%d' % k]
+
+    def _add_harmonics(img):
+        y = img.select(band).float()
+        cycles = img.date().millis().divide(tau)
+        bands = [ee.Image.constant(1)]
+        for k in range(1, n_harmonics + 1):
+            angle = ee.Image.constant(cycles.multiply(2 * math.pi * k))
+            bands += [angle.cos(), angle.sin()]
+        return ee.Image.cat(bands).float().rename(names).updateMask(y.mask()).addBands(y)
+
+    coefficients = (
+        coll.map(_add_harmonics)
+        .reduce(ee.Reducer.linearRegression(numX=len(names), numY=1))
+        .select('coefficients')
+        .arrayProject([0])
+        .arrayFlatten([names])
+    )
+    out = coefficients.select('constant').rename('mean')
+    for k in range(1, n_harmonics + 1):
+        cos = coefficients.select('cos%d' % k)
+        sin = coefficients.select('sin%d' % k)
+        out = (out.addBands(cos.hypot(sin).rename('amplitude%d' % k))
+                  .addBands(cos.atan2(sin).rename('phase%d' % k)))
+    return out
+
 # --------------------------------------------------------------------------------------------------
 # Simple drawing helpers (ln1, ln2)
 # --------------------------------------------------------------------------------------------------
@@ -0,0 +1,170 @@
+import numpy as np
+
+import emit_cube
+
+# Local (NumPy) robust normalization with mergeable quantile sketches.
+# Per-band percentiles are estimated in one streaming pass with a KLL-style compactor
+# sketch instead of sorting the whole cube. Sketches from different chunks, granules or
+# dates merge, so one normalization can be fitted across a whole time series:
+#
+#   sketch = emit_norm.BandSketch(nbands)
+#   for cube in cubes:
+#       sketch.update(cube)
+#   lows, highs = sketch.quantiles([0.02, 0.98])
+#   normed = emit_norm.norm(cube, lows, highs)
+#
+# emit_hyper.norm(img, mode='percentile') is the ee counterpart.
+
+# --------------------------------------------------------------------------------------------------
+# Quantile sketches
+# --------------------------------------------------------------------------------------------------
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch of a single stream of values.
+
+    Level h holds items of weight 2**h. A level that outgrows `k` items is sorted and every
+    other item (random offset) is promoted to the next level, so memory stays around
+    k·log2(n/k) items and the rank error is of order 1/k.
+    """
+
+    def __init__(self, k=2048, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add a block of values (NaNs are skipped)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += values.size
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size > self.k:
+                items = np.sort(items)
+                # Keep an odd leftover at this level so the promoted half is exact.
+                keep = items[:items.size % 2]
+                pairs = items[items.size % 2:]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate quantile(s) q in [0, 1]; NaN for an empty sketch."""
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lvl.size, 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, q * cum[-1], side='left')
+        return items[np.clip(idx, 0, items.size - 1)]
+
+class BandSketch:
+    """One QuantileSketch per band; blocks are (..., bands) arrays."""
+
+    def __init__(self, nbands, k=2048, seed=None):
+        seeds = np.random.SeedSequence(seed).spawn(nbands)
+        self.sketches = [QuantileSketch(k, s) for s in seeds]
+
+    @property
+    def nbands(self):
+        return len(self.sketches)
+
+    def update(self, block, chunk_rows=65536):
+        """Add a (..., bands) block, streamed chunk_rows pixels at a time."""
+        block = np.asarray(block)
+        if block.shape[-1] != self.nbands:
+            raise ValueError(f"block has {block.shape[-1]} bands, sketch has {self.nbands}")
+        flat = block.reshape(-1, self.nbands)
+        for start in range(0, flat.shape[0], chunk_rows):
+            chunk = flat[start:start + chunk_rows]
+            for b, sketch in enumerate(self.sketches):
+                sketch.update(chunk[:, b])
+        return self
+
+    def merge(self, other):
+        """Fold another BandSketch (same number of bands) into this one."""
+        if other.nbands != self.nbands:
+            raise ValueError(f"cannot merge sketches with {other.nbands} and {self.nbands} bands")
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        return self
+
+    def quantiles(self, qs):
+        """Per-band quantiles: one (bands,) array per q."""
+        table = np.array([s.quantile(qs) for s in self.sketches])
+        return [table[:, i] for i in range(table.shape[1])]
+
+def merge_all(sketches):
+    """Merge an iterable of BandSketch objects (e.g. one per scene) into a new sketch."""
+    sketches = list(sketches)
+    merged = BandSketch(sketches[0].nbands, sketches[0].sketches[0].k)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+# --------------------------------------------------------------------------------------------------
+# Normalization
+# --------------------------------------------------------------------------------------------------
+
+def fit(cube, percentiles=(2, 98), k=2048, seed=None):
+    """Per-band (lows, highs) of a (..., bands) cube or emit_cube.Cube from one streaming
+    sketch pass."""
+    if not isinstance(cube, emit_cube.Cube):
+        cube = np.asarray(cube)
+    sketch = BandSketch(cube.shape[-1], k, seed)
+    for _, _, block in emit_cube.blocks(cube):
+        sketch.update(block)
+    lower, upper = percentiles
+    return sketch.quantiles([lower / 100, upper / 100])
+
+def _scale_block(block, lows, span, out, chunk_rows):
+    src = block.reshape(-1, block.shape[-1])
+    dst = out.reshape(-1, block.shape[-1])
+    for start in range(0, src.shape[0], chunk_rows):
+        chunk = src[start:start + chunk_rows].astype(np.float32)
+        np.subtract(chunk, lows, out=chunk)
+        np.divide(chunk, span, out=chunk)
+        np.clip(chunk, 0, 1, out=dst[start:start + chunk_rows])
+
+def norm(cube, lows=None, highs=None, percentiles=(2, 98), out=None, chunk_rows=65536):
+    """Clip each band to [lows, highs] and scale to [0, 1] (float32).
+
+    cube is a (..., bands) array or an emit_cube.Cube (read chunk by chunk). lows/highs
+    default to the cube's own percentiles; pass values from a merged BandSketch to apply
+    one normalization across scenes.
+    """
+    if not isinstance(cube, emit_cube.Cube):
+        cube = np.asarray(cube)
+    if lows is None or highs is None:
+        lows, highs = fit(cube, percentiles)
+    lows = np.asarray(lows, dtype=np.float32)
+    span = np.asarray(highs, dtype=np.float32) - lows
+    span[span == 0] = 1
+    if out is None:
+        out = np.empty(cube.shape, dtype=np.float32)
+    for start, stop, block in emit_cube.blocks(cube):
+        _scale_block(block, lows, span, out[start:stop], chunk_rows)
+    return out
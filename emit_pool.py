@@ -0,0 +1,84 @@
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import emit_cube
+
+# Process pool over row blocks, shared by emit_composite and emit_cluster.
+# Sources that can be re-opened by path (emit_cube.Cube, file-backed np.memmap) are opened
+# once per worker process, so only block bounds cross the process boundary. Blocks of any
+# other array are sent to the workers as they free up, at most two per worker in flight,
+# so the extra memory is a few blocks rather than a second copy of the input. Results come
+# back to the parent and are written into `out`:
+#
+#   out = np.empty(stack.shape[1:], np.int16)
+#   emit_pool.map_blocks(emit_composite.reduce_block, stack, blocks, out, axis=1)
+
+_worker = {}
+
+def _reopen_spec(src):
+    """Picklable recipe for re-opening src in a worker, or None if blocks must be sent."""
+    if isinstance(src, emit_cube.Cube):
+        return ('cube', src.path)
+    if isinstance(src, np.memmap) and isinstance(src.base, mmap.mmap) and src.flags.c_contiguous:
+        return ('memmap', src.filename, src.offset, src.dtype.str, src.shape)
+    return None
+
+def _attach(spec, fn, axis, args):
+    """Pool initializer: re-open the source once per worker process."""
+    source = None
+    if spec is not None and spec[0] == 'cube':
+        source = emit_cube.open_cube(spec[1])
+    elif spec is not None:
+        _, filename, offset, dtype, shape = spec
+        source = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+    _worker.update(source=source, fn=fn, axis=axis, args=args)
+
+def read_rows(src, start, stop, axis=0):
+    """Rows start:stop along `axis` of an array, or float32 rows of a Cube (axis 0)."""
+    if isinstance(src, emit_cube.Cube):
+        return src.read(start, stop)
+    return np.asarray(src[(slice(None),) * axis + (slice(start, stop),)])
+
+def _run(start, stop, block):
+    if block is None:
+        block = read_rows(_worker['source'], start, stop, _worker['axis'])
+    return _worker['fn'](block, *_worker['args'])
+
+def map_blocks(fn, src, blocks, out, axis=0, args=(), workers=None):
+    """out[start:stop] = fn(rows start:stop of src along axis, *args) for every (start, stop)
+    in blocks; returns out.
+
+    fn must be a module-level function (it is pickled to the workers). Runs on `workers`
+    processes (default: all cores; 1, or a single block, runs in this process).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(blocks) <= 1:
+        for start, stop in blocks:
+            out[start:stop] = fn(read_rows(src, start, stop, axis), *args)
+        return out
+
+    spec = _reopen_spec(src)
+    todo = iter(blocks)
+    pending = {}
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(blocks)),
+        initializer=_attach,
+        initargs=(spec, fn, axis, args),
+    ) as pool:
+        def submit():
+            bounds = next(todo, None)
+            if bounds is not None:
+                block = None if spec else np.ascontiguousarray(read_rows(src, *bounds, axis))
+                pending[pool.submit(_run, *bounds, block)] = bounds
+        for _ in range(2 * workers):
+            submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, stop = pending.pop(future)
+                out[start:stop] = future.result()
+                submit()
+    return out
@@ -0,0 +1,258 @@
+import concurrent.futures
+import csv
+import hashlib
+import http.client
+import json
+import os
+import time
+
+import ee
+import numpy as np
+
+# Point sampling at scale.
+# Instead of one getRegion(point).getInfo() per plot (unit1), points are sorted along a
+# Z-order curve, cut into spatially compact batches that stay under the EE payload limits,
+# and each batch is sampled with one sampleRegions request. Batches run concurrently, land
+# in a columnar table (id, time, bands) and, with a checkpoint directory, are written to
+# disk as they finish so an interrupted run resumes where it stopped:
+#
+#   table = emit_sample.sample(emit_hyper.coll_emit_rescaled.filterDate(d1, d2),
+#                              'plots.geojson', scale=60, checkpoint='plots_ckpt')
+#   df = emit_sample.to_dataframe(table)
+#
+# Only Point geometries are sampled; polygons and other geometries are rejected rather
+# than reduced to a centroid (use emit_hyper's region reducers for area statistics).
+
+MAX_ROWS = 5000          # features per getInfo
+MAX_VALUES = 1048576     # values per getRegion/sampleRegions response
+TIME = 'system:time_start'
+# ee.EEException messages worth retrying: throttling, quota and server-side hiccups. Anything
+# else (bad band names, memory limits, invalid geometries) fails the same way every time.
+TRANSIENT_MESSAGES = ('too many concurrent', 'too many requests', 'rate limit', 'quota',
+                      'timed out', 'deadline', 'internal error', 'backend error',
+                      'service unavailable', 'try again')
+
+# --------------------------------------------------------------------------------------------------
+# Points
+# --------------------------------------------------------------------------------------------------
+
+def load_points(path, id_field='id'):
+    """(ids, lon, lat) from a GeoJSON FeatureCollection of points or a CSV.
+
+    CSV columns are id_field plus lon/longitude/x and lat/latitude/y; rows without an id get
+    their row number. Raises ValueError for features that are not Points.
+    """
+    ids, lon, lat = [], [], []
+    if path.lower().endswith(('.geojson', '.json')):
+        with open(path, encoding='utf-8') as f:
+            features = json.load(f)['features']
+        for i, feat in enumerate(features):
+            geometry = feat.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                raise ValueError(f"{path}: feature {i} is a {geometry.get('type')}, only Point "
+                                 "geometries can be sampled")
+            x, y = geometry['coordinates'][:2]
+            props = feat.get('properties') or {}
+            ids.append(str(props.get(id_field, feat.get('id', i))))
+            lon.append(x)
+            lat.append(y)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fields = {name.lower(): name for name in reader.fieldnames}
+            xcol = next(fields[c] for c in ('lon', 'longitude', 'x') if c in fields)
+            ycol = next(fields[c] for c in ('lat', 'latitude', 'y') if c in fields)
+            for i, row in enumerate(reader):
+                ids.append(str(row.get(id_field) or i))
+                lon.append(float(row[xcol]))
+                lat.append(float(row[ycol]))
+    return np.array(ids), np.array(lon, dtype=float), np.array(lat, dtype=float)
+
+def fetch_points(fc, id_property='id'):
+    """(ids, lon, lat) of a point ee.FeatureCollection, paged under the getInfo limit.
+
+    Raises ValueError for features that are not Points.
+    """
+    slim = fc.map(lambda f: ee.Feature(None, {
+        'id': f.get(id_property), 'type': f.geometry().type(), 'xy': f.geometry().coordinates()}))
+    total = slim.size().getInfo()
+    ids, lon, lat = [], [], []
+    for offset in range(0, total, MAX_ROWS):
+        page = ee.FeatureCollection(slim.toList(MAX_ROWS, offset)).getInfo()
+        for feat in page['features']:
+            props = feat['properties']
+            if props['type'] != 'Point':
+                raise ValueError(f"feature {props['id']} is a {props['type']}, only Point "
+                                 "geometries can be sampled")
+            ids.append(str(props['id']))
+            lon.append(props['xy'][0])
+            lat.append(props['xy'][1])
+    return np.array(ids), np.array(lon, dtype=float), np.array(lat, dtype=float)
+
+def _morton(lon, lat, bits=16):
+    """Z-order codes of lon/lat normalized to the points' bounding box."""
+    def spread(v):
+        v = v.astype(np.uint64)
+        for shift, mask in ((8, 0x00FF00FF), (4, 0x0F0F0F0F), (2, 0x33333333), (1, 0x55555555)):
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+
+    scale = (1 << bits) - 1
+    def norm(v):
+        span = v.max() - v.min()
+        return np.zeros(v.shape) if span == 0 else (v - v.min()) / span * scale
+
+    return spread(norm(lon)) | (spread(norm(lat)) << np.uint64(1))
+
+def partition(lon, lat, batch_size):
+    """Index arrays of spatially compact batches of at most batch_size points."""
+    order = np.argsort(_morton(np.asarray(lon), np.asarray(lat)), kind='stable')
+    return [order[i:i + batch_size] for i in range(0, order.size, batch_size)]
+
+def batch_size(n_images, n_bands, max_rows=MAX_ROWS, max_values=MAX_VALUES):
+    """Points per request so that rows (points × images) and values stay under the limits."""
+    rows = max(1, max_rows // max(n_images, 1))
+    values = max(1, max_values // max(n_images * (n_bands + 2), 1))
+    return min(rows, values)
+
+# --------------------------------------------------------------------------------------------------
+# Sampling
+# --------------------------------------------------------------------------------------------------
+
+def _request(source, ids, lon, lat, scale, bands):
+    points = ee.FeatureCollection([
+        ee.Feature(ee.Geometry.Point([float(x), float(y)]), {'id': str(i)})
+        for i, x, y in zip(ids, lon, lat)
+    ])
+    if isinstance(source, ee.ImageCollection):
+        def _sample(img):
+            img = ee.Image(img)
+            return (img.select(bands).sampleRegions(collection=points, properties=['id'], scale=scale)
+                    .map(lambda f: f.set('time', img.get(TIME))))
+        samples = source.map(_sample).flatten()
+    else:
+        samples = (ee.Image(source).select(bands)
+                   .sampleRegions(collection=points, properties=['id'], scale=scale)
+                   .map(lambda f: f.set('time', ee.Image(source).get(TIME))))
+    return samples.getInfo()
+
+def _columns(features, bands):
+    props = [f['properties'] for f in features]
+    columns = {
+        'id': np.array([p.get('id', '') for p in props], dtype=str),
+        'time': np.array([p.get('time') if p.get('time') is not None else -1 for p in props], dtype=np.int64),
+    }
+    for band in bands:
+        columns[band] = np.array([np.nan if p.get(band) is None else p[band] for p in props], dtype=np.float32)
+    return columns
+
+def _concat(parts, bands):
+    names = ['id', 'time'] + list(bands)
+    if not parts:
+        dtypes = {'id': str, 'time': np.int64}
+        return {name: np.empty(0, dtype=dtypes.get(name, np.float32)) for name in names}
+    return {name: np.concatenate([p[name] for p in parts]) for name in names}
+
+def _transient(error):
+    """True for network errors and ee errors caused by throttling, quota or timeouts."""
+    if isinstance(error, (OSError, http.client.HTTPException)):
+        return True
+    message = str(error).lower()
+    return isinstance(error, ee.EEException) and any(m in message for m in TRANSIENT_MESSAGES)
+
+def _plan_key(ids, scale, bands, batches):
+    digest = hashlib.sha1()
+    digest.update(json.dumps([scale, list(bands)]).encode())
+    for idx in batches:
+        digest.update(','.join(ids[idx]).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+def sample(source, points, scale=60, bands=None, id_property='id', n_images=None, workers=8,
+           checkpoint=None, retries=3, max_rows=MAX_ROWS, max_values=MAX_VALUES):
+    """Sample an ee.Image or ee.ImageCollection at many points; returns {column: array}.
+
+    points is a local GeoJSON/CSV path, an (ids, lon, lat) tuple or a point
+    ee.FeatureCollection. bands and n_images are looked up in one round trip when not
+    given. With `checkpoint` (a directory), finished batches are stored as .npz parts and
+    skipped on the next run with the same points/scale/bands. Transport errors and ee
+    throttling/quota/timeout errors are retried with backoff; batches that still fail after
+    `retries` attempts, or fail for any other reason, are reported in a RuntimeError once all others have finished.
+    """
+    if isinstance(points, str):
+        ids, lon, lat = load_points(points, id_property)
+    elif isinstance(points, ee.FeatureCollection):
+        ids, lon, lat = fetch_points(points, id_property)
+    else:
+        ids, lon, lat = (np.asarray(a) for a in points)
+        ids = ids.astype(str)
+
+    is_collection = isinstance(source, ee.ImageCollection)
+    if bands is None or (is_collection and n_images is None):
+        first = ee.Image(source.first()) if is_collection else ee.Image(source)
+        info = ee.List([first.bandNames(), source.size() if is_collection else 1]).getInfo()
+        bands = bands or info[0]
+        n_images = n_images or info[1]
+    bands = list(bands)
+    batches = partition(lon, lat, batch_size(n_images or 1, len(bands), max_rows, max_values))
+
+    done = {}
+    if checkpoint:
+        os.makedirs(checkpoint, exist_ok=True)
+        manifest_path = os.path.join(checkpoint, 'manifest.json')
+        key = _plan_key(ids, scale, bands, batches)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('plan') != key:
+                raise ValueError(f"checkpoint {checkpoint} belongs to a different sampling plan")
+        with open(manifest_path, 'w') as f:
+            json.dump({'plan': key, 'batches': len(batches), 'bands': bands, 'scale': scale}, f)
+        for i in range(len(batches)):
+            part = os.path.join(checkpoint, f"part-{i:05d}.npz")
+            if os.path.exists(part):
+                with np.load(part) as z:
+                    done[i] = {name: z[name] for name in z.files}
+
+    def run_batch(i):
+        idx = batches[i]
+        for attempt in range(retries + 1):
+            try:
+                result = _request(source, ids[idx], lon[idx], lat[idx], scale, bands)
+                break
+            except Exception as e:
+                if attempt == retries or not _transient(e):
+                    raise
+                time.sleep(2 ** attempt)
+        columns = _columns(result.get('features', []), bands)
+        if checkpoint:
+            part = os.path.join(checkpoint, f"part-{i:05d}.npz")
+            np.savez(part + '.tmp.npz', **columns)
+            os.replace(part + '.tmp.npz', part)
+        return columns
+
+    failures = {}
+    pending = [i for i in range(len(batches)) if i not in done]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_batch, i): i for i in pending}
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                done[i] = future.result()
+            except Exception as e:
+                failures[i] = e
+
+    if failures:
+        raise RuntimeError(
+            f"{len(failures)} of {len(batches)} batches failed "
+            f"({', '.join(f'{i}: {e}' for i, e in sorted(failures.items())[:3])}); "
+            + ("rerun with the same checkpoint to resume" if checkpoint else "use checkpoint= to resume")
+        )
+    return _concat([done[i] for i in sorted(done)], bands)
+
+def to_dataframe(table):
+    """pandas DataFrame of a sample() table, with a datetime column like unit1's ee_array_to_df."""
+    import pandas as pd
+    df = pd.DataFrame(table)
+    df['datetime'] = pd.to_datetime(df['time'], unit='ms')
+    return df
@@ -0,0 +1,133 @@
+import functools
+
+import numpy as np
+from scipy import sparse
+
+import emit_cube
+
+# Local (NumPy) Savitzky–Golay smoothing and derivative spectra.
+# Works on irregular wavelength grids (wl_emit, wl_pace_rrs, ...): the coefficients for
+# every band are fitted against the actual wavelengths in its window, collected into one
+# sparse (bands × bands) filter matrix, cached, and applied to whole cubes as one matmul.
+#
+#   import emit_hyper, emit_smooth
+#   d1 = emit_smooth.savgol(cube, emit_hyper.wl_emit, window=7, order=2, deriv=1)
+
+# --------------------------------------------------------------------------------------------------
+# Filter matrices
+# --------------------------------------------------------------------------------------------------
+
+def _window_bounds(i, n, window):
+    """First/last band of the window around band i, shifted inwards at the edges."""
+    half = window // 2
+    start = min(max(i - half, 0), n - window)
+    return start, start + window
+
+@functools.lru_cache(maxsize=64)
+def _filter_matrix(wavelengths, window, order, deriv):
+    wl = np.asarray(wavelengths, dtype=float)
+    n = wl.size
+    rows, cols, vals = [], [], []
+    for i in range(n):
+        start, stop = _window_bounds(i, n, window)
+        # Vandermonde in (λ - λ_i); row `deriv` of the pseudo-inverse evaluates the
+        # deriv-th derivative of the fitted polynomial at λ_i.
+        dx = wl[start:stop] - wl[i]
+        vander = np.vander(dx, order + 1, increasing=True)
+        coeffs = np.linalg.pinv(vander)[deriv] * float(np.prod(np.arange(1, deriv + 1)))
+        rows.extend([i] * window)
+        cols.extend(range(start, stop))
+        vals.extend(coeffs)
+    matrix = sparse.csr_matrix((vals, (rows, cols)), shape=(n, n))
+    return matrix
+
+def filter_matrix(wavelengths, window=7, order=2, deriv=0):
+    """Sparse (bands × bands) Savitzky–Golay matrix for an (irregular) wavelength grid."""
+    wavelengths = tuple(float(w) for w in wavelengths)
+    if window % 2 == 0 or window < 3:
+        raise ValueError(f"window must be an odd number >= 3, got {window}")
+    if window > len(wavelengths):
+        raise ValueError(f"window ({window}) is larger than the number of bands ({len(wavelengths)})")
+    if not 0 <= deriv <= order < window:
+        raise ValueError(f"need 0 <= deriv <= order < window, got deriv={deriv}, order={order}")
+    return _filter_matrix(wavelengths, window, order, deriv)
+
+def clear_cache():
+    """Drop all cached filter matrices."""
+    _filter_matrix.cache_clear()
+
+# --------------------------------------------------------------------------------------------------
+# Application to cubes and getRegion tables
+# --------------------------------------------------------------------------------------------------
+
+def savgol(cube, wavelengths, window=7, order=2, deriv=0, axis=-1, out=None, chunk_rows=65536):
+    """Smooth (deriv=0) or differentiate a cube along its band axis.
+
+    Floating-point C-contiguous cubes with the band axis last can be filtered in place by
+    passing out=cube; integer cubes (e.g. the ×10000 int16 convention) return float32.
+    An emit_cube.Cube is read chunk by chunk (bands last) into float32 reflectance.
+    Derivatives are per nm of the supplied wavelengths.
+    """
+    matrix = filter_matrix(wavelengths, window, order, deriv)
+    if isinstance(cube, emit_cube.Cube):
+        return _savgol_cube(cube, matrix, out, chunk_rows)
+    cube = np.asarray(cube)
+    moved = np.moveaxis(cube, axis, -1)
+    nbands = moved.shape[-1]
+    if nbands != matrix.shape[0]:
+        raise ValueError(f"cube has {nbands} bands along axis {axis}, wavelengths has {matrix.shape[0]}")
+    dtype = cube.dtype if np.issubdtype(cube.dtype, np.floating) else np.float32
+    if out is None:
+        out = np.empty(cube.shape, dtype=dtype)
+    elif out.shape != cube.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {cube.shape}")
+
+    src = moved.reshape(-1, nbands)
+    dst = np.moveaxis(out, axis, -1)
+    flat = dst.reshape(-1, nbands)
+    if not np.shares_memory(flat, dst):
+        # A non-contiguous `out` cannot be viewed flat; filter into a buffer instead.
+        flat = np.empty(src.shape, dtype=out.dtype)
+    transposed = matrix.T.tocsr()
+    # Rows are independent, so filtering chunk by chunk makes out=cube safe and keeps the
+    # float temporary at one chunk.
+    for start in range(0, src.shape[0], chunk_rows):
+        block = src[start:start + chunk_rows]
+        flat[start:start + chunk_rows] = block.astype(dtype, copy=False) @ transposed
+    if not np.shares_memory(flat, dst):
+        dst[...] = flat.reshape(dst.shape)
+    return out
+
+def _savgol_cube(cube, matrix, out, chunk_rows):
+    if cube.nbands != matrix.shape[0]:
+        raise ValueError(f"cube has {cube.nbands} bands, wavelengths has {matrix.shape[0]}")
+    if out is None:
+        out = np.empty(cube.shape, dtype=np.float32)
+    transposed = matrix.T.tocsr()
+    for start, stop, block in cube.blocks():
+        flat = block.reshape(-1, cube.nbands)
+        dst = out[start:stop].reshape(-1, cube.nbands)
+        for i in range(0, flat.shape[0], chunk_rows):
+            dst[i:i + chunk_rows] = flat[i:i + chunk_rows] @ transposed
+    return out
+
+def savgol_region(table, wavelengths, window=7, order=2, deriv=0, first_band=4):
+    """Apply savgol to the pixel table returned by getRegion(...).getInfo().
+
+    The header row is kept; band columns start at `first_band` (after id, longitude,
+    latitude, time). A pixel with any masked (None) band comes back with every band None:
+    the masked band would otherwise spoil all outputs whose window includes it.
+    """
+    header, rows = table[0], table[1:]
+    if not rows:
+        return [list(header)]
+    values = np.array(
+        [[np.nan if v is None else v for v in row[first_band:]] for row in rows],
+        dtype=float,
+    )
+    masked = np.isnan(values).any(axis=1)
+    filtered = savgol(values, wavelengths, window, order, deriv, out=values)
+    result = [list(header)]
+    for row, spectrum, skip in zip(rows, filtered, masked):
+        result.append(list(row[:first_band]) + ([None] * len(spectrum) if skip else spectrum.tolist()))
+    return result
@@ -0,0 +1,373 @@
+import collections
+import hashlib
+import http.server
+import io
+import json
+import math
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+import emit_cube
+
+# Local XYZ tile server for notebook maps.
+# Replaces the getMapId round trip of unit2's image_to_tile_url: RGB composites are
+# rendered here from local cubes (or from raw EE pixels fetched once per tile) and served to
+# ipyleaflet from localhost. Two byte-bounded LRU caches sit in front of the renderer, one
+# for raw band data and one for encoded tiles keyed by (image hash, vis params, z/x/y), so
+# re-styling a layer only re-encodes:
+#
+#   server = emit_tiles.TileServer()
+#   url = server.add_layer('emit', emit_tiles.LocalSource(cube), viz1b)
+#   map.add_layer(TileLayer(url=url, name='EMIT False Colour'))
+#   url = server.set_vis('emit', {**viz1b, 'max': [0.3, 0.4, 0.2]})   # no refetch
+
+TILE = 256
+CACHE_BYTES = 256 * 2 ** 20
+
+# --------------------------------------------------------------------------------------------------
+# Byte-bounded LRU cache
+# --------------------------------------------------------------------------------------------------
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by the total size (in bytes) of its values."""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old) = self._items.popitem(last=False)
+                self.nbytes -= old
+
+    def __len__(self):
+        return len(self._items)
+
+# --------------------------------------------------------------------------------------------------
+# Web Mercator tile geometry
+# --------------------------------------------------------------------------------------------------
+
+def tile_lonlat(z, x, y, size=TILE):
+    """Pixel-centre longitudes (size,) and latitudes (size,) of an XYZ tile."""
+    n = 2 ** z
+    frac = (np.arange(size) + 0.5) / size
+    lon = (x + frac) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    return lon, lat
+
+def tile_bounds_3857(z, x, y):
+    """(xmin, ymax, pixel size) of an XYZ tile in EPSG:3857 metres."""
+    extent = 2 * math.pi * 6378137
+    size = extent / 2 ** z
+    return -extent / 2 + x * size, extent / 2 - y * size, size / TILE
+
+# --------------------------------------------------------------------------------------------------
+# Tile sources: return raw (TILE, TILE, 3) float32 band data, NaN outside the image
+# --------------------------------------------------------------------------------------------------
+
+class LocalSource:
+    """Local cube (emit_cube.Cube or (rows, cols, bands) array) on a lon/lat geotransform.
+
+    Overview pyramids (2× mean decimation) of the selected band triplet are built once, so
+    low zoom levels never touch the full-resolution cube.
+    """
+
+    def __init__(self, cube, geotransform=None, band_names=None, levels=8):
+        self.cube = cube
+        self.geotransform = geotransform or getattr(cube, 'geotransform', None)
+        if self.geotransform is None:
+            raise ValueError("a geotransform is needed to place the cube on the map")
+        self.band_names = band_names or getattr(cube, 'band_names', None)
+        self.levels = levels
+        self._pyramids = {}
+        ident = getattr(cube, 'path', None) or id(cube)
+        self.key = hashlib.sha1(repr((ident, cube.shape, tuple(self.geotransform))).encode()).hexdigest()
+
+    def band_index(self, band):
+        if isinstance(band, str):
+            if not self.band_names:
+                raise ValueError(f"band {band!r} given by name but the cube has no band names")
+            return list(self.band_names).index(band)
+        return int(band)
+
+    def pyramid(self, bands):
+        idx = tuple(self.band_index(b) for b in bands)
+        if idx not in self._pyramids:
+            if isinstance(self.cube, emit_cube.Cube):
+                base = np.concatenate([block for _, _, block in self.cube.blocks(bands=list(idx))])
+            else:
+                base = np.asarray(self.cube)[..., list(idx)].astype(np.float32)
+            levels = [base]
+            while len(levels) < self.levels and min(levels[-1].shape[:2]) > 1:
+                prev = levels[-1]
+                rows, cols = prev.shape[0] // 2 * 2, prev.shape[1] // 2 * 2
+                quads = prev[:rows, :cols].reshape(rows // 2, 2, cols // 2, 2, -1)
+                with np.errstate(invalid='ignore'):
+                    levels.append(np.nanmean(quads, axis=(1, 3)).astype(np.float32))
+            self._pyramids[idx] = levels
+        return self._pyramids[idx]
+
+    def fetch(self, bands, z, x, y):
+        levels = self.pyramid(bands)
+        lon, lat = tile_lonlat(z, x, y)
+        x0, dx, _, y0, _, dy = self.geotransform
+        tile_px = 360.0 / (TILE * 2 ** z)
+        level = int(np.clip(np.floor(np.log2(max(tile_px / abs(dx), 1))), 0, len(levels) - 1))
+        data = levels[level]
+        cols = np.floor((lon - x0) / dx / 2 ** level).astype(int)
+        rows = np.floor((lat - y0) / dy / 2 ** level).astype(int)
+        inside = (rows[:, None] >= 0) & (rows[:, None] < data.shape[0]) & \
+                 (cols[None, :] >= 0) & (cols[None, :] < data.shape[1])
+        tile = np.full((TILE, TILE, len(bands)), np.nan, dtype=np.float32)
+        if inside.any():
+            rr = np.clip(rows, 0, data.shape[0] - 1)
+            cc = np.clip(cols, 0, data.shape[1] - 1)
+            tile[inside] = data[rr[:, None], cc[None, :]][inside]
+        return tile
+
+class EESource:
+    """ee.Image source: raw pixels of each tile are fetched once with ee.data.computePixels,
+    then styled locally."""
+
+    remote = True
+
+    def __init__(self, image):
+        import ee
+        self._ee = ee
+        self.image = image
+        self.key = hashlib.sha1(image.serialize().encode()).hexdigest()
+
+    def fetch(self, bands, z, x, y):
+        xmin, ymax, px = tile_bounds_3857(z, x, y)
+        data = self._ee.data.computePixels({
+            'expression': self.image.select(list(bands)).toFloat(),
+            'fileFormat': 'NUMPY_NDARRAY',
+            'grid': {
+                'dimensions': {'width': TILE, 'height': TILE},
+                'affineTransform': {'scaleX': px, 'shearX': 0, 'translateX': xmin,
+                                    'shearY': 0, 'scaleY': -px, 'translateY': ymax},
+                'crsCode': 'EPSG:3857',
+            },
+        })
+        # Structured array with one field per band.
+        return np.stack([data[name] for name in data.dtype.names], axis=-1).astype(np.float32)
+
+# --------------------------------------------------------------------------------------------------
+# Rendering and encoding
+# --------------------------------------------------------------------------------------------------
+
+def _per_band(value, n):
+    value = np.asarray(value if value is not None else 0, dtype=np.float32)
+    return np.broadcast_to(value, (n,))
+
+def render(tile, vis):
+    """Stretch raw band data to RGBA uint8 with per-band min/max (and optional gamma).
+
+    One band renders as grey, two as red/green with an empty blue channel.
+    """
+    n = tile.shape[-1]
+    lo = _per_band(vis.get('min', 0), n)
+    hi = _per_band(vis.get('max', 1), n)
+    scaled = (tile - lo) / np.where(hi > lo, hi - lo, 1)
+    scaled = np.clip(np.nan_to_num(scaled, nan=0.0), 0, 1)
+    if 'gamma' in vis:
+        scaled **= 1 / _per_band(vis['gamma'], n)
+    rgb = (scaled * 255 + 0.5).astype(np.uint8)
+    if n == 1:
+        rgb = np.repeat(rgb, 3, axis=-1)
+    elif n == 2:
+        rgb = np.dstack([rgb, np.zeros_like(rgb[..., :1])])
+    alpha = np.where(np.isnan(tile).any(axis=-1), 0, 255).astype(np.uint8)
+    return np.dstack([rgb[..., :3], alpha])
+
+def encode_png(rgba):
+    """Minimal RGBA PNG encoder (no filtering) using only zlib."""
+    height, width, _ = rgba.shape
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, -1)]).tobytes()
+
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6))
+            + chunk(b'IEND', b''))
+
+def encode_webp(rgba):
+    """WebP via Pillow (optional dependency)."""
+    from PIL import Image
+    stream = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(stream, format='WEBP', quality=90)
+    return stream.getvalue()
+
+ENCODERS = {'png': (encode_png, 'image/png'), 'webp': (encode_webp, 'image/webp')}
+
+def vis_key(vis):
+    """Stable short hash of visualization parameters."""
+    return hashlib.sha1(json.dumps(vis, sort_keys=True, default=list).encode()).hexdigest()[:12]
+
+# --------------------------------------------------------------------------------------------------
+# Server
+# --------------------------------------------------------------------------------------------------
+
+class TileError(Exception):
+    """Tile request failure carrying the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class TileServer:
+    """Threaded localhost XYZ server; one URL template per layer and vis version.
+
+    URLs are /{layer}/{vis hash}/{z}/{x}/{y}.{fmt}. The vis hash selects the style a URL was
+    issued for (every version set on a layer stays servable), so re-styling changes the URL
+    and busts browser caches without old URLs silently rendering the new style.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, fmt='png', cache_bytes=CACHE_BYTES):
+        if fmt not in ENCODERS:
+            raise ValueError(f"fmt must be one of {tuple(ENCODERS)}, got {fmt!r}")
+        self.fmt = fmt
+        self.layers = {}
+        self.styles = {}
+        self.raw_cache = LRUCache(cache_bytes)
+        self.tile_cache = LRUCache(cache_bytes // 4)
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    body = server.handle(self.path)
+                except TileError as e:
+                    self.send_error(e.status, str(e))
+                    return
+                except Exception as e:
+                    self.send_error(500, f"{type(e).__name__}: {e}")
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', ENCODERS[server.fmt][1])
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'max-age=3600')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_layer(self, name, source, vis):
+        """Register a source with vis params ({'bands', 'min', 'max'[, 'gamma']})."""
+        if '/' in name:
+            raise ValueError(f"layer names cannot contain '/', got {name!r}")
+        self.layers[name] = (source, dict(vis))
+        self.styles[name] = {vis_key(vis): dict(vis)}
+        return self.tile_url(name)
+
+    def set_vis(self, name, vis):
+        """Re-style a layer; returns the new URL (tiles re-encode from cached raw data)."""
+        source, _ = self.layers[name]
+        self.layers[name] = (source, dict(vis))
+        self.styles[name][vis_key(vis)] = dict(vis)
+        return self.tile_url(name)
+
+    def tile_url(self, name):
+        ext = self.fmt
+        return f"{self.base_url}/{name}/{vis_key(self.layers[name][1])}/{{z}}/{{x}}/{{y}}.{ext}"
+
+    def tile(self, name, z, x, y, vis_hash=None):
+        """Encoded tile bytes, from the tile cache, the raw cache, or the source.
+
+        vis_hash picks one of the layer's vis versions (default: the current one).
+        """
+        source, vis = self.layers[name]
+        if vis_hash is not None:
+            vis = self.styles[name][vis_hash]
+        bands = tuple(vis.get('bands', (0, 1, 2)))
+        key = (source.key, vis_key(vis), self.fmt, z, x, y)
+        body = self.tile_cache.get(key)
+        if body is None:
+            raw_key = (source.key, bands, z, x, y)
+            raw = self.raw_cache.get(raw_key)
+            if raw is None:
+                try:
+                    raw = source.fetch(bands, z, x, y)
+                except Exception as e:
+                    # Remote sources failing is an upstream problem (502), not ours (500).
+                    status = 502 if getattr(source, 'remote', False) else 500
+                    raise TileError(status, f"fetching {name} {z}/{x}/{y} failed: {e}") from e
+                self.raw_cache.put(raw_key, raw, raw.nbytes)
+            body = ENCODERS[self.fmt][0](render(raw, vis))
+            self.tile_cache.put(key, body, len(body))
+        return body
+
+    def handle(self, path):
+        """Tile bytes for a request path; raises TileError with the HTTP status on failure."""
+        parts = path.split('?')[0].strip('/').split('/')
+        if len(parts) != 5:
+            raise TileError(400, f"expected /layer/vis/z/x/y.{self.fmt}, got {path!r}")
+        name, vis_hash, z, x, y = parts
+        y, _, ext = y.partition('.')
+        try:
+            z, x, y = int(z), int(x), int(y)
+        except ValueError:
+            raise TileError(400, f"non-integer tile coordinates in {path!r}") from None
+        if ext not in ('', self.fmt) or z < 0 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise TileError(400, f"no tile at {path!r}")
+        if name not in self.layers:
+            raise TileError(404, f"unknown layer {name!r}")
+        if vis_hash not in self.styles[name]:
+            raise TileError(404, f"unknown vis version {vis_hash!r} of layer {name!r}")
+        return self.tile(name, z, x, y, vis_hash)
+
+    def warm(self, name, zooms):
+        """Pre-render every tile of a local layer's footprint at the given zoom levels."""
+        source, _ = self.layers[name]
+        lon0, dx, _, lat0, _, dy = source.geotransform
+        rows, cols = source.cube.shape[:2]
+        west, east = sorted((lon0, lon0 + cols * dx))
+        south, north = sorted((lat0, lat0 + rows * dy))
+        for z in zooms:
+            n = 2 ** z
+            tx = lambda lon: int(np.clip((lon + 180) / 360 * n, 0, n - 1))
+            ty = lambda lat: int(np.clip((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n, 0, n - 1))
+            for x in range(tx(west), tx(east) + 1):
+                for y in range(ty(north), ty(south) + 1):
+                    self.tile(name, z, x, y)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
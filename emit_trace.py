@@ -0,0 +1,313 @@
+import collections
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+# Opt-in tracing of Earth Engine calls made by emit_hyper workflows.
+# While a trace is active, the ee.data entry points that hit the server (computeValue,
+# i.e. getInfo, plus getMapId and computePixels) are wrapped to record, per request, the
+# serialized graph size, node count, reduceRegion/median nodes, wall latency, payload bytes
+# and the calling function. Functions of the modules passed in are wrapped as spans so time
+# spent building graphs shows up too. Works with any module that looks like ee (e.g. the
+# fake one in benchmarks/), so it runs in CI:
+#
+#   with emit_trace.trace(modules=[emit_hyper]) as t:
+#       emit_hyper.pca(emit_hyper.emit_sr2(roi, d1, d2)).getInfo()
+#   print(t.summary())
+#   t.save_chrome_trace('trace.json')        # open in chrome://tracing or Perfetto
+
+WRAPPED_CALLS = ('computeValue', 'getMapId', 'computePixels')
+REDUCE_NODES = ('reduceRegion', 'reduceRegions')
+MEDIAN_NODES = ('median',)
+FILTER_NODES = ('filterDate', 'filterBounds', 'filter')
+
+# The tracer of the innermost active trace(). Process-wide, like the ee.data patches, so
+# @traced functions running in worker threads (e.g. emit_sample's batch pool) are
+# recorded too; each thread keeps its own span stack in the Tracer.
+_active = None
+
+# --------------------------------------------------------------------------------------------------
+# Graph analysis (cloud API serialization: {'result': id, 'values': {id: ValueNode}})
+# --------------------------------------------------------------------------------------------------
+
+def _graph_of(obj):
+    """(serialized JSON text, parsed graph) of an ee object or a request dict holding one."""
+    if isinstance(obj, dict):
+        for key in ('expression', 'image'):
+            if key in obj:
+                return _graph_of(obj[key])
+        text = json.dumps(obj, default=str)
+        return text, {}
+    if hasattr(obj, 'serialize'):
+        text = obj.serialize()
+        return text, json.loads(text)
+    return json.dumps(obj, default=str), {}
+
+def _short_name(function_name):
+    return function_name.rsplit('.', 1)[-1]
+
+def analyze(graph):
+    """Node statistics of a serialized graph.
+
+    Returns a dict with the number of function invocations ('nodes'), counts per function
+    name ('functions') and 'repeats': human-readable flags for repeated work, i.e.
+    structurally identical subgraphs that were serialized more than once, and filter chains
+    that feed more than one expensive reduction (e.g. the three identical
+    filterDate/filterBounds chains in emit_sr each followed by a separate median()).
+    """
+    values = graph.get('values', {})
+    functions = collections.Counter()
+    by_hash = collections.defaultdict(set)
+    memo = {}
+
+    def visit(node, path):
+        """Structural hash of a ValueNode; records every invocation once per path."""
+        if not isinstance(node, dict):
+            return hashlib.sha1(json.dumps(node, sort_keys=True).encode()).hexdigest()
+        if 'valueReference' in node:
+            ref = node['valueReference']
+            if ref not in memo:
+                memo[ref] = visit(values[ref], ref)
+            return memo[ref]
+        if 'functionInvocationValue' in node:
+            call = node['functionInvocationValue']
+            name = call.get('functionName', '<closure>')
+            args = {k: visit(v, f"{path}.{k}") for k, v in sorted(call.get('arguments', {}).items())}
+            digest = hashlib.sha1(json.dumps([name, args], sort_keys=True).encode()).hexdigest()
+            functions[name] += 1
+            by_hash[digest].add((path, name))
+            node_args[digest] = args
+            node_name[digest] = name
+            return digest
+        if 'arrayValue' in node:
+            parts = [visit(v, f"{path}[{i}]") for i, v in enumerate(node['arrayValue'].get('values', []))]
+            return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+        if 'dictionaryValue' in node:
+            parts = {k: visit(v, f"{path}.{k}") for k, v in sorted(node['dictionaryValue'].get('values', {}).items())}
+            return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+        if 'functionDefinitionValue' in node:
+            body = node['functionDefinitionValue'].get('body')
+            return visit({'valueReference': body}, path) if body in values else 'fn'
+        return hashlib.sha1(json.dumps(node, sort_keys=True).encode()).hexdigest()
+
+    node_args, node_name = {}, {}
+    if 'result' in graph:
+        visit({'valueReference': graph['result']}, graph['result'])
+
+    repeats = []
+    for digest, sites in by_hash.items():
+        if len(sites) > 1:
+            repeats.append(f"{node_name[digest]} subgraph serialized {len(sites)} times")
+
+    # Filter chains consumed by several reductions: walk each reduction's inputs down to
+    # the nearest filter node and count distinct reductions per chain.
+    def filter_roots(digest, seen):
+        if digest in seen or digest not in node_name:
+            return set()
+        seen.add(digest)
+        if _short_name(node_name[digest]) in FILTER_NODES:
+            return {digest}
+        found = set()
+        for child in node_args[digest].values():
+            found |= filter_roots(child, seen)
+        return found
+
+    consumers = collections.defaultdict(set)
+    for digest, name in node_name.items():
+        if _short_name(name) in REDUCE_NODES + MEDIAN_NODES or name.startswith('reduce'):
+            for root in filter_roots(digest, set()):
+                consumers[root].add(digest)
+    for root, reductions in consumers.items():
+        if len(reductions) > 1:
+            repeats.append(f"{_short_name(node_name[root])} chain feeds {len(reductions)} separate reductions")
+
+    return {
+        'nodes': sum(functions.values()),
+        'functions': dict(functions),
+        'reduce_region': sum(n for f, n in functions.items() if _short_name(f) in REDUCE_NODES),
+        'median': sum(n for f, n in functions.items() if _short_name(f) in MEDIAN_NODES),
+        'repeats': sorted(set(repeats)),
+    }
+
+# --------------------------------------------------------------------------------------------------
+# Tracer
+# --------------------------------------------------------------------------------------------------
+
+def _caller(skip_files, skip_dirs):
+    """Innermost frame outside the ee client and this module."""
+    for frame in inspect.stack(0)[2:]:
+        path = frame.filename
+        if path in skip_files or any(path.startswith(d) for d in skip_dirs):
+            continue
+        return f"{frame.function} ({os.path.basename(path)}:{frame.lineno})"
+    return '<unknown>'
+
+class Tracer:
+    """Collects request records and spans; see trace()."""
+
+    def __init__(self, ee_module):
+        self.ee = ee_module
+        self.records = []
+        self.spans = []
+        self._local = threading.local()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        ee_file = getattr(ee_module, '__file__', None)
+        self._skip_files = {__file__, ee_file}
+        self._skip_dirs = [os.path.dirname(ee_file) + os.sep] if ee_file and ee_file.endswith('__init__.py') else []
+
+    @property
+    def _stack(self):
+        """Open span names of the calling thread (innermost last)."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _now_us(self):
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def wrap_call(self, kind, call):
+        tracer = self
+
+        @functools.wraps(call)
+        def wrapper(obj, *args, **kwargs):
+            t_ser = time.perf_counter()
+            text, graph = _graph_of(obj)
+            serialize_ms = (time.perf_counter() - t_ser) * 1e3
+            stats = analyze(graph)
+            stack = tracer._stack
+            start = tracer._now_us()
+            result = call(obj, *args, **kwargs)
+            latency_us = tracer._now_us() - start
+            try:
+                payload = len(json.dumps(result, default=str))
+            except (TypeError, ValueError):
+                payload = getattr(result, 'nbytes', 0)
+            record = {
+                'kind': kind,
+                'caller': _caller(tracer._skip_files, tracer._skip_dirs),
+                'span': stack[-1] if stack else None,
+                'graph_bytes': len(text),
+                'nodes': stats['nodes'],
+                'reduce_region': stats['reduce_region'],
+                'median': stats['median'],
+                'repeats': stats['repeats'],
+                'serialize_ms': serialize_ms,
+                'latency_ms': latency_us / 1e3,
+                'payload_bytes': payload,
+                'ts_us': start,
+                'tid': threading.get_native_id(),
+            }
+            with tracer._lock:
+                tracer.records.append(record)
+            return result
+
+        return wrapper
+
+    def wrap_span(self, name, fn):
+        tracer = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stack = tracer._stack
+            start = tracer._now_us()
+            stack.append(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stack.pop()
+                with tracer._lock:
+                    tracer.spans.append({'name': name, 'ts_us': start, 'dur_us': tracer._now_us() - start,
+                                         'tid': threading.get_native_id()})
+
+        wrapper.__traced__ = fn
+        return wrapper
+
+    # ----------------------------------------------------------------------------------------------
+    # Export
+    # ----------------------------------------------------------------------------------------------
+
+    def chrome_trace(self):
+        """Trace Event Format dict (spans as 'python', requests as 'ee' complete events)."""
+        events = []
+        for span in self.spans:
+            events.append({'name': span['name'], 'cat': 'python', 'ph': 'X', 'pid': os.getpid(),
+                           'tid': span['tid'], 'ts': span['ts_us'], 'dur': span['dur_us']})
+        for rec in self.records:
+            args = {k: rec[k] for k in ('caller', 'graph_bytes', 'nodes', 'reduce_region', 'median',
+                                        'payload_bytes', 'serialize_ms', 'repeats')}
+            events.append({'name': rec['kind'], 'cat': 'ee', 'ph': 'X', 'pid': os.getpid(),
+                           'tid': rec['tid'], 'ts': rec['ts_us'], 'dur': rec['latency_ms'] * 1e3,
+                           'args': args})
+        return {'traceEvents': sorted(events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self):
+        """Plain-text table of requests grouped by calling function, plus repeated-work flags."""
+        groups = collections.OrderedDict()
+        for rec in self.records:
+            groups.setdefault((rec['span'] or rec['caller'], rec['kind']), []).append(rec)
+        header = f"{'caller':<40} {'kind':<13} {'calls':>5} {'graph KB':>9} {'nodes':>6} " \
+                 f"{'reduceRgn':>9} {'median':>6} {'latency ms':>10} {'payload KB':>10}"
+        lines = [header, '-' * len(header)]
+        for (caller, kind), recs in groups.items():
+            lines.append(
+                f"{caller[:40]:<40} {kind:<13} {len(recs):>5} "
+                f"{sum(r['graph_bytes'] for r in recs) / 1024:>9.1f} {sum(r['nodes'] for r in recs):>6} "
+                f"{sum(r['reduce_region'] for r in recs):>9} {sum(r['median'] for r in recs):>6} "
+                f"{sum(r['latency_ms'] for r in recs):>10.1f} "
+                f"{sum(r['payload_bytes'] for r in recs) / 1024:>10.1f}"
+            )
+        flags = sorted({f"{r['span'] or r['caller']}: {flag}" for r in self.records for flag in r['repeats']})
+        if flags:
+            lines += ['', 'Repeated work:'] + [f"  {flag}" for flag in flags]
+        return '\n'.join(lines)
+
+# --------------------------------------------------------------------------------------------------
+# Entry points
+# --------------------------------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def trace(ee_module=None, modules=()):
+    """Trace EE requests (and spans for the public functions of `modules`) in this block."""
+    if ee_module is None:
+        import ee as ee_module
+    tracer = Tracer(ee_module)
+    patched = []
+    for kind in WRAPPED_CALLS:
+        call = getattr(ee_module.data, kind, None)
+        if call is not None:
+            patched.append((ee_module.data, kind, call))
+            setattr(ee_module.data, kind, tracer.wrap_call(kind, call))
+    for module in modules:
+        for name, fn in list(vars(module).items()):
+            if inspect.isfunction(fn) and not name.startswith('_') and fn.__module__ == module.__name__:
+                patched.append((module, name, fn))
+                setattr(module, name, tracer.wrap_span(f"{module.__name__}.{name}", fn))
+    global _active
+    previous, _active = _active, tracer
+    try:
+        yield tracer
+    finally:
+        _active = previous
+        for owner, name, original in reversed(patched):
+            setattr(owner, name, original)
+
+def traced(fn):
+    """Decorator: record fn as a span, in any thread, whenever a trace() is active; no-op otherwise."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracer = _active
+        if tracer is None:
+            return fn(*args, **kwargs)
+        return tracer.wrap_span(fn.__qualname__, fn)(*args, **kwargs)
+    return wrapper
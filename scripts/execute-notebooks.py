@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Cached notebook execution for site builds
+
+Runs the site's notebooks cell by cell on one reused Jupyter kernel and caches
+each code cell's outputs under a hash of its source, the cells it depends on
+and its declared inputs. Only cells whose hash changed are executed, together
+with the upstream cells they need in the kernel. Every other cell is filled in
+from the cache. Outputs are written back into the .ipynb files, ready for
+`myst build --html`.
+
+Usage:
+    python scripts/execute-notebooks.py                   # notebooks in the myst.yml toc
+    python scripts/execute-notebooks.py unit2.ipynb --build
+    python scripts/execute-notebooks.py --cached-only     # never execute, fill in cached outputs
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import nbformat
+
+CACHE_VERSION = 1
+# Cells tagged like this are re-run every time (e.g. they read the clock or a live service on purpose).
+NOCACHE_TAG = "nocache"
+# Cells tagged like this are expected to fail and don't stop the notebook (MyST uses the same tag).
+RAISES_TAG = "raises-exception"
+
+
+def toc_notebooks(myst_path: Path) -> List[Path]:
+    """
+    List the notebooks in the myst.yml table of contents, in order.
+
+    Args:
+        myst_path: Path to myst.yml
+
+    Returns:
+        List[Path]: Notebook paths relative to the current directory
+    """
+    from ruamel.yaml import YAML
+    with open(myst_path, "r", encoding="utf-8") as f:
+        config = YAML(typ="safe").load(f)
+
+    notebooks = []
+    def walk(entries):
+        for entry in entries or []:
+            if str(entry.get("file", "")).endswith(".ipynb"):
+                notebooks.append(myst_path.parent / entry["file"])
+            walk(entry.get("children"))
+    walk(config.get("project", {}).get("toc"))
+    return notebooks
+
+
+# --------------------------------------------------------------------------------------------------
+# Cell dependencies
+# --------------------------------------------------------------------------------------------------
+
+def cell_names(source: str) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    Find the names a code cell defines and uses.
+
+    Assignments, imports, def/class, attribute or item assignment (`x.a = ...`,
+    `x[i] = ...`) and method calls anywhere in the cell (`x.update(...)`,
+    `Map.addLayer(...)` inside a loop, `y = x.pop()`) all count as defining a name,
+    so in-place changes are tracked too.
+
+    Args:
+        source: Cell source
+
+    Returns:
+        Optional[Tuple[Set[str], Set[str]]]: (defines, uses), or None if the cell can't be
+            analysed (cell magics, star imports, syntax errors) and must be treated as
+            depending on, and defining, everything
+    """
+    if source.lstrip().startswith("%%"):
+        return None
+    # Line magics and shell escapes don't define Python names
+    lines = [line for line in source.splitlines() if not line.lstrip().startswith(("%", "!"))]
+    try:
+        tree = ast.parse("\n".join(lines))
+    except SyntaxError:
+        return None
+
+    defines, uses = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (defines if isinstance(node.ctx, (ast.Store, ast.Del)) else uses).add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defines.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    return None
+                defines.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            base = node.value
+            while isinstance(base, (ast.Attribute, ast.Subscript)):
+                base = base.value
+            if isinstance(base, ast.Name):
+                defines.add(base.id)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            # Any method call, at any depth, may change its object in place
+            base = node.func
+            while isinstance(base, (ast.Attribute, ast.Call, ast.Subscript)):
+                base = base.func if isinstance(base, ast.Call) else base.value
+            if isinstance(base, ast.Name):
+                defines.add(base.id)
+    return defines, uses
+
+
+def cell_dependencies(sources: List[str]) -> List[Set[int]]:
+    """
+    For each code cell, the earlier code cells it directly depends on.
+
+    A cell depends on the earlier cells that define each name it uses: the latest one
+    that bound the name without reading it (`m = Map()`), and every cell since that
+    changed it in place (`m.addLayer(...)`, `m = m + 1`). Cells that can't be analysed
+    depend on all earlier cells, and every later cell depends on them.
+
+    Args:
+        sources: Code cell sources in notebook order
+
+    Returns:
+        List[Set[int]]: Indices (into sources) of direct dependencies
+    """
+    definers: Dict[str, Set[int]] = {}
+    barrier: Optional[int] = None
+    deps: List[Set[int]] = []
+    for i, source in enumerate(sources):
+        names = cell_names(source)
+        if names is None:
+            deps.append(set(range(i)))
+            barrier = i
+            continue
+        defines, uses = names
+        direct = {j for name in uses for j in definers.get(name, ())}
+        if barrier is not None:
+            direct.add(barrier)
+        deps.append(direct)
+        for name in defines:
+            if name in uses:
+                definers.setdefault(name, set()).add(i)
+            else:
+                definers[name] = {i}
+    return deps
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's content ('missing' if it does not exist)."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return "missing"
+
+
+def cell_keys(nb, nb_dir: Path, kernel_name: str) -> Tuple[List[int], List[str], List[Set[int]]]:
+    """
+    Compute cache keys for the code cells of a notebook.
+
+    A key hashes the kernel name, the cell source, the keys of the cells it depends
+    on, and the content of its declared inputs. Declared inputs are the files listed
+    in the cell's `inputs` metadata plus the notebook's `execution_cache.inputs`
+    metadata. Markdown cells are not part of any key.
+
+    Args:
+        nb: Notebook (nbformat node)
+        nb_dir: Directory that input paths are relative to
+        kernel_name: Kernel the notebook runs on
+
+    Returns:
+        Tuple[List[int], List[str], List[Set[int]]]: Notebook indices of code cells,
+            their keys and their direct dependencies (as positions in the first list)
+    """
+    code = [i for i, cell in enumerate(nb.cells) if cell.cell_type == "code"]
+    sources = [nb.cells[i].source for i in code]
+    deps = cell_dependencies(sources)
+    shared_inputs = nb.metadata.get("execution_cache", {}).get("inputs", [])
+
+    keys: List[str] = []
+    for position, i in enumerate(code):
+        inputs = sorted(set(shared_inputs) | set(nb.cells[i].metadata.get("inputs", [])))
+        payload = [CACHE_VERSION, kernel_name, sources[position],
+                   sorted(keys[d] for d in deps[position]),
+                   [(name, file_digest(nb_dir / name)) for name in inputs]]
+        keys.append(hashlib.sha256(json.dumps(payload).encode()).hexdigest())
+    return code, keys, deps
+
+
+# --------------------------------------------------------------------------------------------------
+# Cache
+# --------------------------------------------------------------------------------------------------
+
+def cache_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / key[:2] / f"{key}.json"
+
+
+def cache_load(cache_dir: Path, key: str) -> Optional[dict]:
+    """Cached {'outputs', 'execution_count'} for a key, or None."""
+    try:
+        with open(cache_path(cache_dir, key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def cache_store(cache_dir: Path, key: str, outputs: list, execution_count: Optional[int]) -> None:
+    path = cache_path(cache_dir, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"outputs": outputs, "execution_count": execution_count}, f)
+    os.replace(tmp_path, path)
+
+
+# --------------------------------------------------------------------------------------------------
+# Kernel
+# --------------------------------------------------------------------------------------------------
+
+class Kernel:
+    """A Jupyter kernel reused across notebooks, executing one cell at a time."""
+
+    def __init__(self, kernel_name: str, cwd: Path):
+        from jupyter_client.manager import start_new_kernel
+        self.name = kernel_name
+        self.km, self.kc = start_new_kernel(kernel_name=kernel_name, cwd=str(cwd))
+
+    def reset(self, cwd: Path) -> None:
+        """Clear the user namespace (imported modules stay loaded) and change directory."""
+        self.execute(f"%reset -f\nimport os as _os\n_os.chdir({str(cwd)!r})\ndel _os", store_history=False)
+
+    def execute(self, source: str, timeout: Optional[float] = None,
+                store_history: bool = True) -> Tuple[list, Optional[int], bool]:
+        """
+        Run one cell.
+
+        Args:
+            source: Cell source
+            timeout: Seconds to wait for the cell to finish (None: no limit)
+            store_history: Count the cell in the kernel's execution history
+
+        Returns:
+            Tuple[list, Optional[int], bool]: nbformat outputs, execution count, and whether it succeeded
+
+        Raises:
+            TimeoutError: If the cell ran out of time; the kernel is restarted first, so
+                it is clean (and empty) for the next notebook
+        """
+        msg_id = self.kc.execute(source, store_history=store_history, allow_stdin=False)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        outputs: list = []
+        clear_pending = False
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                msg = self.kc.get_iopub_msg(timeout=remaining)
+            except queue.Empty:
+                self.restart()
+                raise TimeoutError(f"cell did not finish within {timeout}s")
+            if msg["parent_header"].get("msg_id") != msg_id:
+                continue
+            msg_type = msg["msg_type"]
+            if msg_type == "status" and msg["content"]["execution_state"] == "idle":
+                break
+            if msg_type == "clear_output":
+                if msg["content"].get("wait"):
+                    clear_pending = True
+                else:
+                    outputs = []
+                continue
+            if msg_type not in ("stream", "display_data", "execute_result", "error"):
+                continue
+            if clear_pending:
+                outputs, clear_pending = [], False
+            output = nbformat.v4.output_from_msg(msg)
+            if (msg_type == "stream" and outputs and outputs[-1].output_type == "stream"
+                    and outputs[-1].name == output.name):
+                outputs[-1].text += output.text
+            else:
+                outputs.append(output)
+
+        # Skip replies to anything else (e.g. an earlier request abandoned on timeout).
+        while True:
+            try:
+                reply = self.kc.get_shell_msg(timeout=None if deadline is None else max(1.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.restart()
+                raise TimeoutError(f"no reply to the cell within {timeout}s")
+            if reply["parent_header"].get("msg_id") == msg_id:
+                return outputs, reply["content"].get("execution_count"), reply["content"]["status"] == "ok"
+
+    def restart(self) -> None:
+        """Restart the kernel process with a fresh client, dropping any queued messages."""
+        self.kc.stop_channels()
+        self.km.restart_kernel(now=True)
+        self.kc = self.km.client()
+        self.kc.start_channels()
+        self.kc.wait_for_ready(timeout=60)
+
+    def shutdown(self) -> None:
+        self.kc.stop_channels()
+        self.km.shutdown_kernel(now=True)
+
+
+# --------------------------------------------------------------------------------------------------
+# Notebooks
+# --------------------------------------------------------------------------------------------------
+
+def run_notebook(path: Path, cache_dir: Path, kernels: Dict[str, "Kernel"], cached_only: bool = False,
+                 timeout: Optional[float] = None) -> dict:
+    """
+    Bring a notebook's outputs up to date, executing only invalidated cells.
+
+    Args:
+        path: Notebook to update in place
+        cache_dir: Directory of cached cell outputs
+        kernels: Running kernels by name; started on first use and reused across notebooks
+        cached_only: Never execute; only fill in outputs that are already cached
+        timeout: Per-cell timeout in seconds
+
+    Returns:
+        dict: Counts of executed/cached/missing cells, whether the file was written, and an error message if a cell failed
+    """
+    nb = nbformat.read(path, as_version=4)
+    nb_dir = path.parent.resolve()
+    kernel_name = nb.metadata.get("kernelspec", {}).get("name", "python3")
+    code, keys, deps = cell_keys(nb, nb_dir, kernel_name)
+
+    cached = {}
+    for position, key in enumerate(keys):
+        if NOCACHE_TAG in nb.cells[code[position]].metadata.get("tags", []):
+            continue
+        entry = cache_load(cache_dir, key)
+        if entry is not None:
+            cached[position] = entry
+    stale = [position for position in range(len(code)) if position not in cached]
+
+    # Stale cells need the upstream cells they depend on to have run in this kernel session
+    to_run: Set[int] = set()
+    pending = list(stale)
+    while pending:
+        position = pending.pop()
+        if position not in to_run:
+            to_run.add(position)
+            pending.extend(deps[position])
+
+    report = {"executed": 0, "for_state": 0, "cached": 0, "missing": 0, "written": False, "error": None}
+    if cached_only:
+        report["missing"] = len(stale)
+        to_run = set()
+    elif to_run:
+        if kernel_name not in kernels:
+            kernels[kernel_name] = Kernel(kernel_name, nb_dir)
+        kernel = kernels[kernel_name]
+        kernel.reset(nb_dir)
+
+    changed = False
+    for position, i in enumerate(code):
+        cell = nb.cells[i]
+        if report["error"] is None and position in to_run:
+            try:
+                outputs, execution_count, ok = kernel.execute(cell.source, timeout)
+            except TimeoutError as e:
+                report["error"] = f"cell {i}: {e}"
+                continue
+            if not ok and RAISES_TAG not in cell.metadata.get("tags", []):
+                report["error"] = f"cell {i} raised an exception"
+                continue
+            report["executed" if position in stale else "for_state"] += 1
+            cache_store(cache_dir, keys[position], outputs, execution_count)
+        elif position in cached:
+            outputs, execution_count = cached[position]["outputs"], cached[position]["execution_count"]
+            report["cached"] += 1
+        else:
+            continue
+        outputs = [nbformat.from_dict(output) for output in outputs]
+        if cell.outputs != outputs or cell.execution_count != execution_count:
+            cell.outputs, cell.execution_count = outputs, execution_count
+            changed = True
+
+    if changed and report["error"] is None:
+        nbformat.write(nb, path)
+        report["written"] = True
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Execute the site's notebooks with a per-cell output cache, then optionally build the site."
+    )
+    parser.add_argument("notebooks", nargs="*", type=Path,
+                        help="Notebooks to update (default: the .ipynb files in the myst.yml toc)")
+    parser.add_argument("--myst", type=Path, default=Path("myst.yml"), help="myst.yml with the toc (default: ./myst.yml)")
+    parser.add_argument("--cache-dir", type=Path, default=Path(".nbcache"), help="Cell output cache (default: .nbcache)")
+    parser.add_argument("--cached-only", action="store_true",
+                        help="Never execute; fill in cached outputs and report cells without one")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-cell timeout in seconds (default: none)")
+    parser.add_argument("--build", action="store_true", help="Run `myst build --html` once all notebooks are up to date")
+    args = parser.parse_args()
+
+    notebooks = args.notebooks or toc_notebooks(args.myst)
+    if not notebooks:
+        print("No notebooks to execute")
+
+    kernels: Dict[str, Kernel] = {}
+    failed = False
+    try:
+        for path in notebooks:
+            start = time.monotonic()
+            report = run_notebook(path, args.cache_dir, kernels, args.cached_only, args.timeout)
+            elapsed = time.monotonic() - start
+            detail = (f"{report['executed']} executed, {report['for_state']} re-run for state, "
+                      f"{report['cached']} from cache")
+            if report["missing"]:
+                detail += f", {report['missing']} not cached"
+            if report["error"]:
+                failed = True
+                print(f"❌ {path}: {report['error']} ({detail}); notebook left unchanged")
+            else:
+                print(f"✓ {path}: {detail}{', written' if report['written'] else ''} ({elapsed:.1f}s)")
+    finally:
+        for kernel in kernels.values():
+            kernel.shutdown()
+
+    if failed:
+        sys.exit(1)
+    if args.build:
+        print("Building site with `myst build --html`...")
+        sys.exit(subprocess.run(["myst", "build", "--html"]).returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Shared GitHub REST client for the course admin scripts
+
+Talks to the GitHub API in-process over keep-alive HTTPS connections (one per
+thread), instead of starting a `gh` process per call. Handles pagination,
+ETag conditional requests and the retry policy shared with the `gh` fallback.
+
+Usage:
+    from github_client import get_client
+
+    client = get_client()       # None if no token is available; fall back to gh
+    if client:
+        teams = client.paginate("/orgs/berkeley-stat123/teams")
+        client.request("PUT", "/orgs/berkeley-stat123/teams/instructors-fall-2025/memberships/ta1",
+                       {"role": "member"})
+"""
+
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+API_URL = "https://api.github.com"
+MAX_RETRIES = 5
+MAX_BACKOFF = 60
+# Substrings of error output that mean "slow down and retry" rather than a real failure.
+RATE_LIMIT_MARKERS = ("rate limit", "HTTP 429", "secondary rate", "abuse detection")
+# Errors that mean a kept-alive connection was closed by the server while idle.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class GitHubError(Exception):
+    """A GitHub API request that failed (after retries)."""
+
+    def __init__(self, method: str, path: str, status: int, message: str):
+        super().__init__(f"{method} {path} failed with HTTP {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+def is_rate_limited(text: Optional[str]) -> bool:
+    """
+    Check whether error output reports a (primary or secondary) rate limit.
+
+    Args:
+        text: Error output of a failed gh command or an API error message
+
+    Returns:
+        bool: True if the request should be retried after a delay
+    """
+    text = (text or "").lower()
+    return any(marker.lower() in text for marker in RATE_LIMIT_MARKERS)
+
+
+def backoff(attempt: int, retry_after: Optional[float] = None) -> None:
+    """
+    Sleep before retry number `attempt` (0-based): exponential with jitter, or as the server asks.
+
+    Args:
+        attempt: Number of attempts that already failed, minus one
+        retry_after: Seconds the server asked us to wait, if it said
+    """
+    if retry_after is not None:
+        time.sleep(max(0.0, retry_after) + random.uniform(0, 1))
+    else:
+        time.sleep(min(MAX_BACKOFF, 2 ** attempt) + random.uniform(0, 1))
+
+
+def find_token() -> Optional[str]:
+    """
+    Find a GitHub token: GH_TOKEN or GITHUB_TOKEN, else the one `gh` is logged in with.
+
+    Returns:
+        Optional[str]: The token, or None if there is none
+    """
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    try:
+        result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class GitHubClient:
+    """
+    Minimal GitHub REST client with pooled keep-alive connections.
+
+    Safe to share between threads: each thread keeps its own connection, and
+    the ETag cache is shared.
+    """
+
+    def __init__(self, token: str, base_url: str = API_URL, max_retries: int = MAX_RETRIES,
+                 timeout: float = 30):
+        url = urlsplit(base_url)
+        self.scheme = url.scheme
+        self.host = url.netloc
+        self.prefix = url.path.rstrip("/")
+        self.token = token
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+        self._local = threading.local()
+        self._etags: Dict[Tuple[str, str], Tuple[str, object, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _connection(self, fresh: bool = False) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, timeout=self.timeout)
+        return conn
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str],
+              resend: bool = True):
+        """
+        One HTTP exchange; reconnects once if the kept-alive connection went stale.
+
+        Errors raised while the request was still being written are marked with
+        request_sent = False. Once a request is written, the server may have acted on
+        it even if the response was lost, so it is only sent again when resend is True.
+        Any error drops the thread's connection, since http.client cannot reuse one
+        left mid-exchange (e.g. after a read timeout).
+        """
+        for fresh in (False, True):
+            conn = self._connection(fresh)
+            try:
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                e.request_sent = False
+                if fresh or not isinstance(e, STALE_CONNECTION_ERRORS):
+                    raise
+                continue
+            try:
+                response = conn.getresponse()
+                return response.status, response.getheaders(), response.read()
+            except Exception as e:
+                self.close()
+                if fresh or not resend or not isinstance(e, STALE_CONNECTION_ERRORS):
+                    raise
+
+    def request_full(self, method: str, path: str, fields: Optional[dict] = None,
+                     accept: str = "application/vnd.github+json") -> Tuple[object, Dict[str, str]]:
+        """
+        Make an API request, retrying rate limits, server errors and dropped connections.
+
+        GET responses are cached by ETag and revalidated with If-None-Match, so a
+        repeated read costs a 304 that does not count against the rate limit.
+
+        POST is not idempotent (a retried team or repository creation could run
+        twice), so it is only retried when the server clearly did not act on it:
+        429 or a rate-limited 403, or a connection that failed before the request
+        was sent. Server errors and lost responses fail a POST immediately.
+
+        Args:
+            method: HTTP method
+            path: API path, optionally with a query string (e.g. /orgs/x/teams?per_page=100)
+            fields: JSON body for non-GET requests, or query parameters for GET
+            accept: Accept header (media type)
+
+        Returns:
+            Tuple[object, Dict[str, str]]: Decoded JSON body ({} if empty) and lowercase response headers
+
+        Raises:
+            GitHubError: If the request fails for good
+        """
+        body = None
+        if fields and method == "GET":
+            path += ("&" if "?" in path else "?") + urlencode(fields)
+        elif fields is not None:
+            body = json.dumps(fields).encode()
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": accept,
+            "User-Agent": "course-admin-scripts",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        key = (path, accept)
+        cached = self._etags.get(key) if method == "GET" else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        idempotent = method != "POST"
+        for attempt in range(self.max_retries + 1):
+            try:
+                status, raw_headers, payload = self._send(method, path, body, headers, resend=idempotent)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.max_retries or (not idempotent and getattr(e, "request_sent", True)):
+                    raise GitHubError(method, path, 0, str(e))
+                self.stats["retries"] += 1
+                backoff(attempt)
+                continue
+            self.stats["requests"] += 1
+            response_headers = {name.lower(): value for name, value in raw_headers}
+
+            if status == 304 and cached:
+                self.stats["not_modified"] += 1
+                return cached[1], {**response_headers, "link": cached[2] or ""}
+            try:
+                data = json.loads(payload) if payload.strip() else {}
+            except ValueError:
+                data = {"message": payload.decode(errors="replace")[:200]}
+            if status < 300:
+                if method == "GET" and "etag" in response_headers:
+                    with self._lock:
+                        self._etags[key] = (response_headers["etag"], data, response_headers.get("link"))
+                return data, response_headers
+
+            message = data.get("message", "") if isinstance(data, dict) else str(data)
+            retry_after = self._retry_after(status, response_headers, message)
+            if retry_after is False or attempt == self.max_retries or (not idempotent and status >= 500):
+                raise GitHubError(method, path, status, message)
+            self.stats["retries"] += 1
+            backoff(attempt, retry_after)
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _retry_after(status: int, headers: Dict[str, str], message: str):
+        """Seconds to wait before retrying, None for plain backoff, False if not retryable."""
+        if status == 429 or (status == 403 and (headers.get("x-ratelimit-remaining") == "0"
+                                                or is_rate_limited(message))):
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+            if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                wait = int(headers["x-ratelimit-reset"]) - time.time()
+                print(f"GitHub rate limit reached, waiting {wait:.0f}s for it to reset...")
+                return wait
+            return None
+        if status >= 500:
+            return None
+        return False
+
+    def request(self, method: str, path: str, fields: Optional[dict] = None,
+                accept: str = "application/vnd.github+json") -> object:
+        """
+        Make an API request and return the decoded JSON body ({} if empty).
+
+        See request_full for arguments and errors.
+        """
+        return self.request_full(method, path, fields, accept)[0]
+
+    def paginate(self, path: str, accept: str = "application/vnd.github+json") -> List[dict]:
+        """
+        GET every page of a list endpoint by following Link: rel="next".
+
+        Args:
+            path: API path of a list endpoint, optionally with a query string
+            accept: Accept header (media type)
+
+        Returns:
+            List[dict]: Items from all pages
+        """
+        if "per_page=" not in path:
+            path += ("&" if "?" in path else "?") + "per_page=100"
+        items: List[dict] = []
+        while path:
+            page, headers = self.request_full("GET", path, accept=accept)
+            items.extend(page)
+            match = re.search(r'<([^>]+)>;\s*rel="next"', headers.get("link", ""))
+            if match:
+                url = urlsplit(match.group(1))
+                path = url.path[len(self.prefix):] + (f"?{url.query}" if url.query else "")
+            else:
+                path = None
+        return items
+
+    def close(self) -> None:
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_client: Optional[GitHubClient] = None
+_client_resolved = False
+_client_lock = threading.Lock()
+
+
+def get_client() -> Optional[GitHubClient]:
+    """
+    Shared client for this process, or None to fall back to the `gh` CLI.
+
+    Set GITHUB_API_URL to point the scripts at another API endpoint (e.g. a
+    local stand-in), or GH_ADMIN_USE_CLI=1 to always use `gh`.
+
+    Returns:
+        Optional[GitHubClient]: The client, or None if disabled or no token was found
+    """
+    global _client, _client_resolved
+    if os.environ.get("GH_ADMIN_USE_CLI"):
+        return None
+    with _client_lock:
+        if not _client_resolved:
+            token = find_token()
+            if token:
+                _client = GitHubClient(token, os.environ.get("GITHUB_API_URL", API_URL))
+            _client_resolved = True
+        return _client
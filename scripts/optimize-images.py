@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Responsive image variants for the course site
+
+Finds the raster images the site references (markdown and notebook pages in the
+myst.yml toc, staff.yml photos, the site logo), and makes full-size and resized
+WebP variants of each in a process pool. The variants are cached by content hash,
+so unchanged images are skipped. It then rewrites the <img> tags of the built
+HTML to serve them, and reports the bytes saved per page.
+
+Usage:
+    myst build --html
+    python scripts/optimize-images.py --html _build/html
+    python scripts/optimize-images.py --widths 480,960 --quality 75
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+DEFAULT_WIDTHS = (480, 960, 1600)
+
+MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)")
+DIRECTIVE_IMAGE = re.compile(r"^\s*[:`]{3,}\s*\{(?:image|figure)\}\s+(\S+)", re.MULTILINE)
+HTML_IMAGE = re.compile(r"<img\b[^>]*?\bsrc=[\"']([^\"']+)[\"']", re.IGNORECASE)
+IMG_TAG = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+SRC_ATTR = re.compile(r"\bsrc=([\"'])([^\"']+)\1", re.IGNORECASE)
+
+
+def load_yaml(path: Path):
+    from ruamel.yaml import YAML
+    with open(path, "r", encoding="utf-8") as f:
+        return YAML(typ="safe").load(f)
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's content."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+# --------------------------------------------------------------------------------------------------
+# Finding images
+# --------------------------------------------------------------------------------------------------
+
+def page_sources(root: Path) -> List[Path]:
+    """Markdown and notebook pages in the myst.yml toc."""
+    config = load_yaml(root / "myst.yml")
+    pages = []
+    def walk(entries):
+        for entry in entries or []:
+            if "file" in entry:
+                pages.append(root / entry["file"])
+            walk(entry.get("children"))
+    walk(config.get("project", {}).get("toc"))
+    return [page for page in pages if page.exists()]
+
+
+def page_text(page: Path) -> str:
+    """Text to search for image references: the file, or a notebook's markdown cells."""
+    if page.suffix == ".ipynb":
+        with open(page, "r", encoding="utf-8") as f:
+            cells = json.load(f).get("cells", [])
+        return "\n".join("".join(cell["source"]) for cell in cells if cell.get("cell_type") == "markdown")
+    return page.read_text(encoding="utf-8")
+
+
+def find_images(root: Path) -> Dict[Path, Set[str]]:
+    """
+    Map every local raster image the site uses to the pages that use it.
+
+    Args:
+        root: Site directory (with myst.yml)
+
+    Returns:
+        Dict[Path, Set[str]]: Image path -> names of referencing pages ("all pages" for the logo)
+    """
+    images: Dict[Path, Set[str]] = {}
+    def add(reference: str, base: Path, page: str):
+        if re.match(r"^[a-z]+:", reference):
+            return
+        path = (base / reference.split("#")[0].split("?")[0]).resolve()
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.exists():
+            images.setdefault(path, set()).add(page)
+
+    for page in page_sources(root):
+        text = page_text(page)
+        for pattern in (MARKDOWN_IMAGE, DIRECTIVE_IMAGE, HTML_IMAGE):
+            for reference in pattern.findall(text):
+                add(reference, page.parent, page.name)
+
+    # The staff plugin renders staff.yml photos on the staff page
+    if (root / "staff.yml").exists():
+        for person in load_yaml(root / "staff.yml") or []:
+            if person.get("photo"):
+                add(person["photo"], root, "staff.md")
+
+    logo = (load_yaml(root / "myst.yml").get("site", {}).get("options", {}) or {}).get("logo")
+    if logo:
+        add(logo, root, "all pages")
+    return images
+
+
+# --------------------------------------------------------------------------------------------------
+# Variants
+# --------------------------------------------------------------------------------------------------
+
+def image_size(path: Path) -> Tuple[int, int]:
+    """(width, height) from a PNG, WebP or JPEG header, without decoding the image."""
+    with open(path, "rb") as f:
+        data = f.read(30)
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return struct.unpack(">II", data[16:24])
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            # Some "png" files in the repo are WebP; size is in the VP8/VP8L/VP8X chunk
+            chunk = data[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(data[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (int.from_bytes(data[24:27], "little") + 1,
+                        int.from_bytes(data[27:30], "little") + 1)
+        if data[:2] != b"\xff\xd8":
+            raise ValueError(f"not a PNG, WebP or JPEG image: {path}")
+        f.seek(2)
+        while True:
+            marker, segment = struct.unpack(">HH", f.read(4))
+            if marker in (0xFFC0, 0xFFC1, 0xFFC2):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(segment - 2, os.SEEK_CUR)
+
+
+def make_variants(src: Path, out_dir: Path, widths: Tuple[int, ...], quality: int) -> dict:
+    """
+    Write WebP variants of one image into out_dir, at full size and at each smaller target width.
+
+    Uses Pillow when it is installed, otherwise `cwebp` from libwebp (pinned in
+    environment.yml).
+
+    Args:
+        src: Source image
+        out_dir: Directory for this image's variants (content-addressed)
+        widths: Target widths; only those below the original width are made
+        quality: WebP quality (0-100)
+
+    Returns:
+        dict: Metadata with the original size and the variant files with their widths and bytes
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    width, height = image_size(src)
+    targets = sorted({w for w in widths if w < width} | {width})
+    variants = {}
+
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    if Image is not None:
+        with Image.open(src) as original:
+            base = original.convert("RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB")
+        for w in targets:
+            img = base if w == width else base.resize((w, round(height * w / width)), Image.LANCZOS)
+            variants[w] = f"{w}.webp"
+            img.save(out_dir / variants[w], "WEBP", quality=quality, method=6)
+    else:
+        for w in targets:
+            variants[w] = f"{w}.webp"
+            command = ["cwebp", "-quiet", "-q", str(quality), "-m", "6"]
+            if w != width:
+                command += ["-resize", str(w), "0"]
+            subprocess.run(command + [str(src), "-o", str(out_dir / variants[w])], check=True)
+
+    meta = {
+        "width": width,
+        "height": height,
+        "bytes": src.stat().st_size,
+        "webp": {str(w): {"file": name, "bytes": (out_dir / name).stat().st_size}
+                 for w, name in variants.items()},
+    }
+    return meta
+
+
+def optimize_image(src: Path, digest: str, cache_dir: Path, widths: Tuple[int, ...], quality: int) -> dict:
+    """Variants of one image, from the cache if it was already processed with the same settings."""
+    out_dir = cache_dir / digest
+    meta_path = out_dir / "meta.json"
+    settings = {"widths": list(widths), "quality": quality}
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("settings") == settings:
+            meta["cached"] = True
+            return meta
+    meta = make_variants(src, out_dir, widths, quality)
+    meta["settings"] = settings
+    meta_path.write_text(json.dumps(meta, indent=2))
+    meta["cached"] = False
+    return meta
+
+
+# --------------------------------------------------------------------------------------------------
+# Built HTML
+# --------------------------------------------------------------------------------------------------
+
+def resolve_built(src: str, page: Path, html_dir: Path) -> Optional[Path]:
+    """Local file an <img src> of a built page points to, allowing for a BASE_URL prefix."""
+    if re.match(r"^([a-z]+:|//)", src):
+        return None
+    src = html.unescape(src).split("#")[0].split("?")[0]
+    if not src.startswith("/"):
+        candidate = page.parent / src
+        return candidate if candidate.is_file() else None
+    parts = src.lstrip("/").split("/")
+    for skip in (0, 1):  # with or without a BASE_URL such as /<repository>
+        candidate = html_dir.joinpath(*parts[skip:])
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def rewrite_html(html_dir: Path, optimized: Dict[str, dict], cache_dir: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    Point <img> tags of the built site at the WebP variants, with a srcset for each width.
+
+    Built images are matched to source images by content hash, since MyST renames
+    them. Variants are copied next to the built image. Tags that already have a
+    srcset, and images whose WebP is not smaller, are left alone.
+
+    Args:
+        html_dir: Built site (e.g. _build/html)
+        optimized: Image metadata by content hash, from optimize_image
+        cache_dir: Cache directory holding the variants
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Page -> (original image bytes, full-size WebP bytes) for rewritten images
+    """
+    digests: Dict[Path, Optional[str]] = {}
+    copied: Set[Path] = set()
+    report: Dict[str, Tuple[int, int]] = {}
+
+    for page in sorted(html_dir.rglob("*.html")):
+        text = page.read_text(encoding="utf-8")
+        seen: Set[str] = set()
+        before = after = 0
+
+        def replace(match):
+            nonlocal before, after
+            tag = match.group(0)
+            src_match = SRC_ATTR.search(tag)
+            if not src_match or re.search(r"\bsrcset=", tag, re.IGNORECASE):
+                return tag
+            built = resolve_built(src_match.group(2), page, html_dir)
+            if built is None:
+                return tag
+            if built not in digests:
+                digests[built] = file_digest(built)
+            meta = optimized.get(digests[built])
+            if meta is None:
+                return tag
+            full = meta["webp"][str(meta["width"])]
+            if full["bytes"] >= meta["bytes"]:
+                return tag
+
+            stem = built.stem
+            if built not in copied:
+                for w, variant in meta["webp"].items():
+                    shutil.copyfile(cache_dir / digests[built] / variant["file"], built.with_name(f"{stem}-{w}.webp"))
+                copied.add(built)
+            prefix = src_match.group(2).rsplit("/", 1)[0] + "/" if "/" in src_match.group(2) else ""
+            srcset = ", ".join(f"{prefix}{stem}-{w}.webp {w}w"
+                               for w in sorted(meta["webp"], key=int))
+            if digests[built] not in seen:
+                seen.add(digests[built])
+                before += meta["bytes"]
+                after += full["bytes"]
+            quote = src_match.group(1)
+            new_src = f"src={quote}{prefix}{stem}-{meta['width']}.webp{quote}"
+            extra = (f' srcset="{srcset}" sizes="(max-width: {meta["width"]}px) 100vw, {meta["width"]}px"')
+            return tag[:src_match.start()] + new_src + extra + tag[src_match.end():]
+
+        updated = IMG_TAG.sub(replace, text)
+        if updated != text:
+            page.write_text(updated, encoding="utf-8")
+            report[str(page.relative_to(html_dir))] = (before, after)
+    return report
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Make cached responsive/WebP variants of the site's images and serve them from the built HTML."
+    )
+    parser.add_argument("--root", type=Path, default=Path("."), help="Site directory with myst.yml (default: .)")
+    parser.add_argument("--html", type=Path, default=None,
+                        help="Built site to rewrite (e.g. _build/html); without it only the variants are made")
+    parser.add_argument("--cache-dir", type=Path, default=Path(".imgcache"), help="Variant cache (default: .imgcache)")
+    parser.add_argument("--widths", default=",".join(map(str, DEFAULT_WIDTHS)),
+                        help="Comma-separated variant widths in pixels (default: 480,960,1600)")
+    parser.add_argument("--quality", type=int, default=80, help="WebP quality (default: 80)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    root = args.root.resolve()
+    cache_dir = args.cache_dir.resolve()
+    widths = tuple(int(w) for w in args.widths.split(","))
+
+    images = find_images(root)
+    digests = {path: file_digest(path) for path in images}
+    print(f"Found {len(images)} image(s) referenced by the site")
+
+    optimized: Dict[str, dict] = {}
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {}
+        for path, digest in digests.items():
+            if digest not in futures.values():
+                futures[pool.submit(optimize_image, path, digest, cache_dir, widths, args.quality)] = digest
+        for future in as_completed(futures):
+            try:
+                optimized[futures[future]] = future.result()
+            except Exception as e:
+                failed = True
+                names = [str(p.relative_to(root)) for p, d in digests.items() if d == futures[future]]
+                print(f"❌ {', '.join(names)}: {e}")
+
+    generated = sum(1 for meta in optimized.values() if not meta["cached"])
+    print(f"✓ {generated} image(s) processed, {len(optimized) - generated} unchanged (cached)")
+
+    manifest = {str(path.relative_to(root)): {"digest": digest, "pages": sorted(images[path])}
+                for path, digest in sorted(digests.items())}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    if args.html:
+        if not args.html.is_dir():
+            print(f"❌ Built site not found at {args.html}; run `myst build --html` first")
+            sys.exit(1)
+        report = rewrite_html(args.html, optimized, cache_dir)
+        print()
+        print(f"{'page':<40} {'images':>10} {'webp':>10} {'saved':>10}")
+        total_before = total_after = 0
+        for page, (before, after) in sorted(report.items()):
+            total_before += before
+            total_after += after
+            print(f"{page:<40} {format_bytes(before):>10} {format_bytes(after):>10} {format_bytes(before - after):>10}")
+        print(f"{'total':<40} {format_bytes(total_before):>10} {format_bytes(total_after):>10} "
+              f"{format_bytes(total_before - total_after):>10}")
+    else:
+        print()
+        for path, digest in sorted(digests.items()):
+            meta = optimized.get(digest)
+            if meta:
+                full = meta["webp"][str(meta["width"])]["bytes"]
+                print(f"{str(path.relative_to(root)):<40} {format_bytes(meta['bytes']):>10} -> "
+                      f"{format_bytes(full):>10} WebP ({', '.join(sorted(images[path]))})")
+
+    print(f"\nDone in {time.monotonic() - start:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
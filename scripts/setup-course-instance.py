@@ -7,18 +7,49 @@ from the course-site-myst template.
 """
 
 import argparse
+import csv
+import difflib
+import errno
+import fcntl
+import hashlib
+import json
 import os
 import re
+import shutil
 import subprocess
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import StringIO
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from github_client import MAX_RETRIES, GitHubError, backoff, get_client
 from ruamel.yaml import YAML
 yaml = YAML()
 yaml.preserve_quotes = True
 yaml.width = 4096  # Prevent line wrapping
 
+TEMPLATE_REPO = "berkeley-cdss/course-site-myst"
+
+# Files rewritten for each instance; always real copies so edits never reach the template.
+EDITED_FILES = {'myst.yml', 'index.md'}
+# Binary assets that are replaced rather than edited, so they may be hardlinked when
+# copy-on-write is unavailable. Notebooks, data files and other text are always copied:
+# Jupyter, pandas and editors may write them in place, which would change the template.
+LINKABLE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.pdf', '.mp4'}
+# Directories never copied from a template checkout without git metadata.
+SKIP_DIRS = {'.git', '_build', 'node_modules', '__pycache__', '.ipynb_checkpoints'}
+FICLONE = 0x40049409  # Linux ioctl: clone a file's extents (copy-on-write)
+# Per-instance input hashes and applied course info from the last --refresh, kept in the courses directory.
+REFRESH_MANIFEST = '.course-refresh.json'
+# Placeholders used when the landing page has no description or authors; --refresh never
+# writes them over an existing value.
+DEFAULT_DESCRIPTION = "Course website"
+DEFAULT_AUTHORS = "Instructor Name"
+# The index.md line naming the course (group 2)
+WELCOME_PATTERN = r"(Welcome to \[Week 2\]\(#week2\) of )([^!]*)(!)"
+
 def run_command(cmd: list, cwd: Optional[Path] = None) -> subprocess.CompletedProcess:
     """Run a shell command and return the result."""
     try:
@@ -36,6 +67,120 @@ def run_command(cmd: list, cwd: Optional[Path] = None) -> subprocess.CompletedPr
         sys.exit(1)
 
 
+def create_repo_from_template(repo_name: str, clone_parent: Path) -> None:
+    """Create a public repository from the course-site-myst template and clone it into clone_parent.
+    
+    Uses the in-process GitHub client when a token is available, otherwise `gh repo create`.
+    """
+    client = get_client()
+    if client is None:
+        run_command([
+            'gh', 'repo', 'create',
+            '--clone', '--public',
+            '--template', f'https://github.com/{TEMPLATE_REPO}',
+            repo_name
+        ], cwd=clone_parent)
+        return
+    
+    owner, name = repo_name.split('/')
+    try:
+        client.request('POST', f'/repos/{TEMPLATE_REPO}/generate',
+                       {'owner': owner, 'name': name, 'private': False})
+    except GitHubError as e:
+        print(f"Error creating repository {repo_name}: {e}")
+        sys.exit(1)
+    
+    # The new repository is filled in asynchronously; retry the clone until its contents exist.
+    cmd = ['git', 'clone', f'https://github.com/{repo_name}.git']
+    for attempt in range(MAX_RETRIES + 1):
+        result = subprocess.run(cmd, cwd=clone_parent, capture_output=True, text=True)
+        if result.returncode == 0:
+            return
+        if attempt < MAX_RETRIES:
+            backoff(attempt)
+    print(f"Error running command: {' '.join(cmd)}")
+    print(f"Error: {result.stderr}")
+    sys.exit(1)
+
+
+def template_files(template_dir: Path) -> List[Path]:
+    """List the files of a local template checkout, relative to it.
+    
+    Uses `git ls-files` when the checkout is a git repository, so the result matches
+    what GitHub copies for a template repository; otherwise walks the tree.
+    """
+    if (template_dir / '.git').exists():
+        result = run_command(['git', 'ls-files', '-z'], cwd=template_dir)
+        return [Path(name) for name in result.stdout.split('\0') if name]
+    files = []
+    for root, dirs, names in os.walk(template_dir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        files.extend(Path(root, name).relative_to(template_dir) for name in names)
+    return files
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Copy src to dst as a copy-on-write clone; False if the filesystem can't."""
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        if dst.exists():
+            dst.unlink()
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def copy_template(template_dir: Path, dest: Path, link_mode: str = 'auto') -> Dict[str, int]:
+    """Create dest from a local template checkout without downloading anything.
+    
+    link_mode 'auto' clones each file copy-on-write where the filesystem supports it,
+    and otherwise hardlinks binary assets (LINKABLE_SUFFIXES) and copies the rest.
+    'hardlink' (opt-in) links every file except EDITED_FILES, 'copy' copies everything.
+    Returns counts of reflinked, hardlinked and copied files.
+    """
+    counts = {'reflinked': 0, 'hardlinked': 0, 'copied': 0}
+    can_reflink = link_mode == 'auto'
+    can_hardlink = link_mode in ('auto', 'hardlink')
+    for rel in template_files(template_dir):
+        src, dst = template_dir / rel, dest / rel
+        if not src.is_file():
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if can_reflink:
+            if reflink(src, dst):
+                counts['reflinked'] += 1
+                continue
+            can_reflink = False  # same filesystem throughout; don't retry per file
+        if (can_hardlink and rel.name not in EDITED_FILES
+                and (link_mode == 'hardlink' or rel.suffix.lower() in LINKABLE_SUFFIXES)):
+            try:
+                os.link(src, dst)
+                counts['hardlinked'] += 1
+                continue
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+                can_hardlink = False
+        shutil.copy2(src, dst)
+        counts['copied'] += 1
+    return counts
+
+
+def create_repo_from_local_template(repo_name: str, template_dir: Path, dest: Path, link_mode: str = 'auto') -> Dict[str, int]:
+    """Create a course instance directory from a local template and initialize its git repository.
+    
+    Works offline: origin is set to the GitHub URL but nothing is pushed.
+    """
+    dest.mkdir(parents=True)
+    counts = copy_template(template_dir, dest, link_mode)
+    run_command(['git', 'init', '-q'], cwd=dest)
+    run_command(['git', 'symbolic-ref', 'HEAD', 'refs/heads/main'], cwd=dest)
+    run_command(['git', 'remote', 'add', 'origin', f'https://github.com/{repo_name}.git'], cwd=dest)
+    return counts
+
+
 def validate_semester(semester: str) -> bool:
     """Validate semester format (fall-2025, spring-2025, etc.)."""
     parts = semester.split('-')
@@ -90,8 +235,8 @@ def extract_course_info(landing_page_path: Path) -> Tuple[str, str, str]:
     if overview_match:
         description = overview_match.group(1).strip()
     
-    # Default authors (can be customized)
-    authors = "Instructor Name"
+    # The README does not list authors; resolve_course_info falls back to DEFAULT_AUTHORS
+    authors = ""
     
     return title, description, authors
 
@@ -125,121 +270,492 @@ def detect_courses_directory() -> Path:
     return cwd
 
 
-def update_myst_yml(course_name: str, semester: str, title: str, description: str, authors: str, dry_run: bool = False) -> None:
-    """Update the existing myst.yml file with course-specific information."""
-    myst_file = Path('myst.yml')
-    
-    if not myst_file.exists():
-        print(f"Error: myst.yml not found at {myst_file}")
-        return
-    
-    try:
-        with open(myst_file, 'r', encoding='utf-8') as f:
-            data = yaml.load(f)
-    except Exception as e:
-        print(f"Error reading myst.yml: {e}")
-        return
-    
+def myst_fields(course_name: str, semester: str, title: Optional[str], description: Optional[str],
+                authors: Optional[str]) -> Dict[str, object]:
+    """Course-specific myst.yml values keyed by "section.key"; None where the course info is unknown."""
     # Extract course name and description from title
     # e.g., "Stat 2: Introduction to Statistics" -> "Stat 2" and "Introduction to Statistics"
-    if ':' in title:
+    if title and ':' in title:
         course_title = title.split(':')[0].strip()
         course_description = title.split(':', 1)[1].strip()
     else:
         course_title = title
         course_description = description
     
-    # Update project fields
-    if 'project' not in data:
-        data['project'] = {}
+    return {
+        'project.title': course_title,
+        'project.description': course_description,
+        'project.authors': [authors] if authors else None,
+        'project.github': f"https://github.com/berkeley-{course_name}/{semester}",
+        'site.title': course_title,
+        'site.domains': [f"{course_name}.berkeley.edu"],
+    }
+
+
+def read_myst_fields(content: str) -> Dict[str, object]:
+    """The current values of the myst_fields keys in myst.yml content."""
+    data = yaml.load(content) or {}
+    fields = {}
+    for path in myst_fields('', '', None, None, None):
+        section, key = path.split('.')
+        fields[path] = (data.get(section) or {}).get(key)
+    return fields
+
+
+def apply_myst_fields(content: str, fields: Dict[str, object]) -> str:
+    """Return myst.yml content with the given "section.key" values set."""
+    data = yaml.load(content)
+    for path, value in fields.items():
+        section, key = path.split('.')
+        if section not in data:
+            data[section] = {}
+        data[section][key] = value
+    
+    stream = StringIO()
+    yaml.dump(data, stream)
+    return stream.getvalue()
+
+
+def render_myst_yml(content: str, course_name: str, semester: str, title: str, description: str, authors: str) -> str:
+    """Return myst.yml content updated with course-specific information."""
+    return apply_myst_fields(content, myst_fields(course_name, semester, title, description, authors))
+
+
+def update_myst_yml(course_name: str, semester: str, title: str, description: str, authors: str, dry_run: bool = False,
+                    instance_dir: Path = Path('.')) -> bool:
+    """Update the existing myst.yml file in instance_dir with course-specific information.
     
-    data['project']['title'] = course_title
-    data['project']['description'] = course_description
-    data['project']['authors'] = [authors]
-    data['project']['github'] = f"https://github.com/berkeley-{course_name}/{semester}"
+    The file is only rewritten if its content changes; returns whether it did (or would).
+    """
+    myst_file = instance_dir / 'myst.yml'
     
-    # Update site fields
-    if 'site' not in data:
-        data['site'] = {}
+    if not myst_file.exists():
+        print(f"Error: myst.yml not found at {myst_file}")
+        return False
     
-    data['site']['title'] = course_title
-    data['site']['domains'] = [f"{course_name}.berkeley.edu"]
+    try:
+        with open(myst_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        updated_content = render_myst_yml(content, course_name, semester, title, description, authors)
+    except Exception as e:
+        print(f"Error reading myst.yml: {e}")
+        return False
     
     if dry_run:
         print("\n--- Updated myst.yml content ---")
-        from io import StringIO
-        stream = StringIO()
-        yaml.dump(data, stream)
-        print(stream.getvalue())
-    else:
+        print(updated_content)
+    elif updated_content != content:
         with open(myst_file, 'w', encoding='utf-8') as f:
-            yaml.dump(data, f)
+            f.write(updated_content)
+    return updated_content != content
+
+
+def index_fields(title: Optional[str], semester_display: str, course_name: str) -> Dict[str, Optional[str]]:
+    """Course-specific index.md values: frontmatter title and subtitle, and the course named in the
+    welcome line; None where the course info is unknown."""
+    if title is None:
+        welcome = None
+    else:
+        welcome = title.split(':')[0].strip() if ':' in title else course_name.replace('stat', 'Stat ')
+    return {'title': title, 'subtitle': f"UC Berkeley, {semester_display}", 'welcome': welcome}
 
 
-def update_index_md(title: str, semester_display: str, course_name: str, dry_run: bool = False) -> None:
-    """Update the existing index.md file with course-specific information."""
-    index_file = Path('index.md')
+def _split_frontmatter(content: str) -> Optional[Tuple[str, str]]:
+    """(frontmatter, body) of index.md content, or None (with a warning) if it has no frontmatter."""
+    if not content.startswith('---'):
+        print("Warning: No frontmatter found in index.md")
+        return None
+    parts = content.split('---', 2)
+    if len(parts) < 3:
+        print("Warning: Could not parse frontmatter properly")
+        return None
+    return parts[1], parts[2]
+
+
+def read_index_fields(content: str) -> Dict[str, Optional[str]]:
+    """The current values of the index_fields keys in index.md content."""
+    fields = {'title': None, 'subtitle': None, 'welcome': None}
+    parts = _split_frontmatter(content)
+    if parts is None:
+        return fields
+    frontmatter = yaml.load(StringIO(parts[0])) or {}
+    fields['title'] = frontmatter.get('title')
+    fields['subtitle'] = frontmatter.get('subtitle')
+    welcome_match = re.search(WELCOME_PATTERN, parts[1])
+    if welcome_match:
+        fields['welcome'] = welcome_match.group(2)
+    return fields
+
+
+def apply_index_fields(content: str, fields: Dict[str, Optional[str]]) -> str:
+    """Return index.md content with the given index_fields values set."""
+    parts = _split_frontmatter(content)
+    if parts is None:
+        return content
+    frontmatter_str, body_content = parts
+    
+    try:
+        # Parse and update frontmatter using ruamel.yaml to preserve formatting
+        frontmatter = yaml.load(StringIO(frontmatter_str))
+        for key in ('title', 'subtitle'):
+            if key in fields:
+                frontmatter[key] = fields[key]
+        
+        # Reconstruct the frontmatter
+        updated_frontmatter_stream = StringIO()
+        yaml.dump(frontmatter, updated_frontmatter_stream)
+        updated_frontmatter = updated_frontmatter_stream.getvalue()
+        
+        # Reconstruct the file
+        updated_content = f"---\n{updated_frontmatter}---{body_content}"
+        
+        # Update attention block reference in body content (using regex for text processing)
+        if 'welcome' not in fields:
+            return updated_content
+        return re.sub(WELCOME_PATTERN, lambda m: f"{m.group(1)}{fields['welcome']}{m.group(3)}", updated_content)
+    except Exception as e:
+        print(f"Error parsing frontmatter YAML: {e}")
+        return content
+
+
+def render_index_md(content: str, title: str, semester_display: str, course_name: str) -> str:
+    """Return index.md content updated with course-specific information."""
+    return apply_index_fields(content, index_fields(title, semester_display, course_name))
+
+
+def update_index_md(title: str, semester_display: str, course_name: str, dry_run: bool = False,
+                    instance_dir: Path = Path('.')) -> bool:
+    """Update the existing index.md file in instance_dir with course-specific information.
+    
+    The file is only rewritten if its content changes; returns whether it did (or would).
+    """
+    index_file = instance_dir / 'index.md'
     
     if not index_file.exists():
         print(f"Error: index.md not found at {index_file}")
-        return
+        return False
     
     try:
         with open(index_file, 'r', encoding='utf-8') as f:
             content = f.read()
     except Exception as e:
         print(f"Error reading index.md: {e}")
-        return
+        return False
     
-    if content.startswith('---'):
-        # Parse frontmatter with YAML
-        try:
-            # Split frontmatter and content
-            parts = content.split('---', 2)
-            if len(parts) >= 3:
-                frontmatter_str = parts[1]
-                body_content = parts[2]
-                
-                # Parse and update frontmatter using ruamel.yaml to preserve formatting
-                from io import StringIO
-                frontmatter_stream = StringIO(frontmatter_str)
-                frontmatter = yaml.load(frontmatter_stream)
-                
-                frontmatter['title'] = title
-                frontmatter['subtitle'] = f"UC Berkeley, {semester_display}"
-                
-                # Reconstruct the frontmatter
-                updated_frontmatter_stream = StringIO()
-                yaml.dump(frontmatter, updated_frontmatter_stream)
-                updated_frontmatter = updated_frontmatter_stream.getvalue()
-                
-                # Reconstruct the file
-                updated_content = f"---\n{updated_frontmatter}---{body_content}"
-                
-                # Update attention block reference in body content (using regex for text processing)
-                course_name_formatted = title.split(':')[0].strip() if ':' in title else course_name.replace('stat', 'Stat ')
-                updated_content = re.sub(
-                    r"(Welcome to \[Week 2\]\(#week2\) of )[^!]*(!)", 
-                    f"\\1{course_name_formatted}\\2", 
-                    updated_content
-                )
-            else:
-                print("Warning: Could not parse frontmatter properly")
-                updated_content = content
-                
-        except Exception as e:
-            print(f"Error parsing frontmatter YAML: {e}")
-            updated_content = content
-    else:
-        print("Warning: No frontmatter found in index.md")
-        updated_content = content
+    updated_content = render_index_md(content, title, semester_display, course_name)
     
     if dry_run:
         print("\n--- Updated index.md content ---")
         print(updated_content)
-    else:
+    elif updated_content != content:
         with open(index_file, 'w', encoding='utf-8') as f:
             f.write(updated_content)
+    return updated_content != content
+
+
+def resolve_course_info(courses_dir: Path, course_name: str, verbose: bool = True,
+                        defaults: bool = True) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Title, description and authors from the course's landing page.
+    
+    Anything missing is filled with a placeholder (the course name, DEFAULT_DESCRIPTION,
+    DEFAULT_AUTHORS), or left as None if defaults is False.
+    """
+    landing_page_path = courses_dir / course_name / f"berkeley-{course_name}.github.io"
+    
+    if not landing_page_path.exists():
+        print(f"Warning: Landing page repository not found at {landing_page_path}")
+        if verbose:
+            print("Please ensure the landing page repository is cloned in the expected location.")
+            print("Continuing with default values...")
+        course_title, course_description, course_authors = "", "", ""
+    else:
+        if verbose:
+            print("Found landing page repository. Extracting course information...")
+        course_title, course_description, course_authors = extract_course_info(landing_page_path)
+        if verbose:
+            print("Extracted course information:")
+            print(f"  Title: {course_title or course_name}")
+            print(f"  Description: {course_description or DEFAULT_DESCRIPTION}")
+    
+    if not defaults:
+        return course_title or None, course_description or None, course_authors or None
+    
+    # Use defaults if extraction failed
+    return course_title or course_name, course_description or DEFAULT_DESCRIPTION, course_authors or DEFAULT_AUTHORS
+
+
+def setup_instance(course_name: str, semester: str, courses_dir: Path, template_dir: Optional[Path] = None,
+                   skip_repo_creation: bool = False, dry_run: bool = False, link_mode: str = 'auto',
+                   verbose: bool = True) -> str:
+    """Create (unless skipped or present) and configure one course instance; returns a one-line summary.
+    
+    All paths are passed explicitly, so instances can be set up concurrently.
+    With template_dir the instance is made from that local checkout, offline;
+    otherwise the repository is created on GitHub from the template and cloned.
+    """
+    repo_name = f"berkeley-{course_name}/{semester}"
+    semester_dir = courses_dir / course_name / semester
+    created = "existing directory"
+    
+    if skip_repo_creation:
+        if verbose:
+            print(f"Skipping repository creation for {repo_name} (--skip-repo-creation flag set)")
+    elif semester_dir.exists():
+        if verbose:
+            print(f"Directory {semester_dir} already exists. Skipping repository creation.")
+            print("Use --skip-repo-creation flag to suppress this message.")
+    elif template_dir is not None:
+        created = f"would copy from {template_dir}"
+        if not dry_run:
+            counts = create_repo_from_local_template(repo_name, template_dir, semester_dir, link_mode)
+            created = "created from local template ({reflinked} reflinked, {hardlinked} hardlinked, {copied} copied)".format(**counts)
+        if verbose:
+            print(f"Repository {repo_name}: {created}")
+    else:
+        if verbose:
+            print(f"Creating repository {repo_name}...")
+        created = "would create on GitHub"
+        if not dry_run:
+            (courses_dir / course_name).mkdir(parents=True, exist_ok=True)
+            create_repo_from_template(repo_name, courses_dir / course_name)
+            created = "created on GitHub"
+    
+    if not dry_run and not semester_dir.exists():
+        print(f"Error: Expected directory {semester_dir} does not exist")
+        sys.exit(1)
+    
+    course_title, course_description, course_authors = resolve_course_info(courses_dir, course_name, verbose)
+    
+    # Format semester for display
+    semester_display = format_semester_display(semester)
+    
+    # Update files
+    if dry_run:
+        if verbose:
+            print("\nDRY RUN: Showing what would be updated...")
+            print(f"Files would be updated in: {semester_dir}")
+            if semester_dir.exists():
+                update_myst_yml(course_name, semester, course_title, course_description, course_authors,
+                                dry_run=True, instance_dir=semester_dir)
+                update_index_md(course_title, semester_display, course_name, dry_run=True, instance_dir=semester_dir)
+            else:
+                print(f"Cannot show dry run - directory {semester_dir} does not exist")
+    else:
+        if verbose:
+            print("Updating myst.yml...")
+        update_myst_yml(course_name, semester, course_title, course_description, course_authors,
+                        instance_dir=semester_dir)
+        if verbose:
+            print("Updating index.md...")
+        update_index_md(course_title, semester_display, course_name, instance_dir=semester_dir)
+    
+    return f"{created}; {'would update' if dry_run else 'updated'} myst.yml and index.md ({course_title})"
+
+
+def load_batch(path: Path) -> List[Tuple[str, str]]:
+    """(course, semester) pairs from a CSV with course and semester columns, or a YAML list under `courses`.
+    
+    The fleet manifests of setup-github-team.py can be used as they are; other columns are ignored.
+    """
+    if path.suffix in ('.yml', '.yaml'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = YAML(typ='safe').load(f) or {}
+        rows = data if isinstance(data, list) else data.get('courses', [])
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+    pairs = []
+    for row in rows:
+        pair = (str(row['course']).strip(), str(row['semester']).strip())
+        if pair not in pairs:
+            pairs.append(pair)
+    return pairs
+
+
+def run_batch(pairs: List[Tuple[str, str]], courses_dir: Path, template_dir: Optional[Path], workers: int,
+              skip_repo_creation: bool = False, dry_run: bool = False, link_mode: str = 'auto') -> bool:
+    """Set up many course instances in a process pool and print one line per instance; True if all succeeded."""
+    start = time.monotonic()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(setup_instance, course, semester, courses_dir, template_dir,
+                        skip_repo_creation, dry_run, link_mode, False): (course, semester)
+            for course, semester in pairs
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = (True, future.result())
+            except SystemExit:
+                results[futures[future]] = (False, "failed (see messages above)")
+            except Exception as e:
+                results[futures[future]] = (False, f"failed: {e}")
+    
+    print()
+    ok = True
+    for course, semester in pairs:
+        success, message = results[(course, semester)]
+        ok = ok and success
+        print(f"{'✅' if success else '❌'} {course} {semester}: {message}")
+    print(f"\n{len(pairs)} course instance(s) in {time.monotonic() - start:.1f}s")
+    return ok
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """SHA-256 of a file's content, or None if it does not exist."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def find_instances(courses_dir: Path) -> List[Tuple[str, str, Path]]:
+    """All (course, semester, directory) instances under courses_dir/<course>/<semester> with a myst.yml."""
+    instances = []
+    for course_dir in sorted(p for p in courses_dir.iterdir() if p.is_dir()):
+        for semester_dir in sorted(p for p in course_dir.iterdir() if p.is_dir()):
+            if validate_semester(semester_dir.name) and (semester_dir / 'myst.yml').exists():
+                instances.append((course_dir.name, semester_dir.name, semester_dir))
+    return instances
+
+
+def template_version(template_dir: Optional[Path]) -> str:
+    """Identify the edit logic and template: this script's hash plus the template checkout's commit, if given."""
+    version = file_digest(Path(__file__))
+    if template_dir is not None and (template_dir / '.git').exists():
+        version += ':' + run_command(['git', 'rev-parse', 'HEAD'], cwd=template_dir).stdout.strip()
+    return version
+
+
+def instance_key(course_name: str, semester: str, readme_digest: Optional[str], version: str) -> str:
+    """Hash of the inputs a refresh depends on: the course, semester, landing page README and template version."""
+    inputs = [course_name, semester, readme_digest, version]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def _is_placeholder(value: object, course_name: str) -> bool:
+    """Whether value is empty or one of the defaults setup fills in for missing course info."""
+    if isinstance(value, list):
+        return all(_is_placeholder(item, course_name) for item in value)
+    return value in (None, '', course_name, DEFAULT_DESCRIPTION, DEFAULT_AUTHORS)
+
+
+def refresh_instance(course_name: str, semester: str, instance_dir: Path, info: Tuple[Optional[str], ...],
+                     previous: Optional[Tuple[Optional[str], ...]] = None, force: bool = False,
+                     dry_run: bool = False) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Re-apply course metadata to one instance without reverting hand edits.
+    
+    info is (title, description, authors) from the landing page, None where it has none;
+    those fields are left as they are. previous is the info the last refresh applied. A field
+    is only updated if its current value is still what that info produced, or a placeholder;
+    anything else was edited by hand and is kept unless force is set.
+    
+    Returns the changed lines per file (empty if unchanged) and the "file field" names kept.
+    """
+    semester_display = format_semester_display(semester)
+    files = {
+        'myst.yml': (lambda i: myst_fields(course_name, semester, *i), read_myst_fields, apply_myst_fields),
+        'index.md': (lambda i: index_fields(i[0], semester_display, course_name), read_index_fields,
+                     apply_index_fields),
+    }
+    changes = {}
+    kept = []
+    for name, (fields_for, read_fields, apply_fields) in files.items():
+        path = instance_dir / name
+        if not path.exists():
+            continue
+        content = path.read_text(encoding='utf-8')
+        current = read_fields(content)
+        applied = fields_for(previous) if previous else {}
+        updates = {}
+        for field, value in fields_for(info).items():
+            if value is None or current[field] == value:
+                continue
+            if force or _is_placeholder(current[field], course_name) or current[field] == applied.get(field):
+                updates[field] = value
+            else:
+                kept.append(f"{name} {field}")
+        if not updates:
+            continue
+        updated_content = apply_fields(content, updates)
+        if updated_content == content:
+            continue
+        changes[name] = [line for line in difflib.unified_diff(content.splitlines(), updated_content.splitlines(),
+                                                               lineterm='', n=0)
+                         if not line.startswith(('---', '+++', '@@'))]
+        if not dry_run:
+            path.write_text(updated_content, encoding='utf-8')
+    return changes, kept
+
+
+def refresh_fleet(courses_dir: Path, template_dir: Optional[Path], workers: int, dry_run: bool = False,
+                  force: bool = False) -> bool:
+    """Re-apply course metadata to every instance whose inputs changed since the last refresh.
+    
+    Inputs are the landing page README, the template version and the semester; hand edits
+    to an instance's files don't make it stale. Each changed course's README is parsed once;
+    changed instances are processed in a process pool. Hand-edited fields are kept unless
+    force is set, which also checks every instance. Prints a change report and returns
+    True if every instance was refreshed.
+    """
+    start = time.monotonic()
+    manifest_path = courses_dir / REFRESH_MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    version = template_version(template_dir)
+    instances = find_instances(courses_dir)
+    
+    readme_digests = {course: file_digest(courses_dir / course / f"berkeley-{course}.github.io" / "README.md")
+                      for course in {course for course, _, _ in instances}}
+    keys = {(course, semester): instance_key(course, semester, readme_digests[course], version)
+            for course, semester, _ in instances}
+    records = {name: record for name, record in manifest.items() if isinstance(record, dict)}
+    stale = [(course, semester, path) for course, semester, path in instances
+             if force or records.get(f"{course}/{semester}", {}).get('key') != keys[(course, semester)]]
+    infos = {course: resolve_course_info(courses_dir, course, verbose=False, defaults=False)
+             for course in sorted({course for course, _, _ in stale})}
+    
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(refresh_instance, course, semester, path, infos[course],
+                               records.get(f"{course}/{semester}", {}).get('info'), force, dry_run): (course, semester)
+                   for course, semester, path in stale}
+        for future in as_completed(futures):
+            course, semester = futures[future]
+            try:
+                results[(course, semester)] = future.result()
+            except Exception as e:
+                results[(course, semester)] = e
+                continue
+            manifest[f"{course}/{semester}"] = {'key': keys[(course, semester)], 'info': list(infos[course])}
+    
+    if not dry_run:
+        tmp_path = manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp_path, manifest_path)
+    
+    ok = True
+    changed = 0
+    edited = 0
+    for course, semester, _ in stale:
+        result = results[(course, semester)]
+        if isinstance(result, Exception):
+            ok = False
+            print(f"❌ {course}/{semester}: {result}")
+            continue
+        changes, kept = result
+        if changes:
+            changed += 1
+            print(f"{'~' if dry_run else '✅'} {course}/{semester}: {', '.join(changes)}")
+            for name, lines in changes.items():
+                for line in lines[:20]:
+                    print(f"    {name}: {line}")
+        if kept:
+            edited += 1
+            print(f"✋ {course}/{semester}: kept hand edits to {', '.join(kept)} (use --force to overwrite)")
+    print(f"\n{len(instances)} instance(s): {len(instances) - len(stale)} skipped (inputs unchanged), "
+          f"{len(stale)} checked, {changed} {'would change' if dry_run else 'changed'}, "
+          f"{edited} with hand edits kept in {time.monotonic() - start:.1f}s")
+    return ok
 
 
 def main():
@@ -259,6 +775,16 @@ Examples:
   
   # Dry run to see what would be changed
   python setup-course-instance.py stat2 fall-2025 --dry-run
+  
+  # Create offline from the local course-site-myst checkout
+  python setup-course-instance.py stat2 fall-2025 --local-template
+  python setup-course-instance.py stat2 fall-2025 --template-dir ~/src/course-site-myst
+  
+  # Set up a whole term at once
+  python setup-course-instance.py --batch fall-2025.csv --local-template
+  
+  # Re-apply course metadata everywhere after a template change
+  python setup-course-instance.py --refresh
 
 This script will:
 1. Create a new repository from the course-site-myst template (unless skipped)
@@ -267,114 +793,72 @@ This script will:
         """
     )
     
-    parser.add_argument('course_name', help='Course name (e.g., stat2)')
-    parser.add_argument('semester', help='Semester in format season-year (e.g., fall-2025)')
+    parser.add_argument('course_name', nargs='?', help='Course name (e.g., stat2)')
+    parser.add_argument('semester', nargs='?', help='Semester in format season-year (e.g., fall-2025)')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be done without executing')
     parser.add_argument('--courses-dir', type=Path, help='Path to courses directory (default: auto-detect)', default=None)
     parser.add_argument('--skip-repo-creation', action='store_true', help='Skip repository creation (use if repo already exists)')
+    parser.add_argument('--local-template', action='store_true',
+                        help='Create instances offline from the template checkout at <courses-dir>/course-site-myst')
+    parser.add_argument('--template-dir', type=Path, default=None, metavar='PATH',
+                        help='Create instances offline from the template checkout at PATH (implies --local-template)')
+    parser.add_argument('--link-mode', choices=['auto', 'hardlink', 'copy'], default='auto',
+                        help='How --local-template shares unchanged files with the template (default: auto)')
+    parser.add_argument('--batch', type=Path, help='CSV or YAML of course/semester pairs to set up concurrently')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes for --batch/--refresh (default: CPU count)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Re-apply course metadata to every instance in the courses directory whose inputs changed')
+    parser.add_argument('--force', action='store_true', help='With --refresh, check every instance regardless of the manifest and overwrite hand edits')
     
     args = parser.parse_args()
     
-    course_name = args.course_name
-    semester = args.semester
-    courses_dir = args.courses_dir if args.courses_dir else detect_courses_directory()
-    
-    # Validate semester format
-    if not validate_semester(semester):
-        print("Error: Semester should be in format 'fall-2025', 'spring-2025', etc.")
+    if not (args.batch or args.refresh) and not (args.course_name and args.semester):
+        parser.error("course_name and semester are required unless --batch or --refresh is given")
+    
+    courses_dir = (args.courses_dir if args.courses_dir else detect_courses_directory()).resolve()
+    template_dir = None
+    if args.template_dir is not None:
+        template_dir = args.template_dir.resolve()
+    elif args.local_template:
+        template_dir = (courses_dir / 'course-site-myst').resolve()
+    if template_dir is not None and not template_dir.is_dir():
+        print(f"Error: Template checkout not found at {template_dir}")
         sys.exit(1)
     
-    print(f"Setting up course instance: {course_name} for {semester}")
-    print(f"Working in courses directory: {courses_dir}")
+    if args.refresh:
+        pairs = []
+    elif args.batch:
+        pairs = load_batch(args.batch)
+    else:
+        pairs = [(args.course_name, args.semester)]
+    
+    # Validate semester format
+    for _, semester in pairs:
+        if not validate_semester(semester):
+            print(f"Error: Semester should be in format 'fall-2025', 'spring-2025', etc. (got '{semester}')")
+            sys.exit(1)
     
-    # Check if we're in dry-run mode
     if args.dry_run:
         print("DRY RUN MODE - No actual changes will be made")
     
-    # Create the repository (unless skipped or already exists)
-    repo_name = f"berkeley-{course_name}/{semester}"
-    semester_dir = courses_dir / course_name / semester
-    
-    if args.skip_repo_creation:
-        print(f"Skipping repository creation for {repo_name} (--skip-repo-creation flag set)")
-    elif semester_dir.exists():
-        print(f"Directory {semester_dir} already exists. Skipping repository creation.")
-        print("Use --skip-repo-creation flag to suppress this message.")
-    else:
-        print(f"Creating repository {repo_name}...")
-        
-        if not args.dry_run:
-            # Change to the courses directory first
-            original_cwd = Path.cwd()
-            os.chdir(courses_dir / course_name)
-            
-            cmd = [
-                'gh', 'repo', 'create',
-                '--clone', '--public',
-                '--template', 'https://github.com/berkeley-cdss/course-site-myst',
-                repo_name
-            ]
-            run_command(cmd)
-            
-            # Change back to original directory for now
-            os.chdir(original_cwd)
-    
-    # Change to the semester directory for file operations
-    if not args.dry_run:
-        if semester_dir.exists():
-            os.chdir(semester_dir)
-        else:
-            print(f"Error: Expected directory {semester_dir} does not exist")
+    if args.refresh:
+        print(f"Refreshing course instances in {courses_dir}")
+        if not refresh_fleet(courses_dir, template_dir, args.workers, args.dry_run, args.force):
             sys.exit(1)
+        return
     
-    # Check if landing page repository exists locally
-    landing_page_path = courses_dir / course_name / f"berkeley-{course_name}.github.io"
-    
-    if not landing_page_path.exists():
-        print(f"Warning: Landing page repository not found at {landing_page_path}")
-        print("Please ensure the landing page repository is cloned in the expected location.")
-        print("Continuing with default values...")
-        course_title = course_name
-        course_description = "Course website"
-        course_authors = "Instructor Name"
-    else:
-        print("Found landing page repository. Extracting course information...")
-        course_title, course_description, course_authors = extract_course_info(landing_page_path)
-        
-        # Use defaults if extraction failed
-        if not course_title:
-            course_title = course_name
-        if not course_description:
-            course_description = "Course website"
-        if not course_authors:
-            course_authors = "Instructor Name"
-        
-        print("Extracted course information:")
-        print(f"  Title: {course_title}")
-        print(f"  Description: {course_description}")
-    
-    # Format semester for display
-    semester_display = format_semester_display(semester)
+    if args.batch:
+        print(f"Setting up {len(pairs)} course instance(s) in {courses_dir}")
+        if not run_batch(pairs, courses_dir, template_dir, args.workers, args.skip_repo_creation,
+                         args.dry_run, args.link_mode):
+            sys.exit(1)
+        return
     
-    # Update files
-    if args.dry_run:
-        print("\nDRY RUN: Showing what would be updated...")
-        print(f"Files would be updated in: {semester_dir}")
-        # For dry run, we need to simulate being in the semester directory
-        original_cwd = Path.cwd()
-        if semester_dir.exists():
-            os.chdir(semester_dir)
-            update_myst_yml(course_name, semester, course_title, course_description, course_authors, dry_run=True)
-            update_index_md(course_title, semester_display, course_name, dry_run=True)
-            os.chdir(original_cwd)
-        else:
-            print(f"Cannot show dry run - directory {semester_dir} does not exist")
-    else:
-        print("Updating myst.yml...")
-        update_myst_yml(course_name, semester, course_title, course_description, course_authors)
-        
-        print("Updating index.md...")
-        update_index_md(course_title, semester_display, course_name)
+    course_name, semester = pairs[0]
+    print(f"Setting up course instance: {course_name} for {semester}")
+    print(f"Working in courses directory: {courses_dir}")
+    setup_instance(course_name, semester, courses_dir, template_dir, args.skip_repo_creation,
+                   args.dry_run, args.link_mode)
     
     print("\n✅ Course instance setup complete!")
     print("\nNext steps:")
@@ -385,7 +869,10 @@ This script will:
     print("5. Commit and push your changes:")
     print("   git add .")
     print(f"   git commit -m 'Initial course setup for {semester}'")
-    print("   git push origin main")
+    if template_dir is not None and not args.skip_repo_creation:
+        print(f"   gh repo create berkeley-{course_name}/{semester} --public --source . --push")
+    else:
+        print("   git push origin main")
     print(f"\nYour course site will be available at: https://{course_name}.berkeley.edu/{semester}")
 
 
@@ -10,13 +10,22 @@ This script:
 Usage:
     python setup-github-team.py stat123 fall-2025
     python setup-github-team.py stat123 fall-2025 --users user1,user2,user3
+    python setup-github-team.py --manifest fleet.yml --workers 8
 """
 
 import argparse
+import csv
 import subprocess
 import sys
 import json
-from typing import List, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from github_client import MAX_RETRIES, GitHubError, backoff, get_client, is_rate_limited
+
+# Repository permissions from highest to lowest, as accepted by --permission.
+PERMISSION_LEVELS = ("admin", "maintain", "push", "triage", "pull")
 
 
 def run_gh_command(command: List[str], ignore_errors: bool = False) -> dict:
@@ -34,12 +43,7 @@ def run_gh_command(command: List[str], ignore_errors: bool = False) -> dict:
         subprocess.CalledProcessError: If the command fails and ignore_errors is False
     """
     try:
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        result = run_gh_process(command)
         
         # Try to parse JSON response if there is output
         if result.stdout.strip():
@@ -60,6 +64,114 @@ def run_gh_command(command: List[str], ignore_errors: bool = False) -> dict:
         raise
 
 
+def run_gh_process(command: List[str]) -> subprocess.CompletedProcess:
+    """
+    Run a GitHub CLI command, retrying with exponential backoff while rate-limited.
+    
+    Args:
+        command: List of command arguments for gh
+        
+    Returns:
+        subprocess.CompletedProcess: The finished command with its text output
+        
+    Raises:
+        subprocess.CalledProcessError: If the command fails for any other reason or stays rate-limited
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        except subprocess.CalledProcessError as e:
+            # Retry rate limits even for ignore_errors callers:
+            # a rate-limited existence check must not read as "does not exist".
+            if attempt == MAX_RETRIES or not is_rate_limited(e.stderr):
+                raise
+            backoff(attempt)
+
+
+def run_gh_paginated(command: List[str]) -> list:
+    """
+    Run a list-returning `gh api` call over all pages and merge the results.
+    
+    `gh api --paginate` prints one JSON array per page back to back, so the
+    output is decoded value by value rather than with a single json.loads.
+    
+    Args:
+        command: List of command arguments for gh (without --paginate)
+        
+    Returns:
+        list: Items from every page
+    """
+    output = run_gh_process(command + ["--paginate"]).stdout
+    decoder = json.JSONDecoder()
+    items, pos = [], 0
+    while True:
+        while pos < len(output) and output[pos].isspace():
+            pos += 1
+        if pos == len(output):
+            return items
+        page, pos = decoder.raw_decode(output, pos)
+        items.extend(page)
+
+
+def github_api(path: str, method: str = "GET", fields: Optional[dict] = None,
+               accept: str = "application/vnd.github+json", ignore_errors: bool = False) -> dict:
+    """
+    Call the GitHub REST API in-process, or through `gh api` if no client is available.
+    
+    Args:
+        path: API path, optionally with a query string
+        method: HTTP method
+        fields: Request body fields (sent as -f fields through gh)
+        accept: Accept header (media type)
+        ignore_errors: If True, return empty dict on errors instead of raising
+        
+    Returns:
+        dict: Parsed JSON response ({} for empty responses)
+        
+    Raises:
+        GitHubError: If the API request fails and ignore_errors is False
+        subprocess.CalledProcessError: If the gh fallback fails and ignore_errors is False
+    """
+    client = get_client()
+    if client is None:
+        command = ["gh", "api"]
+        if method != "GET":
+            command += ["--method", method]
+        command += ["-H", f"Accept: {accept}", path]
+        for name, value in (fields or {}).items():
+            command += ["-f", f"{name}={value}"]
+        return run_gh_command(command, ignore_errors)
+    
+    try:
+        return client.request(method, path, fields, accept)
+    except GitHubError as e:
+        if ignore_errors:
+            return {}
+        print(f"Error: {e}")
+        raise
+
+
+def github_paginate(path: str) -> list:
+    """
+    GET all pages of a list endpoint, in-process or through `gh api --paginate`.
+    
+    Args:
+        path: API path of a list endpoint, optionally with a query string
+        
+    Returns:
+        list: Items from every page
+    """
+    client = get_client()
+    if client is None:
+        return run_gh_paginated(["gh", "api", path])
+    return client.paginate(path)
+
+
 def check_org_exists(org: str) -> bool:
     """
     Check if a GitHub organization exists and is accessible.
@@ -70,8 +182,7 @@ def check_org_exists(org: str) -> bool:
     Returns:
         bool: True if organization exists and is accessible
     """
-    command = ["gh", "api", f"/orgs/{org}"]
-    result = run_gh_command(command, ignore_errors=True)
+    result = github_api(f"/orgs/{org}", ignore_errors=True)
     return bool(result)
 
 
@@ -85,227 +196,440 @@ def check_repo_exists(repo: str) -> bool:
     Returns:
         bool: True if repository exists and is accessible
     """
-    command = ["gh", "api", f"/repos/{repo}"]
-    result = run_gh_command(command, ignore_errors=True)
+    result = github_api(f"/repos/{repo}", ignore_errors=True)
     return bool(result)
 
 
-def check_team_exists(org: str, team_name: str) -> bool:
+def create_team(org: str, team_name: str) -> dict:
     """
-    Check if a team exists in the organization.
+    Create a team in the specified organization.
     
     Args:
         org: GitHub organization name
-        team_name: Name of the team
+        team_name: Name of the team to create
         
     Returns:
-        bool: True if team exists
+        dict: Team creation response
     """
-    command = ["gh", "api", f"/orgs/{org}/teams/{team_name}"]
-    result = run_gh_command(command, ignore_errors=True)
-    return bool(result)
+    print(f"Creating team '{team_name}' in organization '{org}'...")
+    
+    return github_api(f"/orgs/{org}/teams", "POST", {"name": team_name, "privacy": "closed"})
 
 
-def check_team_has_repo_access(org: str, team_name: str, repo: str) -> bool:
+def add_team_to_repo(org: str, team_name: str, repo: str, permission: str = "maintain") -> dict:
     """
-    Check if a team has access to a repository.
+    Add a team to a repository with specified permissions.
     
     Args:
         org: GitHub organization name
         team_name: Name of the team
-        repo: Repository name in format "owner/repo"
+        repo: Repository name (org/repo format)
+        permission: Permission level (maintain, admin, push, pull, triage)
         
     Returns:
-        bool: True if team has access to the repository
+        dict: Response from adding team to repo
     """
-    command = ["gh", "api", f"/orgs/{org}/teams/{team_name}/repos/{repo}"]
-    result = run_gh_command(command, ignore_errors=True)
-    return bool(result)
+    print(f"Adding team '{team_name}' to repository '{repo}' with '{permission}' permissions...")
+    
+    return github_api(f"/orgs/{org}/teams/{team_name}/repos/{repo}", "PUT", {"permission": permission})
 
 
-def check_user_in_team(org: str, team_name: str, username: str) -> bool:
+def add_user_to_team(org: str, team_name: str, username: str, role: str = "member") -> dict:
     """
-    Check if a user is a member of a team.
+    Add a user to a team.
     
     Args:
         org: GitHub organization name
         team_name: Name of the team
-        username: GitHub username
+        username: GitHub username to add
+        role: Role for the user (member or maintainer)
         
     Returns:
-        bool: True if user is a member of the team
+        dict: Response from adding user to team
     """
-    command = ["gh", "api", f"/orgs/{org}/teams/{team_name}/memberships/{username}"]
-    result = run_gh_command(command, ignore_errors=True)
-    return bool(result)
+    print(f"Adding user '{username}' to team '{team_name}' as '{role}'...")
+    
+    return github_api(f"/orgs/{org}/teams/{team_name}/memberships/{username}", "PUT", {"role": role})
 
 
-def create_team(org: str, team_name: str) -> dict:
+def parse_course_info(course: str, semester: str) -> tuple:
     """
-    Create a team in the specified organization.
+    Parse course and semester information to extract org, team, and repo names.
     
     Args:
-        org: GitHub organization name
-        team_name: Name of the team to create
+        course: Course name (e.g., "stat123")
+        semester: Semester (e.g., "fall-2025")
         
     Returns:
-        dict: Team creation response
+        tuple: (org_name, team_name, repo_name)
     """
-    print(f"Creating team '{team_name}' in organization '{org}'...")
-    
-    command = [
-        "gh", "api", "--method", "POST", f"/orgs/{org}/teams",
-        "-f", f"name={team_name}",
-        "-f", "privacy=closed"
-    ]
+    # Extract course number from course name
+    # Assuming format like "stat123" -> "stat158" becomes "berkeley-stat158"
+    org_name = f"berkeley-{course}"
+    team_name = f"instructors-{semester}"
+    repo_name = f"{org_name}/{semester}"
     
-    return run_gh_command(command)
+    return org_name, team_name, repo_name
 
 
-def create_team_if_not_exists(org: str, team_name: str, force: bool = False) -> bool:
+def fetch_team_state(org: str, team_name: str, repo: str) -> dict:
     """
-    Create a team if it doesn't already exist.
+    Fetch the current state of a team in a few bulk calls.
+    
+    One call for the team, one for its access to the repository and paginated
+    lists of maintainers, all members and pending invitations, independent of how
+    many users the plan mentions.
     
     Args:
         org: GitHub organization name
-        team_name: Name of the team to create
-        force: If True, attempt creation even if team exists (for error handling)
+        team_name: Name (slug) of the team
+        repo: Repository name (org/repo format)
         
     Returns:
-        bool: True if team was created, False if it already existed
+        dict: team (bool), permission (str or None) and members (lowercase login -> role)
     """
-    if not force and check_team_exists(org, team_name):
-        print(f"✓ Team '{team_name}' already exists in organization '{org}'")
-        return False
-    else:
-        if force and check_team_exists(org, team_name):
-            print(f"✓ Team '{team_name}' already exists (--force specified)")
-            return False
-        create_team(org, team_name)
-        print(f"✓ Team '{team_name}' created successfully")
-        return True
+    state = {"team": False, "permission": None, "members": {}}
+    if not github_api(f"/orgs/{org}/teams/{team_name}", ignore_errors=True):
+        return state
+    state["team"] = True
+    
+    access = github_api(f"/orgs/{org}/teams/{team_name}/repos/{repo}",
+                        accept="application/vnd.github.v3.repository+json", ignore_errors=True)
+    state["permission"] = repo_permission(access)
+    
+    base = f"/orgs/{org}/teams/{team_name}"
+    for user in github_paginate(f"{base}/invitations?per_page=100"):
+        if user.get("login"):
+            state["members"][user["login"].lower()] = "pending"
+    for user in github_paginate(f"{base}/members?role=all&per_page=100"):
+        state["members"][user["login"].lower()] = "member"
+    for user in github_paginate(f"{base}/members?role=maintainer&per_page=100"):
+        state["members"][user["login"].lower()] = "maintainer"
+    return state
+
+
+def repo_permission(repo: dict) -> Optional[str]:
+    """
+    Get a team's permission on a repository from the repository+json response.
+    
+    Args:
+        repo: Response of GET /orgs/{org}/teams/{team}/repos/{repo}, or {} if no access
+        
+    Returns:
+        Optional[str]: Permission level in --permission terms, or None if no access
+    """
+    if not repo:
+        return None
+    role_name = repo.get("role_name")
+    if role_name:
+        return {"read": "pull", "write": "push"}.get(role_name, role_name)
+    permissions = repo.get("permissions", {})
+    return next((level for level in PERMISSION_LEVELS if permissions.get(level)), None)
 
 
-def add_team_to_repo_if_not_exists(org: str, team_name: str, repo: str, permission: str = "maintain", force: bool = False) -> bool:
+def plan_team_changes(state: dict, team_name: str, repo: str, permission: str,
+                      users: List[Tuple[str, str]], force: bool = False) -> List[dict]:
     """
-    Add a team to a repository if it doesn't already have access.
+    Compute the desired-vs-actual diff for one team.
+    
+    Existing access or membership with a different permission or role is only
+    changed with force; otherwise it is reported as differing and left alone.
     
     Args:
-        org: GitHub organization name
+        state: Current state from fetch_team_state
         team_name: Name of the team
         repo: Repository name (org/repo format)
-        permission: Permission level (maintain, admin, push, pull, triage)
-        force: If True, update permissions even if team already has access
+        permission: Desired repository permission
+        users: Desired (username, role) pairs
+        force: Update permissions/roles that differ from the desired ones
         
     Returns:
-        bool: True if team was added/updated, False if it already had access
+        List[dict]: Changes with kind (team/repo/user), target, action
+                    (create/add/update/differs/keep), value and current
     """
-    if not force and check_team_has_repo_access(org, team_name, repo):
-        print(f"✓ Team '{team_name}' already has access to repository '{repo}'")
-        return False
-    else:
-        add_team_to_repo(org, team_name, repo, permission)
-        if force and check_team_has_repo_access(org, team_name, repo):
-            print(f"✓ Team '{team_name}' permissions updated for repository '{repo}' ({permission})")
+    def change(kind, target, value, current):
+        if current is None:
+            action = "create" if kind == "team" else "add"
+        elif current == value or current == "pending" or value is None:
+            action = "keep"
         else:
-            print(f"✓ Team '{team_name}' added to repository with {permission} permissions")
-        return True
+            action = "update" if force else "differs"
+        return {"kind": kind, "target": target, "action": action, "value": value, "current": current}
+    
+    changes = [change("team", team_name, None, True if state["team"] else None)]
+    changes.append(change("repo", repo, permission, state["permission"]))
+    for username, role in users:
+        changes.append(change("user", username, role, state["members"].get(username.lower())))
+    return changes
+
+
+def describe_change(change: dict, applied: bool = False) -> str:
+    """
+    Describe one planned change for the diff or the fleet summary.
+    
+    Args:
+        change: Change from plan_team_changes
+        applied: Describe it as done rather than as planned
+        
+    Returns:
+        str: Short outcome such as "would add as member" or "updated push -> maintain"
+    """
+    action, value, current = change["action"], change["value"], change["current"]
+    if action == "keep":
+        return "unchanged" if current != "pending" else "invitation pending"
+    if action == "differs":
+        return f"differs: {current}, wanted {value} (use --force to update)"
+    if action == "create":
+        return "created" if applied else "would create"
+    if action == "add":
+        verb = "added" if applied else "would add"
+        return f"{verb} as {value}" if change["kind"] == "user" else f"{verb} with {value}"
+    verb = "updated" if applied else "would update"
+    return f"{verb} {current} -> {value}"
+
+
+def print_plan(changes: List[dict]) -> None:
+    """
+    Print a plan as a diff: + for additions, ~ for updates, ! for differences left alone, = for no change.
+    
+    Args:
+        changes: Changes from plan_team_changes
+    """
+    symbols = {"create": "+", "add": "+", "update": "~", "differs": "!", "keep": "="}
+    for change in changes:
+        print(f"{symbols[change['action']]} {change['kind']} {change['target']}: {describe_change(change)}")
 
 
-def add_user_to_team_if_not_exists(org: str, team_name: str, username: str, role: str = "member", force: bool = False) -> bool:
+def apply_change(org: str, team_name: str, change: dict) -> bool:
     """
-    Add a user to a team if they are not already a member.
+    Run the mutation for one planned change, if it needs one.
     
     Args:
         org: GitHub organization name
         team_name: Name of the team
-        username: GitHub username to add
-        role: Role for the user (member or maintainer)
-        force: If True, update role even if user is already a member
+        change: Change from plan_team_changes
         
     Returns:
-        bool: True if user was added/updated, False if they were already a member
+        bool: True if a mutation was made
     """
-    if not force and check_user_in_team(org, team_name, username):
-        print(f"✓ User '{username}' is already a member of team '{team_name}'")
+    if change["action"] not in ("create", "add", "update"):
         return False
+    if change["kind"] == "team":
+        create_team(org, team_name)
+    elif change["kind"] == "repo":
+        add_team_to_repo(org, team_name, change["target"], change["value"])
     else:
-        add_user_to_team(org, team_name, username, role)
-        if force and check_user_in_team(org, team_name, username):
-            print(f"✓ User '{username}' role updated in team '{team_name}' ({role})")
-        else:
-            print(f"✓ User '{username}' added to team as {role}")
-        return True
+        add_user_to_team(org, team_name, change["target"], change["value"])
+    return True
 
 
-def add_team_to_repo(org: str, team_name: str, repo: str, permission: str = "maintain") -> dict:
+def split_users(value) -> List[str]:
     """
-    Add a team to a repository with specified permissions.
+    Split a users field from a manifest into GitHub usernames.
     
     Args:
-        org: GitHub organization name
-        team_name: Name of the team
-        repo: Repository name (org/repo format)
-        permission: Permission level (maintain, admin, push, pull, triage)
+        value: List of names, or a string separated by commas, semicolons or whitespace
         
     Returns:
-        dict: Response from adding team to repo
+        List[str]: Usernames in order, without blanks
     """
-    print(f"Adding team '{team_name}' to repository '{repo}' with '{permission}' permissions...")
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.replace(";", ",").replace(" ", ",").split(",")
+    return [str(user).strip() for user in value if str(user).strip()]
+
+
+def load_manifest(path: str, default_role: str = "member", default_permission: str = "maintain") -> List[dict]:
+    """
+    Load a fleet manifest of course instances.
+    
+    YAML manifests hold a list of entries, either at the top level or under `courses`,
+    with optional `defaults`. CSV manifests have the columns course, semester, users,
+    role and permission. Rows for the same course and semester are merged, so a CSV
+    can also list one user per row.
+    
+    Args:
+        path: Manifest file (.yml/.yaml or .csv)
+        default_role: Role for users when an entry does not set one
+        default_permission: Repository permission when an entry does not set one
+        
+    Returns:
+        List[dict]: Entries with course, semester, permission and users as (username, role) pairs
+    """
+    if path.endswith((".yml", ".yaml")):
+        from ruamel.yaml import YAML
+        with open(path, "r", encoding="utf-8") as f:
+            data = YAML(typ="safe").load(f) or {}
+        if isinstance(data, list):
+            rows, defaults = data, {}
+        else:
+            rows, defaults = data.get("courses", []), data.get("defaults", {})
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows, defaults = list(csv.DictReader(f)), {}
+    
+    entries: Dict[Tuple[str, str], dict] = {}
+    for row in rows:
+        course = str(row["course"]).strip()
+        semester = str(row["semester"]).strip()
+        role = row.get("role") or defaults.get("role") or default_role
+        permission = row.get("permission") or defaults.get("permission") or default_permission
+        entry = entries.setdefault((course, semester), {
+            "course": course,
+            "semester": semester,
+            "permission": permission,
+            "users": [],
+        })
+        if permission != entry["permission"]:
+            raise ValueError(f"Conflicting permissions for {course} {semester}: {entry['permission']} and {permission}")
+        known = {user for user, _ in entry["users"]}
+        entry["users"].extend((user, role) for user in split_users(row.get("users")) if user not in known)
+    return list(entries.values())
+
+
+def provision_team(entry: dict, dry_run: bool = False, force: bool = False) -> dict:
+    """
+    Validate an entry, snapshot its team and apply the team and repository changes, in that order.
+    
+    Memberships are not added here; they depend on the team and are returned as
+    pending changes so they can run concurrently.
     
-    command = [
-        "gh", "api", "--method", "PUT",
-        "-H", "Accept: application/vnd.github.v3+json",
-        f"/orgs/{org}/teams/{team_name}/repos/{repo}",
-        "-f", f"permission={permission}"
-    ]
+    Args:
+        entry: Manifest entry from load_manifest
+        dry_run: Plan only, without making changes
+        force: Update permissions/roles that differ from the manifest
+        
+    Returns:
+        dict: Result with the entry's names, step outcomes, pending membership changes and an error message if it failed
+    """
+    org_name, team_name, repo_name = parse_course_info(entry["course"], entry["semester"])
+    result = {"entry": entry, "org": org_name, "team": team_name, "repo": repo_name,
+              "steps": [], "pending": [], "error": None}
+    
+    if not check_org_exists(org_name):
+        result["error"] = f"Organization '{org_name}' does not exist or is not accessible"
+        return result
+    if not check_repo_exists(repo_name):
+        result["error"] = f"Repository '{repo_name}' does not exist or is not accessible"
+        return result
+    
+    state = fetch_team_state(org_name, team_name, repo_name)
+    changes = plan_team_changes(state, team_name, repo_name, entry["permission"], entry["users"], force)
+    for change in changes:
+        if change["kind"] == "user" and not dry_run and change["action"] in ("add", "update"):
+            result["pending"].append(change)
+            continue
+        applied = not dry_run and apply_change(org_name, team_name, change)
+        result["steps"].append((change["kind"] if change["kind"] != "user" else f"user {change['target']}",
+                                describe_change(change, applied)))
+    return result
+
+
+def provision_member(org_name: str, team_name: str, change: dict) -> str:
+    """
+    Apply one membership change.
     
-    return run_gh_command(command)
+    Args:
+        org_name: GitHub organization name
+        team_name: Name of the team
+        change: User change from plan_team_changes
+        
+    Returns:
+        str: Outcome for the summary
+    """
+    apply_change(org_name, team_name, change)
+    return describe_change(change, applied=True)
 
 
-def add_user_to_team(org: str, team_name: str, username: str, role: str = "member") -> dict:
+def run_fleet(entries: List[dict], workers: int = 8, dry_run: bool = False, force: bool = False) -> List[dict]:
     """
-    Add a user to a team.
+    Provision many course instances through a bounded thread pool.
+    
+    Each entry snapshots its team, then creates the team, then grants repository
+    access, then adds its memberships. The memberships of a team are only queued
+    once its team and repository steps have succeeded; everything else runs
+    concurrently, up to `workers` GitHub calls at a time.
     
     Args:
-        org: GitHub organization name
-        team_name: Name of the team
-        username: GitHub username to add
-        role: Role for the user (member or maintainer)
+        entries: Manifest entries from load_manifest
+        workers: Maximum number of concurrent GitHub calls
+        dry_run: Plan only, without making changes
+        force: Update permissions/roles that differ from the manifest
         
     Returns:
-        dict: Response from adding user to team
+        List[dict]: One result per entry, in manifest order
     """
-    print(f"Adding user '{username}' to team '{team_name}' as '{role}'...")
+    results = [{"entry": entry, "steps": [], "error": None} for entry in entries]
     
-    command = [
-        "gh", "api", "--method", "PUT",
-        "-H", "Accept: application/vnd.github.v3+json",
-        f"/orgs/{org}/teams/{team_name}/memberships/{username}",
-        "-f", f"role={role}"
-    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(provision_team, entry, dry_run, force): (i, None)
+                   for i, entry in enumerate(entries)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, change = pending.pop(future)
+                result = results[i]
+                try:
+                    outcome = future.result()
+                except subprocess.CalledProcessError as e:
+                    outcome = f"failed (exit code {e.returncode})"
+                except Exception as e:
+                    outcome = f"failed ({e})"
+                
+                if change is not None:
+                    result["members"][change["target"]] = outcome
+                elif isinstance(outcome, str):
+                    result["error"] = outcome
+                else:
+                    results[i] = result = outcome
+                    result["members"] = {}
+                    for change in result.pop("pending"):
+                        member = pool.submit(provision_member, result["org"], result["team"], change)
+                        pending[member] = (i, change)
     
-    return run_gh_command(command)
+    # Report memberships in manifest order rather than completion order
+    for result in results:
+        members = result.pop("members", {})
+        result["steps"].extend((f"user {username}", members[username])
+                               for username, _ in result["entry"]["users"] if username in members)
+    return results
 
 
-def parse_course_info(course: str, semester: str) -> tuple:
+def print_fleet_summary(results: List[dict], elapsed: float) -> bool:
     """
-    Parse course and semester information to extract org, team, and repo names.
+    Print one line per course instance plus totals.
     
     Args:
-        course: Course name (e.g., "stat123")
-        semester: Semester (e.g., "fall-2025")
+        results: Output of run_fleet
+        elapsed: Wall time in seconds
         
     Returns:
-        tuple: (org_name, team_name, repo_name)
+        bool: True if every entry and step succeeded
     """
-    # Extract course number from course name
-    # Assuming format like "stat123" -> "stat158" becomes "berkeley-stat158"
-    org_name = f"berkeley-{course}"
-    team_name = f"instructors-{semester}"
-    repo_name = f"{org_name}/{semester}"
-    
-    return org_name, team_name, repo_name
+    print()
+    print("Fleet summary")
+    print("-" * 60)
+    ok = True
+    changes = 0
+    for result in results:
+        entry = result["entry"]
+        label = f"{entry['course']} {entry['semester']}"
+        if result["error"]:
+            ok = False
+            print(f"❌ {label}: {result['error']}")
+            continue
+        failed = [f"{name}: {outcome}" for name, outcome in result["steps"] if outcome.startswith("failed")]
+        changed = [f"{name}: {outcome}" for name, outcome in result["steps"]
+                   if outcome not in ("unchanged", "invitation pending") and not outcome.startswith("failed")]
+        changes += sum(1 for item in changed if ": differs" not in item)
+        ok = ok and not failed
+        status = "❌" if failed else "✓"
+        detail = "; ".join(failed + changed) or "no changes"
+        print(f"{status} {label}: {detail}")
+    print("-" * 60)
+    print(f"{len(results)} course instance(s), {changes} change(s), {elapsed:.1f}s")
+    return ok
 
 
 def main():
@@ -314,12 +638,24 @@ def main():
     )
     parser.add_argument(
         "course",
+        nargs="?",
         help="Course name (e.g., stat123)"
     )
     parser.add_argument(
         "semester", 
+        nargs="?",
         help="Semester (e.g., fall-2025)"
     )
+    parser.add_argument(
+        "--manifest",
+        help="YAML or CSV manifest of course instances to provision together (fleet mode)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Maximum concurrent GitHub API calls in fleet mode",
+        default=8
+    )
     parser.add_argument(
         "--users",
         help="Comma-separated list of GitHub usernames to add to the team",
@@ -350,6 +686,27 @@ def main():
     
     args = parser.parse_args()
     
+    if args.manifest:
+        if args.course or args.semester or args.users:
+            parser.error("--manifest cannot be combined with course, semester or --users")
+        try:
+            entries = load_manifest(args.manifest, args.role, args.permission)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"❌ Error reading manifest '{args.manifest}': {e}")
+            sys.exit(1)
+        print(f"Fleet setup for {len(entries)} course instance(s) from {args.manifest}")
+        if args.dry_run:
+            print("DRY RUN - No actual changes will be made")
+        print()
+        start = time.monotonic()
+        results = run_fleet(entries, args.workers, args.dry_run, args.force)
+        if not print_fleet_summary(results, time.monotonic() - start):
+            sys.exit(1)
+        return
+    
+    if not args.course or not args.semester:
+        parser.error("course and semester are required unless --manifest is given")
+    
     # Parse course information
     org_name, team_name, repo_name = parse_course_info(args.course, args.semester)
     
@@ -380,37 +737,17 @@ def main():
         print(f"✓ Repository '{repo_name}' is accessible")
         print()
         
-        # Step 1: Create the team (idempotent)
-        if not args.dry_run:
-            create_team_if_not_exists(org_name, team_name, args.force)
-        else:
-            if check_team_exists(org_name, team_name):
-                print(f"Would skip creating team '{team_name}' (already exists)")
-            else:
-                print(f"Would create team: {team_name}")
+        # Snapshot the team, then diff it against the desired state
+        users = [(user, args.role) for user in split_users(args.users)]
+        state = fetch_team_state(org_name, team_name, repo_name)
+        changes = plan_team_changes(state, team_name, repo_name, args.permission, users, args.force)
+        print_plan(changes)
         
-        # Step 2: Add team to repository (idempotent)
         if not args.dry_run:
-            add_team_to_repo_if_not_exists(org_name, team_name, repo_name, args.permission, args.force)
-        else:
-            if check_team_has_repo_access(org_name, team_name, repo_name):
-                action = "update permissions for" if args.force else "skip adding team to"
-                print(f"Would {action} repo '{repo_name}' ({'already has access' if not args.force else 'force update'})")
-            else:
-                print(f"Would add team to repo: {repo_name} with {args.permission} permissions")
-        
-        # Step 3: Add users to team (idempotent)
-        if args.users:
-            users = [user.strip() for user in args.users.split(",") if user.strip()]
-            for user in users:
-                if not args.dry_run:
-                    add_user_to_team_if_not_exists(org_name, team_name, user, args.role, args.force)
-                else:
-                    if check_user_in_team(org_name, team_name, user):
-                        action = "update role for" if args.force else "skip adding"
-                        print(f"Would {action} user '{user}' ({'already a member' if not args.force else 'force update'})")
-                    else:
-                        print(f"Would add user: {user} as {args.role}")
+            # Apply only what the diff needs: team, then repository access, then users
+            print()
+            applied = sum(apply_change(org_name, team_name, change) for change in changes)
+            print(f"✓ Applied {applied} change(s)")
         
         print()
         print("✓ GitHub team setup completed successfully!")
@@ -0,0 +1,153 @@
+"""
+Shared fixtures for the admin script tests
+
+The scripts are run as files (their names have hyphens), so they are loaded
+with importlib. `fake_gh` puts a stand-in `gh` executable first on PATH; it
+serves a small in-memory organization from a JSON state file and logs every
+call, so tests can check both outcomes and call order.
+"""
+
+import importlib.util
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS))
+
+FAKE_GH = r'''#!{python}
+import fcntl, json, os, re, sys
+
+STATE = os.environ["FAKE_GH_STATE"]
+
+
+def fail(status, message):
+    sys.stderr.write(f"gh: {{message}} (HTTP {{status}})\n")
+    sys.exit(1)
+
+
+def route(state, method, path, fields):
+    path, _, query = path.partition("?")
+    if method == "GET" and re.fullmatch(r"/orgs/[^/]+", path):
+        return {{"login": path.split("/")[2]}} if path.split("/")[2] in state["orgs"] else fail(404, "Not Found")
+    m = re.fullmatch(r"/repos/([^/]+/[^/]+)", path)
+    if m:
+        return {{"full_name": m.group(1)}} if m.group(1) in state["repos"] else fail(404, "Not Found")
+    if method == "POST" and re.fullmatch(r"/orgs/[^/]+/teams", path):
+        key = f"{{path.split('/')[2]}}/{{fields['name']}}"
+        if key in state["teams"]:
+            fail(422, "Validation Failed")
+        state["teams"][key] = {{"repos": {{}}, "members": {{}}}}
+        return {{"slug": fields["name"]}}
+    m = re.fullmatch(r"/orgs/([^/]+)/teams/([^/]+)(/.*)?", path)
+    if not m:
+        fail(404, "Not Found")
+    team = state["teams"].get(f"{{m.group(1)}}/{{m.group(2)}}")
+    rest = m.group(3) or ""
+    if team is None:
+        fail(404, "Not Found")
+    if not rest:
+        return {{"slug": m.group(2)}}
+    if rest.startswith("/repos/"):
+        repo = rest[len("/repos/"):]
+        if method == "PUT":
+            team["repos"][repo] = fields["permission"]
+            return {{}}
+        return {{"role_name": team["repos"][repo]}} if repo in team["repos"] else fail(404, "Not Found")
+    if rest == "/invitations":
+        return []
+    if rest == "/members":
+        role = "maintainer" if "role=maintainer" in query else None
+        return [{{"login": login}} for login, r in team["members"].items() if role in (None, r)]
+    if rest.startswith("/memberships/") and method == "PUT":
+        user = rest.rsplit("/", 1)[1]
+        if user in state.get("fail_users", []):
+            fail(404, "Not Found")
+        team["members"][user] = fields["role"]
+        return {{"state": "active", "role": fields["role"]}}
+    fail(404, "Not Found")
+
+
+def main(argv):
+    if argv[:2] == ["auth", "token"]:
+        sys.exit(1)
+    assert argv[0] == "api", argv
+    method, path, fields, i = "GET", None, {{}}, 1
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--method":
+            method, i = argv[i + 1], i + 2
+        elif arg in ("-H", "-f"):
+            if arg == "-f":
+                name, _, value = argv[i + 1].partition("=")
+                fields[name] = value
+            i += 2
+        elif arg == "--paginate":
+            i += 1
+        else:
+            path, i = arg, i + 1
+    with open(STATE, "r+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        state = json.load(f)
+        state["calls"].append([method, path])
+        try:
+            result = route(state, method, path, fields)
+        finally:
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+    print(json.dumps(result))
+
+
+main(sys.argv[1:])
+'''
+
+
+def load_script(name: str):
+    """Import scripts/<name>.py as a module."""
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), SCRIPTS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeGitHub:
+    """State of the fake `gh`: orgs, repos, teams ("org/team" -> repos, members) and a call log."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.save({"orgs": [], "repos": [], "teams": {}, "fail_users": [], "calls": []})
+
+    def load(self) -> dict:
+        return json.loads(self.path.read_text())
+
+    def save(self, state: dict) -> None:
+        self.path.write_text(json.dumps(state))
+
+    def update(self, **changes) -> None:
+        state = self.load()
+        state.update(changes)
+        self.save(state)
+
+    @property
+    def calls(self) -> list:
+        return [tuple(call) for call in self.load()["calls"]]
+
+
+@pytest.fixture
+def fake_gh(tmp_path, monkeypatch):
+    """Put a fake `gh` first on PATH and force the scripts to use it."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    gh = bin_dir / "gh"
+    gh.write_text(FAKE_GH.format(python=sys.executable))
+    gh.chmod(gh.stat().st_mode | stat.S_IXUSR)
+    fake = FakeGitHub(tmp_path / "gh-state.json")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_GH_STATE", str(fake.path))
+    monkeypatch.setenv("GH_ADMIN_USE_CLI", "1")
+    return fake
@@ -0,0 +1,62 @@
+"""Tests for the cell dependency analysis in execute-notebooks.py."""
+
+from conftest import load_script
+
+notebooks = load_script("execute-notebooks")
+
+
+# ------------------------------------------------------------------------------------------
+# cell_names
+# ------------------------------------------------------------------------------------------
+
+def test_cell_names_assignments_imports_and_uses():
+    defines, uses = notebooks.cell_names("import numpy as np\nx = np.arange(3)\ndef f(a):\n    return a + y")
+    assert {"np", "x", "f"} <= defines
+    assert {"np", "y"} <= uses
+
+
+def test_cell_names_attribute_and_item_assignment_define_the_base():
+    defines, _ = notebooks.cell_names("config.options['a'] = 1\ntable[0].name = 'b'")
+    assert defines == {"config", "table"}
+
+
+def test_cell_names_method_calls_anywhere_define_the_base():
+    source = "for y in years:\n    Map.addLayer(y)\nif ok:\n    stack.items[0].update(k=1)\nn = cache.pop()"
+    defines, _ = notebooks.cell_names(source)
+    assert {"Map", "stack", "cache"} <= defines
+
+
+def test_cell_names_plain_calls_define_nothing():
+    defines, uses = notebooks.cell_names("print(x)")
+    assert defines == set() and uses == {"print", "x"}
+
+
+def test_cell_names_unanalysable_cells():
+    assert notebooks.cell_names("%%bash\nls") is None
+    assert notebooks.cell_names("from os import *") is None
+    assert notebooks.cell_names("x = (") is None
+    assert notebooks.cell_names("%matplotlib inline\n!pip list\nx = 1") == ({"x"}, set())
+
+
+# ------------------------------------------------------------------------------------------
+# cell_dependencies
+# ------------------------------------------------------------------------------------------
+
+def test_cell_dependencies_follow_latest_definer():
+    sources = ["a = 1", "b = a + 1", "a = 2", "print(a, b)"]
+    assert notebooks.cell_dependencies(sources) == [set(), {0}, set(), {1, 2}]
+
+
+def test_cell_dependencies_method_call_in_loop():
+    sources = ["Map = geemap.Map()", "for y in years:\n    Map.addLayer(y)", "Map"]
+    assert notebooks.cell_dependencies(sources) == [set(), {0}, {0, 1}]
+
+
+def test_cell_dependencies_method_call_in_expression():
+    sources = ["items = [1, 2]", "last = items.pop()", "len(items)"]
+    assert notebooks.cell_dependencies(sources) == [set(), {0}, {0, 1}]
+
+
+def test_cell_dependencies_unanalysable_cell_is_a_barrier():
+    sources = ["a = 1", "%%capture\nb = a", "c = 3", "a"]
+    assert notebooks.cell_dependencies(sources) == [set(), {0}, {1}, {0, 1}]
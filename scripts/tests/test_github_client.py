@@ -0,0 +1,274 @@
+"""Tests for github_client.py against a local HTTP stand-in for the GitHub API."""
+
+import http.client
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+import github_client
+from github_client import GitHubClient, GitHubError
+
+PREFIX = "/api/v3"
+DROP = "drop"
+SLOW = "slow"
+
+
+class StandIn:
+    """
+    Threaded HTTP/1.1 server answering from scripted responses.
+
+    script maps "METHOD /path?query" to a list of responses, used in order (the last
+    one repeats): (status, headers, body) tuples, DROP to close the connection
+    without answering, or SLOW to do so only after a second. Every request is recorded as (method, path, headers, body).
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.requests = []
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_one(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stand_in.requests.append((self.command, self.path, dict(self.headers), body))
+                key = f"{self.command} {self.path[len(PREFIX):]}"
+                responses = stand_in.script.get(key, [(404, {}, {"message": "Not Found"})])
+                response = responses.pop(0) if len(responses) > 1 else responses[0]
+                if response in (DROP, SLOW):
+                    if response == SLOW:
+                        threading.Event().wait(1.0)  # time.sleep is patched by the sleeps fixture
+                    self.close_connection = True
+                    return
+                status, headers, data = response
+                payload = json.dumps(data).encode() if data is not None else b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = handle_one
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        host, port = self.httpd.server_address[:2]
+        self.base_url = f"http://{host}:{port}{PREFIX}"
+
+    def calls(self, method=None):
+        return [(m, path[len(PREFIX):]) for m, path, _, _ in self.requests if method in (None, m)]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    stand_in = StandIn()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def client(server):
+    client = GitHubClient("test-token", server.base_url, max_retries=3, timeout=5)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(github_client.time, "sleep", delays.append)
+    monkeypatch.setattr(github_client.random, "uniform", lambda a, b: 0.0)
+    return delays
+
+
+# ------------------------------------------------------------------------------------------
+# Requests, pagination and ETags
+# ------------------------------------------------------------------------------------------
+
+def test_request_sends_token_and_json_body(server, client):
+    server.script["POST /orgs/x/teams"] = [(201, {}, {"slug": "ta"})]
+
+    assert client.request("POST", "/orgs/x/teams", {"name": "ta"}) == {"slug": "ta"}
+
+    method, path, headers, body = server.requests[0]
+    assert (method, path) == ("POST", f"{PREFIX}/orgs/x/teams")
+    assert headers["Authorization"] == "Bearer test-token"
+    assert json.loads(body) == {"name": "ta"}
+
+
+def test_paginate_follows_next_links(server, client):
+    base = server.base_url
+    server.script["GET /orgs/x/members?per_page=100"] = [
+        (200, {"Link": f'<{base}/orgs/x/members?per_page=100&page=2>; rel="next", '
+                       f'<{base}/orgs/x/members?per_page=100&page=3>; rel="last"'},
+         [{"login": "a"}, {"login": "b"}])]
+    server.script["GET /orgs/x/members?per_page=100&page=2"] = [
+        (200, {"Link": f'<{base}/orgs/x/members?per_page=100&page=3>; rel="next"'}, [{"login": "c"}])]
+    server.script["GET /orgs/x/members?per_page=100&page=3"] = [(200, {}, [{"login": "d"}])]
+
+    assert [user["login"] for user in client.paginate("/orgs/x/members")] == ["a", "b", "c", "d"]
+    assert len(server.requests) == 3
+
+
+def test_etag_revalidation_returns_cached_body(server, client):
+    server.script["GET /orgs/x"] = [(200, {"ETag": '"v1"'}, {"login": "x"}),
+                                    (304, {"ETag": '"v1"'}, None)]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+
+    assert "If-None-Match" not in server.requests[0][2]
+    assert server.requests[1][2]["If-None-Match"] == '"v1"'
+    assert client.stats["not_modified"] == 1
+
+
+def test_etag_cache_keeps_link_header_for_pagination(server, client):
+    base = server.base_url
+    link = {"ETag": '"p1"', "Link": f'<{base}/orgs/x/teams?per_page=100&page=2>; rel="next"'}
+    server.script["GET /orgs/x/teams?per_page=100"] = [(200, link, [{"slug": "a"}]), (304, {}, None)]
+    server.script["GET /orgs/x/teams?per_page=100&page=2"] = [(200, {}, [{"slug": "b"}])]
+
+    assert len(client.paginate("/orgs/x/teams")) == 2
+    assert [team["slug"] for team in client.paginate("/orgs/x/teams")] == ["a", "b"]
+
+
+# ------------------------------------------------------------------------------------------
+# Retries
+# ------------------------------------------------------------------------------------------
+
+def test_retry_on_429_honours_retry_after(server, client, sleeps):
+    server.script["GET /orgs/x"] = [(429, {"Retry-After": "7"}, {"message": "slow down"}),
+                                    (200, {}, {"login": "x"})]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert sleeps == [7.0]
+    assert client.stats["retries"] == 1
+
+
+def test_retry_on_rate_limited_403_waits_for_reset(server, client, sleeps):
+    reset = int(time.time()) + 30
+    server.script["GET /orgs/x"] = [
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)},
+         {"message": "API rate limit exceeded"}),
+        (200, {}, {"login": "x"})]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert len(sleeps) == 1 and 25 <= sleeps[0] <= 30
+
+
+def test_secondary_rate_limit_403_backs_off(server, client, sleeps):
+    server.script["GET /orgs/x"] = [(403, {}, {"message": "You have exceeded a secondary rate limit"}),
+                                    (200, {}, {"login": "x"})]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert sleeps == [1]
+
+
+def test_plain_403_is_not_retried(server, client, sleeps):
+    server.script["GET /orgs/x"] = [(403, {}, {"message": "Must have admin rights"})]
+
+    with pytest.raises(GitHubError) as error:
+        client.request("GET", "/orgs/x")
+    assert error.value.status == 403
+    assert len(server.requests) == 1 and sleeps == []
+
+
+def test_retries_give_up_after_max_retries(server, client, sleeps):
+    server.script["GET /orgs/x"] = [(502, {}, {"message": "Bad Gateway"})]
+
+    with pytest.raises(GitHubError) as error:
+        client.request("GET", "/orgs/x")
+    assert error.value.status == 502
+    assert len(server.requests) == client.max_retries + 1
+
+
+def test_get_is_resent_after_dropped_connection(server, client, sleeps):
+    server.script["GET /orgs/x"] = [DROP, (200, {}, {"login": "x"})]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert server.calls() == [("GET", "/orgs/x")] * 2
+
+
+def test_read_timeout_drops_connection_and_retries(server, sleeps):
+    client = GitHubClient("t", server.base_url, max_retries=2, timeout=0.5)
+    server.script["GET /orgs/x"] = [SLOW, (200, {}, {"login": "x"})]
+
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert server.calls() == [("GET", "/orgs/x")] * 2
+    client.close()
+
+
+def test_connection_is_usable_after_post_timeout(server, sleeps):
+    client = GitHubClient("t", server.base_url, max_retries=2, timeout=0.5)
+    server.script["POST /orgs/x/teams"] = [SLOW]
+    server.script["GET /orgs/x"] = [(200, {}, {"login": "x"})]
+
+    with pytest.raises(GitHubError):
+        client.request("POST", "/orgs/x/teams", {"name": "ta"})
+    assert client.request("GET", "/orgs/x") == {"login": "x"}
+    assert server.calls() == [("POST", "/orgs/x/teams"), ("GET", "/orgs/x")]
+    client.close()
+
+
+# ------------------------------------------------------------------------------------------
+# POST is never sent twice unless the server clearly rejected it
+# ------------------------------------------------------------------------------------------
+
+def test_post_is_retried_after_429(server, client, sleeps):
+    server.script["POST /orgs/x/teams"] = [(429, {"Retry-After": "1"}, {"message": "slow down"}),
+                                           (201, {}, {"slug": "ta"})]
+
+    assert client.request("POST", "/orgs/x/teams", {"name": "ta"}) == {"slug": "ta"}
+    assert server.calls("POST") == [("POST", "/orgs/x/teams")] * 2
+
+
+def test_post_is_not_retried_after_server_error(server, client, sleeps):
+    server.script["POST /repos/t/template/generate"] = [(502, {}, {"message": "Bad Gateway"}),
+                                                        (201, {}, {"full_name": "o/r"})]
+
+    with pytest.raises(GitHubError) as error:
+        client.request("POST", "/repos/t/template/generate", {"owner": "o", "name": "r"})
+    assert error.value.status == 502
+    assert len(server.calls("POST")) == 1 and sleeps == []
+
+
+def test_post_is_not_resent_after_lost_response(server, client, sleeps):
+    server.script["GET /orgs/x"] = [(200, {}, {"login": "x"})]
+    server.script["POST /orgs/x/teams"] = [DROP, (201, {}, {"slug": "ta"})]
+    client.request("GET", "/orgs/x")
+
+    with pytest.raises(GitHubError) as error:
+        client.request("POST", "/orgs/x/teams", {"name": "ta"})
+    assert error.value.status == 0
+    assert len(server.calls("POST")) == 1
+
+
+def test_post_is_retried_when_connection_failed_before_sending(monkeypatch, sleeps):
+    attempts = []
+
+    class Refused(http.client.HTTPConnection):
+        def request(self, *args, **kwargs):
+            attempts.append(args[:2])
+            raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(github_client.http.client, "HTTPConnection", Refused)
+    client = GitHubClient("t", "http://127.0.0.1:9", max_retries=2)
+
+    with pytest.raises(GitHubError):
+        client.request("POST", "/orgs/x/teams", {"name": "ta"})
+    assert len(attempts) == 3
@@ -0,0 +1,171 @@
+"""Tests for setup-github-team.py fleet mode, run against a fake `gh` on PATH."""
+
+import pytest
+
+from conftest import load_script
+
+team = load_script("setup-github-team")
+
+ORG = "berkeley-stat123"
+REPOS = ["berkeley-stat123/fall-2025", "berkeley-stat123/spring-2026"]
+
+
+@pytest.fixture
+def org(fake_gh):
+    """One organization with two semester repositories and no teams yet."""
+    fake_gh.update(orgs=[ORG], repos=REPOS)
+    return fake_gh
+
+
+def entry(semester, users=(), permission="maintain"):
+    return {"course": "stat123", "semester": semester, "permission": permission, "users": list(users)}
+
+
+# ------------------------------------------------------------------------------------------
+# load_manifest
+# ------------------------------------------------------------------------------------------
+
+def test_load_manifest_yaml_defaults(tmp_path):
+    path = tmp_path / "fleet.yml"
+    path.write_text(
+        "defaults:\n"
+        "  role: maintainer\n"
+        "courses:\n"
+        "  - {course: stat123, semester: fall-2025, users: [ta1, ta2]}\n"
+        "  - {course: stat123, semester: spring-2026, users: 'ta3; ta4', role: member, permission: push}\n"
+    )
+    entries = team.load_manifest(str(path))
+    assert entries == [
+        entry("fall-2025", [("ta1", "maintainer"), ("ta2", "maintainer")]),
+        entry("spring-2026", [("ta3", "member"), ("ta4", "member")], permission="push"),
+    ]
+
+
+def test_load_manifest_csv_merges_rows(tmp_path):
+    path = tmp_path / "fleet.csv"
+    path.write_text(
+        "course,semester,users,role,permission\n"
+        "stat123,fall-2025,ta1,,\n"
+        "stat123,fall-2025,\"ta2,ta1\",maintainer,\n"
+        "stat123,spring-2026,,,\n"
+    )
+    entries = team.load_manifest(str(path), default_role="member")
+    assert entries == [
+        entry("fall-2025", [("ta1", "member"), ("ta2", "maintainer")]),
+        entry("spring-2026"),
+    ]
+
+
+def test_load_manifest_conflicting_permissions(tmp_path):
+    path = tmp_path / "fleet.csv"
+    path.write_text(
+        "course,semester,users,role,permission\n"
+        "stat123,fall-2025,ta1,,push\n"
+        "stat123,fall-2025,ta2,,admin\n"
+    )
+    with pytest.raises(ValueError, match="Conflicting permissions"):
+        team.load_manifest(str(path))
+
+
+# ------------------------------------------------------------------------------------------
+# provision_team
+# ------------------------------------------------------------------------------------------
+
+def test_provision_team_creates_team_before_repo_access(org):
+    result = team.provision_team(entry("fall-2025", [("ta1", "member")]))
+
+    assert result["error"] is None
+    mutations = [call for call in org.calls if call[0] != "GET"]
+    assert mutations == [
+        ("POST", f"/orgs/{ORG}/teams"),
+        ("PUT", f"/orgs/{ORG}/teams/instructors-fall-2025/repos/{REPOS[0]}"),
+    ]
+    # Memberships are left to the caller, after the team exists
+    assert [change["target"] for change in result["pending"]] == ["ta1"]
+    assert result["steps"] == [("team", "created"), ("repo", "added with maintain")]
+    assert org.load()["teams"][f"{ORG}/instructors-fall-2025"]["repos"] == {REPOS[0]: "maintain"}
+
+
+def test_provision_team_dry_run_makes_no_changes(org):
+    result = team.provision_team(entry("fall-2025", [("ta1", "member")]), dry_run=True)
+
+    assert all(method == "GET" for method, _ in org.calls)
+    assert result["pending"] == []
+    assert result["steps"] == [("team", "would create"), ("repo", "would add with maintain"),
+                               ("user ta1", "would add as member")]
+
+
+def test_provision_team_missing_repo(org):
+    result = team.provision_team(entry("summer-2026"))
+
+    assert "Repository 'berkeley-stat123/summer-2026'" in result["error"]
+    assert all(method == "GET" for method, _ in org.calls)
+
+
+# ------------------------------------------------------------------------------------------
+# run_fleet and print_fleet_summary
+# ------------------------------------------------------------------------------------------
+
+def test_run_fleet_fans_out_memberships(org):
+    users = [("ta1", "member"), ("ta2", "maintainer"), ("ta3", "member")]
+    results = team.run_fleet([entry("fall-2025", users), entry("spring-2026", users[:1])], workers=4)
+
+    assert [result["error"] for result in results] == [None, None]
+    assert results[0]["steps"] == [
+        ("team", "created"),
+        ("repo", "added with maintain"),
+        ("user ta1", "added as member"),
+        ("user ta2", "added as maintainer"),
+        ("user ta3", "added as member"),
+    ]
+    state = org.load()
+    assert state["teams"][f"{ORG}/instructors-fall-2025"]["members"] == {
+        "ta1": "member", "ta2": "maintainer", "ta3": "member"}
+    assert state["teams"][f"{ORG}/instructors-spring-2026"]["members"] == {"ta1": "member"}
+
+    # Each team's memberships only start once its team and repository steps are done
+    calls = org.calls
+    for semester, repo in zip(("fall-2025", "spring-2026"), REPOS):
+        base = f"/orgs/{ORG}/teams/instructors-{semester}"
+        repo_put = calls.index(("PUT", f"{base}/repos/{repo}"))
+        members = [i for i, (method, path) in enumerate(calls) if path.startswith(f"{base}/memberships/")]
+        assert members and min(members) > repo_put > calls.index(("POST", f"/orgs/{ORG}/teams"))
+
+
+def test_run_fleet_second_run_is_unchanged(org):
+    entries = [entry("fall-2025", [("ta1", "member")])]
+    team.run_fleet(entries)
+    first = len(org.calls)
+
+    results = team.run_fleet(entries)
+
+    assert all(method == "GET" for method, _ in org.calls[first:])
+    assert results[0]["steps"] == [("team", "unchanged"), ("repo", "unchanged"), ("user ta1", "unchanged")]
+
+
+def test_fleet_summary_reports_failures(org, capsys):
+    org.update(fail_users=["ghost"])
+    entries = [
+        entry("fall-2025", [("ta1", "member"), ("ghost", "member")]),
+        entry("summer-2026", [("ta1", "member")]),
+    ]
+    results = team.run_fleet(entries, workers=2)
+
+    assert dict(results[0]["steps"])["user ghost"] == "failed (exit code 1)"
+    assert dict(results[0]["steps"])["user ta1"] == "added as member"
+    assert "does not exist" in results[1]["error"]
+
+    capsys.readouterr()
+    assert team.print_fleet_summary(results, 1.0) is False
+    out = capsys.readouterr().out
+    assert "❌ stat123 fall-2025: user ghost: failed (exit code 1); team: created" in out
+    assert "❌ stat123 summer-2026: Repository 'berkeley-stat123/summer-2026' does not exist" in out
+    assert "2 course instance(s), 3 change(s)" in out
+
+
+def test_fleet_summary_all_ok(org, capsys):
+    results = team.run_fleet([entry("fall-2025")], dry_run=True)
+
+    assert team.print_fleet_summary(results, 0.5) is True
+    out = capsys.readouterr().out
+    assert "✓ stat123 fall-2025: team: would create; repo: would add with maintain" in out
@@ -0,0 +1,88 @@
+import collections
+
+import numpy as np
+
+# Local (NumPy) per-pixel harmonic time-series fitting.
+# The annual cycle of unit1, lst0 + (delta/2)·sin(2πt/τ + φ), is linear in
+# [1, cos(2πt/τ), sin(2πt/τ)] once τ is fixed, so every pixel of a stack can be fitted by
+# linear least squares against one shared design matrix instead of one curve_fit per point:
+#
+#   fit = timeseries.fit_harmonics(stack, times_ms)    # stack: (time, rows, cols)
+#   fit.mean, fit.amplitude, fit.phase                 # delta = 2 * amplitude
+#
+# emit_hyper.harmonic_fit is the ee counterpart.
+
+YEAR_MS = 365 * 24 * 3600 * 1000   # milliseconds in a year, as in unit1
+
+HarmonicFit = collections.namedtuple('HarmonicFit', ['mean', 'amplitude', 'phase', 'coefficients'])
+
+# --------------------------------------------------------------------------------------------------
+# Design matrix
+# --------------------------------------------------------------------------------------------------
+
+def design_matrix(times, tau=YEAR_MS, n_harmonics=1):
+    """(time × (1 + 2·n_harmonics)) matrix with columns 1, cos1, sin1, cos2, sin2, ..."""
+    angle = 2 * np.pi * np.asarray(times, dtype=float) / tau
+    columns = [np.ones_like(angle)]
+    for k in range(1, n_harmonics + 1):
+        columns += [np.cos(k * angle), np.sin(k * angle)]
+    return np.stack(columns, axis=1)
+
+# --------------------------------------------------------------------------------------------------
+# Fitting
+# --------------------------------------------------------------------------------------------------
+
+def _solve_masked(design, values, valid):
+    """Batched normal equations for pixels with missing dates; (pixels × coeffs)."""
+    ncoef = design.shape[1]
+    weights = valid.astype(float)
+    xtx = np.einsum('tp,ti,tj->pij', weights, design, design)
+    xty = np.einsum('tp,ti->pi', np.where(valid, values, 0.0), design)
+    coeffs = np.full((values.shape[1], ncoef), np.nan)
+    # Pixels with fewer observations than coefficients stay NaN.
+    solvable = valid.sum(axis=0) >= ncoef
+    solvable[solvable] = np.linalg.matrix_rank(xtx[solvable]) == ncoef
+    if solvable.any():
+        coeffs[solvable] = np.linalg.solve(xtx[solvable], xty[solvable][..., None])[..., 0]
+    return coeffs
+
+def fit_harmonics(stack, times, tau=YEAR_MS, n_harmonics=1, chunk_pixels=262144):
+    """Fit mean + harmonics to every pixel of a (time, ...) stack; NaN marks missing data.
+
+    Fully observed pixels share one pseudo-inverse of the design matrix; pixels with gaps
+    are solved with batched per-pixel normal equations. Returns a HarmonicFit with rasters
+    shaped like stack[0] (amplitude and phase get a leading harmonic axis when
+    n_harmonics > 1) and coefficients shaped (1 + 2·n_harmonics, ...).
+    """
+    stack = np.asarray(stack)
+    design = design_matrix(times, tau, n_harmonics)
+    if design.shape[0] != stack.shape[0]:
+        raise ValueError(f"stack has {stack.shape[0]} dates, times has {design.shape[0]}")
+    pinv = np.linalg.pinv(design)
+    values = stack.reshape(stack.shape[0], -1)
+    coeffs = np.empty((design.shape[1], values.shape[1]))
+
+    for start in range(0, values.shape[1], chunk_pixels):
+        block = values[:, start:start + chunk_pixels].astype(float)
+        valid = ~np.isnan(block)
+        complete = valid.all(axis=0)
+        out = coeffs[:, start:start + chunk_pixels]
+        out[:, complete] = pinv @ block[:, complete]
+        if not complete.all():
+            out[:, ~complete] = _solve_masked(design, block[:, ~complete], valid[:, ~complete]).T
+
+    coeffs = coeffs.reshape((design.shape[1],) + stack.shape[1:])
+    cos, sin = coeffs[1::2], coeffs[2::2]
+    # A·sin(ωt + φ) = A·cos φ·sin ωt + A·sin φ·cos ωt
+    amplitude = np.hypot(cos, sin)
+    phase = np.arctan2(cos, sin)
+    if n_harmonics == 1:
+        amplitude, phase = amplitude[0], phase[0]
+    return HarmonicFit(coeffs[0], amplitude, phase, coeffs)
+
+def predict(fit, times, tau=YEAR_MS):
+    """Evaluate a HarmonicFit at the given times; (time, ...) stack."""
+    coeffs = fit.coefficients
+    design = design_matrix(times, tau, (coeffs.shape[0] - 1) // 2)
+    flat = coeffs.reshape(coeffs.shape[0], -1)
+    return (design @ flat).reshape((design.shape[0],) + coeffs.shape[1:])